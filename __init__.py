@@ -1 +1,13 @@
 from .datagridview import DataGridView, DataSourceVar, Navigator
+from .canvasgridview import CanvasGridView
+from .model import GridModel, DataSource
+from .rowsource import RowSource
+from .filters import Filter, Equals, Range, Contains, Regex, And, Or, Not
+from .columnar import ColumnStore, RowView
+from .providers import DataProvider, SQLiteProvider, CSVProvider
+from .loader import DataLoader
+from .asyncbridge import AsyncBridge, AsyncDataSource
+from .parallel import ProcessJobs
+from .schema import Column
+from .instrumentation import Stats, LoggingSink
+from .statsoverlay import StatsOverlay
@@ -0,0 +1,212 @@
+from decimal import Decimal
+from heapq import heapify, heappop, heappush
+from typing import Dict, Iterable, Optional, Sequence
+from changes import Change
+
+FUNCTIONS = ('sum', 'min', 'max', 'count', 'mean')
+# sums only take numbers; booleans are ints to Python but not to a footer
+_NUMBERS = (int, float, Decimal)
+
+
+def subtotal(values: Iterable):
+    # sum of the values that aren't None, as the footer shows it: None unless they are
+    # all numbers, or when there are none
+    total, count = 0, 0
+    for value in values:
+        if value is None:
+            continue
+        if not isinstance(value, _NUMBERS) or isinstance(value, bool):
+            return None
+        total += value
+        count += 1
+    return total if count else None
+
+
+class _Reversed:
+    # max-heap entry for values that can't be negated (dates, strings)
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other: '_Reversed') -> bool:
+        return other.value < self.value
+
+
+class _Extremes:
+    # min and max of a multiset under inserts and deletes: the live values with their
+    # multiplicity in a dict, plus a min-heap and a max-heap of distinct values where a
+    # deleted value is only popped once it surfaces. O(log n) per insert, O(1) per delete.
+    __slots__ = ('_counts', '_low', '_high')
+
+    def __init__(self):
+        self._counts = {}
+        self._low = []
+        self._high = []
+
+    def add(self, value) -> None:
+        counts = self._counts
+        if value in counts:
+            counts[value] += 1
+            return
+        counts[value] = 1
+        # raises TypeError for a value that doesn't compare with the others
+        heappush(self._low, value)
+        heappush(self._high, _Reversed(value))
+
+    def discard(self, value) -> None:
+        counts = self._counts
+        left = counts.get(value, 0) - 1
+        if left > 0:
+            counts[value] = left
+            return
+        if left < 0:
+            # never added, nothing to take out
+            return
+        del counts[value]
+        if len(self._low) > 2 * len(counts) + 64:
+            # mostly dead entries: build both heaps again from the live values
+            self._low = list(counts)
+            heapify(self._low)
+            self._high = [_Reversed(value) for value in counts]
+            heapify(self._high)
+
+    def min(self):
+        low, counts = self._low, self._counts
+        while low and low[0] not in counts:
+            heappop(low)
+        return low[0] if low else None
+
+    def max(self):
+        high, counts = self._high, self._counts
+        while high and high[0].value not in counts:
+            heappop(high)
+        return high[0].value if high else None
+
+
+class _Column:
+    # running figures of one column over the rows in scope; None values are left out. min
+    # and max cost a dict and two heaps of the distinct values, so they are only kept when
+    # asked for
+    __slots__ = ('count', 'numbers', 'total', 'extremes')
+
+    def __init__(self, extremes: bool):
+        self.count = 0
+        self.numbers = 0
+        self.total = 0
+        self.extremes = _Extremes() if extremes else None
+
+    def add(self, value) -> None:
+        if value is None:
+            return
+        self.count += 1
+        if isinstance(value, _NUMBERS) and not isinstance(value, bool):
+            self.numbers += 1
+            self.total += value
+        if self.extremes is not None:
+            try:
+                self.extremes.add(value)
+            except TypeError:
+                # mixed types have no order, the column gets no min and max
+                self.extremes = None
+
+    def discard(self, value) -> None:
+        if value is None:
+            return
+        self.count -= 1
+        if isinstance(value, _NUMBERS) and not isinstance(value, bool):
+            self.numbers -= 1
+            # start over from an exact zero, float sums drift with every subtraction
+            self.total = self.total - value if self.numbers else 0
+        if self.extremes is not None:
+            self.extremes.discard(value)
+
+    def result(self, function: str):
+        if function == 'count':
+            return self.count
+        if function in ('sum', 'mean'):
+            if not self.numbers or self.numbers != self.count:
+                return None
+            return self.total if function == 'sum' else self.total / self.numbers
+        if function in ('min', 'max'):
+            if self.extremes is None:
+                return None
+            return self.extremes.min() if function == 'min' else self.extremes.max()
+        raise ValueError(f'unknown aggregate {function!r}, expected one of {FUNCTIONS}')
+
+
+class Aggregator:
+    # Per-column figures (functions, out of FUNCTIONS) of a DataSourceVar, over every row
+    # or over the rows passing predicate (a filters.Filter). Fed one mutation at a time (see
+    # DataSourceVar 'mutation' callbacks), it never rescans the table for appends, inserts,
+    # pops, removes or edits: the values taken out come with the change (Change.old). Only
+    # set(), clear(), sort(), reverse() and touch() read it again.
+    def __init__(self, data, headers: Sequence[str], predicate=None, functions: Sequence[str] = FUNCTIONS):
+        unknown = set(functions) - set(FUNCTIONS)
+        if unknown:
+            raise ValueError(f'unknown aggregates {sorted(unknown)}, expected some of {FUNCTIONS}')
+        self._data = data
+        self.headers = list(headers)
+        self.predicate = predicate
+        self.functions = tuple(functions)
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        rows = self._data.get()
+        # which rows are in scope, so a pop or an edit knows whether to take values out
+        self._included = (bytearray(b'\x01') * len(rows) if self.predicate is None else
+                          bytearray(map(self.predicate.test, rows)))
+        extremes = 'min' in self.functions or 'max' in self.functions
+        self._columns = {}
+        for header in self.headers:
+            column = self._columns[header] = _Column(extremes)
+            for value, included in zip(self._data.column(header), self._included):
+                if included:
+                    column.add(value)
+
+    def _test(self, row) -> int:
+        return 1 if self.predicate is None or self.predicate.test(row) else 0
+
+    def update(self, change: Change) -> None:
+        action = change.action
+        if action in ('append', 'extend', 'insert'):
+            start = change.start
+            stop = start + 1 if action == 'insert' else change.stop
+            rows = [self._data[index] for index in range(start, stop)]
+            included = bytearray(map(self._test, rows))
+            self._included[start:start] = included
+            for header, column in self._columns.items():
+                for row, keep in zip(rows, included):
+                    if keep:
+                        column.add(row[header])
+        elif action in ('pop', 'remove') and change.old is not None:
+            removed = change.old[0]
+            if self._included.pop(change.start):
+                for header, column in self._columns.items():
+                    column.discard(removed[header])
+        elif action == 'setitem' and change.old is not None:
+            self._update_rows(change.start, change.old)
+        else:
+            self.rebuild()
+
+    def _update_rows(self, start: int, old: Sequence[dict]) -> None:
+        # rows from start on were edited: take out the old values, add the new; columns
+        # missing from a row's old values kept theirs
+        for index, previous in enumerate(old, start):
+            row = self._data[index]
+            was, now = self._included[index], self._test(row)
+            self._included[index] = now
+            for header, column in self._columns.items():
+                value = row[header]
+                if was:
+                    column.discard(previous.get(header, value))
+                if now:
+                    column.add(value)
+
+    def result(self, header: str, function: str):
+        return self._columns[header].result(function)
+
+    def results(self, functions: Sequence[str] = FUNCTIONS) -> Dict[str, Dict[str, Optional[object]]]:
+        # min and max are None unless they were among the functions asked for
+        return {header: {function: column.result(function) for function in functions}
+                for header, column in self._columns.items()}
@@ -0,0 +1,243 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import AsyncIterable, Awaitable, Callable, Dict, Optional, Union
+from datasource import DataSourceVar
+from loader import DataLoader
+
+# the bridge of every running loop, so a coroutine finds its way back to the Tk thread
+_bridges: Dict[asyncio.AbstractEventLoop, 'AsyncBridge'] = {}
+
+
+def _resolve(future: asyncio.Future, result=None) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+class AsyncBridge:
+    # Runs an asyncio loop next to the Tk mainloop. With mode='poll' the loop runs on the
+    # Tk thread, one pass of ready callbacks every interval_ms from after(); coroutines
+    # must not block, as they hold up the UI. With mode='thread' the loop runs on a daemon
+    # thread. Either way, work for Tk goes through call_in_tk(): a queue the Tk thread
+    # drains in slices of at most slice_ms, so the UI keeps handling events.
+    def __init__(self, widget, mode: str = 'poll', interval_ms: int = 10, slice_ms: int = 20):
+        if mode not in ('poll', 'thread'):
+            raise ValueError(f"mode must be 'poll' or 'thread', not {mode!r}")
+        self._widget = widget
+        self.mode = mode
+        self._interval = interval_ms
+        self._slice = slice_ms / 1000
+        self._calls = queue.SimpleQueue()
+        self.loop = asyncio.new_event_loop()
+        _bridges[self.loop] = self
+        self._thread = None
+        self._after_id = None
+        self.closed = False
+        if mode == 'thread':
+            self._thread = threading.Thread(target=self._run_loop, name='asyncbridge', daemon=True)
+            self._thread.start()
+        self._schedule(self._interval)
+
+    @classmethod
+    def current(cls) -> 'AsyncBridge':
+        # the bridge of the loop the calling coroutine runs on
+        bridge = _bridges.get(asyncio.get_running_loop())
+        if bridge is None:
+            raise RuntimeError('not running on the loop of an AsyncBridge')
+        return bridge
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    # from any thread
+
+    def submit(self, coroutine: Awaitable) -> Future:
+        # run coroutine on the loop, the Future tells when it is done
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call_in_tk(self, function: Callable, *args) -> None:
+        # function(*args) on the Tk thread, in the order the calls were made
+        self._calls.put((function, args))
+
+    def call_in_loop(self, function: Callable, *args) -> None:
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(function, *args)
+
+    def resolve(self, future: asyncio.Future, result=None) -> None:
+        # set the result of a future of the loop, unless it is done already
+        self.call_in_loop(_resolve, future, result)
+
+    # Tk thread only
+
+    def _schedule(self, delay: int) -> None:
+        if not self.closed:
+            self._after_id = self._widget.after(delay, self._tick)
+
+    def _tick(self) -> None:
+        self._after_id = None
+        busy = False
+        try:
+            if self.mode == 'poll':
+                # run what is ready (and what the selector has for us) once, then hand back
+                self.loop.call_soon(self.loop.stop)
+                self.loop.run_forever()
+            deadline = time.perf_counter() + self._slice
+            while True:
+                if time.perf_counter() >= deadline:
+                    busy = True
+                    break
+                try:
+                    function, args = self._calls.get_nowait()
+                except queue.Empty:
+                    break
+                function(*args)
+        finally:
+            # a full slice means more calls are waiting, come back as soon as events are handled
+            self._schedule(1 if busy else self._interval)
+
+    def close(self) -> None:
+        # cancel what still runs on the loop and stop it; calls not yet made on Tk are dropped
+        if self.closed:
+            return
+        self.closed = True
+        if self._after_id is not None:
+            self._widget.after_cancel(self._after_id)
+            self._after_id = None
+        if self._thread is not None:
+            self.call_in_loop(self._shutdown)
+            self._thread.join()
+        else:
+            self.loop.run_until_complete(self._stop_tasks())
+        _bridges.pop(self.loop, None)
+        self.loop.close()
+
+    def _shutdown(self) -> None:
+        self.loop.create_task(self._stop_tasks()).add_done_callback(lambda task: self.loop.stop())
+
+    async def _stop_tasks(self) -> None:
+        tasks = [task for task in asyncio.all_tasks(self.loop) if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.loop.shutdown_asyncgens()
+
+
+class AsyncDataSource:
+    # Feeds a DataSourceVar from an async iterator of rows (a socket reader, an async DB
+    # cursor, ...). Rows are gathered on the bridge's loop into batches of batch_size, or
+    # whatever arrived within max_delay seconds, and handed to a loader.DataLoader, which
+    # extends the DataSourceVar once per batch on the Tk thread and shows the progress on
+    # widget (the bridge's by default) when it is a DataGridView. Once max_pending batches
+    # wait for Tk the iterator isn't read any further, so a fast feed can't flood the UI
+    # or starve the other feeds.
+    def __init__(self, data: DataSourceVar, source: Union[AsyncIterable[dict], Callable[[], AsyncIterable[dict]]],
+                 bridge: AsyncBridge, batch_size: int = 1000, max_delay: float = 0.05, max_pending: int = 4,
+                 on_done: Optional[Callable[[Optional[BaseException]], None]] = None, widget=None):
+        self._source = source
+        self._bridge = bridge
+        self._batch_size = batch_size
+        self._max_delay = max_delay
+        self._max_pending = max_pending
+        self._on_done = on_done
+        self._loader = DataLoader(data, bridge._widget if widget is None else widget, chunk_size=batch_size,
+                                  on_done=self._finish, on_chunk=self._taken)
+        self._future = None
+        # resolved on the Tk thread once the loader is done, see wait()
+        self._finished = Future()
+        self._batch = []
+        self._timer = None
+        self._slots = None
+
+    @property
+    def loaded(self) -> int:
+        return self._loader.loaded
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        return self._loader.error
+
+    @property
+    def done(self) -> bool:
+        return self._loader.done
+
+    def start(self) -> 'AsyncDataSource':
+        # from the Tk thread or a coroutine; a callable source is called on the loop
+        if self._future is None:
+            self._future = self._bridge.submit(self._run())
+            self._bridge.call_in_tk(self._loader.start)
+        return self
+
+    def cancel(self) -> None:
+        # rows not yet in the DataSourceVar are dropped
+        if self._future is not None:
+            self._future.cancel()
+            # a task cancelled before it ran never gets to tell the loader
+            self._bridge.call_in_tk(self._cancel_loader)
+
+    async def wait(self) -> None:
+        # from a coroutine: returns once every row read is in the DataSourceVar, or raises
+        # the error that ended the feed (rows that failed to load, or the source's own)
+        await asyncio.wrap_future(self.start()._finished)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self._max_pending)
+        try:
+            source = self._source() if callable(self._source) else self._source
+            async for row in source:
+                if not self._batch:
+                    # a batch starts once Tk has taken one of the pending ones
+                    await self._slots.acquire()
+                    self._timer = loop.call_later(self._max_delay, self._flush)
+                self._batch.append(row)
+                if len(self._batch) >= self._batch_size:
+                    self._flush()
+            self._flush()
+        except asyncio.CancelledError:
+            self._drop()
+            self._bridge.call_in_tk(self._cancel_loader)
+            raise
+        except Exception as error:
+            # the rows read before the error still get loaded
+            self._flush()
+            self._loader.fail(error)
+        self._loader.finish()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._batch:
+            self._loader.put_many(self._batch)
+            self._batch = []
+
+    def _drop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._batch = []
+
+    def _taken(self, count: int) -> None:
+        # Tk thread, a batch is in: the loop may start another one
+        self._bridge.call_in_loop(self._slots.release)
+
+    def _cancel_loader(self) -> None:
+        # Tk thread; the loader may have ended the feed itself
+        if not self._loader.done:
+            self._loader.cancel()
+
+    def _finish(self, error: Optional[BaseException]) -> None:
+        # Tk thread, when the loader is done: after the last batch, on a cancel, or when rows
+        # can't go in (a duplicate key, ...), which stops reading the source too
+        if error is not None:
+            self.cancel()
+            self._finished.set_exception(error)
+        elif self._loader.cancelled:
+            self._finished.cancel()
+        else:
+            self._finished.set_result(None)
+        if self._on_done is not None:
+            self._on_done(error)
@@ -0,0 +1,181 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from tkinter import Tk, TkVersion
+from typing import Callable, Dict, List, Optional, Sequence
+from datagridview import DataGridView
+from datasource import DataSourceVar
+
+# Headless benchmarks: run with a display (Xvfb works: xvfb-run python benchmarks.py),
+# the root window stays withdrawn. Results go to stdout or --output as JSON.
+
+
+def _rows(count: int, columns: int, seed: int = 0) -> List[dict]:
+    rnd = random.Random(seed)
+    rows = []
+    for index in range(count):
+        row = {'id': index}
+        for col in range(1, columns):
+            kind = col % 4
+            row[f'c{col}'] = (rnd.randint(0, 10 ** 6) if kind == 1 else rnd.random() * 1000 if kind == 2 else
+                              rnd.random() < 0.5 if kind == 3 else f'text {rnd.randint(0, 10 ** 5)}')
+        rows.append(row)
+    return rows
+
+
+def _stats(samples: Sequence[float]) -> Dict[str, float]:
+    # milliseconds
+    return {'min': round(min(samples) * 1000, 4), 'median': round(statistics.median(samples) * 1000, 4),
+            'max': round(max(samples) * 1000, 4), 'runs': len(samples)}
+
+
+def _time(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return _stats(samples)
+
+
+def _settle(root: Tk) -> None:
+    # run the idle callbacks a repaint is deferred to (and the prefetch after it)
+    root.update_idletasks()
+
+
+def bench_construction(root: Tk, max_rows: Sequence[int], columns: Sequence[int]) -> List[dict]:
+    results = []
+    for cols in columns:
+        data = DataSourceVar(root, _rows(max(max_rows) * 2, cols))
+        for rows in max_rows:
+            tracemalloc.start()
+            start = time.perf_counter()
+            grid = DataGridView(root, data, rows)
+            grid.grid(row=0, column=0)
+            _settle(root)
+            elapsed = time.perf_counter() - start
+            # Python-side memory only, Tk's own allocations are not traced
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results.append({'max_rows': rows, 'columns': cols, 'cells': rows * cols,
+                            'ms': round(elapsed * 1000, 4), 'python_peak_kb': round(peak / 1024, 1)})
+            grid.destroy()
+    return results
+
+
+def bench_append(root: Tk, rows: int, repeat: int) -> dict:
+    data = DataSourceVar(root, _rows(rows, 6))
+    grid = DataGridView(root, data, 50)
+    grid.grid(row=0, column=0)
+    _settle(root)
+    new_rows = iter(_rows(repeat, 6, seed=1))
+
+    def append():
+        data.append(next(new_rows))
+        _settle(root)
+    result = {'rows': rows, 'unsorted': _time(append, repeat)}
+    grid.sort_column('c1')
+    _settle(root)
+    new_rows = iter(_rows(repeat, 6, seed=2))
+    result['sorted'] = _time(append, repeat)
+    grid.destroy()
+    return result
+
+
+def bench_sort(root: Tk, sizes: Sequence[int], repeat: int) -> List[dict]:
+    results = []
+    for size in sizes:
+        data = DataSourceVar(root, _rows(size, 6))
+        grid = DataGridView(root, data, 50)
+        _settle(root)
+        result = {'rows': size}
+        for header in ('c1', 'c2', 'c3', 'c4'):
+            def sort():
+                grid.sort_column(header)
+                _settle(root)
+            result[header] = _time(sort, repeat)
+        result['two_keys'] = _time(lambda: (grid.sort_column([('c3', 'asc'), ('c2', 'desc')]), _settle(root)), repeat)
+        results.append(result)
+        grid.destroy()
+    return results
+
+
+def bench_paging(root: Tk, rows: int, pages: int) -> dict:
+    data = DataSourceVar(root, _rows(rows, 6))
+    grid = DataGridView(root, data, 50)
+    grid.grid(row=0, column=0)
+    _settle(root)
+    navigator = grid._nav
+
+    def next_page():
+        navigator.goto_next()
+        _settle(root)
+    result = {'rows': rows, 'goto_next': _time(next_page, pages)}
+    navigator.goto_beginning()
+    grid.sort_column('c2')
+    _settle(root)
+    result['goto_next_sorted'] = _time(next_page, pages)
+    grid.destroy()
+    return result
+
+
+def bench_index(root: Tk, rows: int, lookups: int) -> dict:
+    result = {'rows': rows}
+    picks = random.Random(3).sample(range(rows), min(lookups, rows))
+    for name, key in (('scan', None), ('keyed', 'id')):
+        source = _rows(rows, 6)
+        data = DataSourceVar(root, source, key=key)
+        grid = DataGridView(root, data, 50)
+        grid.sort_column('c1')
+        targets = [source[index] for index in picks]
+        start = time.perf_counter()
+        for row in targets:
+            grid.index(row)
+        result[name] = {'per_lookup_ms': round((time.perf_counter() - start) * 1000 / len(targets), 6),
+                        'lookups': len(targets)}
+        grid.destroy()
+    return result
+
+
+def run(quick: bool = False, sizes: Optional[Sequence[int]] = None) -> dict:
+    root = Tk()
+    root.withdraw()
+    sizes = sizes or ([1000, 10000] if quick else [1000, 10000, 100000])
+    repeat = 3 if quick else 10
+    try:
+        return {
+            'python': sys.version.split()[0],
+            'tk': TkVersion,
+            'platform': platform.platform(),
+            'quick': quick,
+            'construction': bench_construction(root, [10, 50] if quick else [10, 50, 200], [5, 20]),
+            'append': bench_append(root, sizes[-1], 20 if quick else 100),
+            'sort': bench_sort(root, sizes, repeat),
+            'paging': bench_paging(root, sizes[-1], 10 if quick else 50),
+            'index': bench_index(root, sizes[-1], 200 if quick else 1000),
+        }
+    finally:
+        root.destroy()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Benchmark DataGridView and write the results as JSON.')
+    parser.add_argument('--quick', action='store_true', help='smaller sizes and fewer runs')
+    parser.add_argument('--sizes', type=int, nargs='+', help='row counts for the sort benchmark')
+    parser.add_argument('--output', help='write the JSON here instead of stdout')
+    args = parser.parse_args(argv)
+    results = json.dumps(run(args.quick, args.sizes), indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(results + '\n')
+    else:
+        print(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+from tkinter import Canvas, Entry, Scrollbar, StringVar, Tk
+from datagridview import DataGridView
+from instrumentation import timed
+from datasource import DataSourceVar
+from providers import DataProvider
+from model import GridModel
+from typing import List, Optional, Tuple, Union
+
+
+class CanvasGridView(DataGridView):
+    # Draws the visible rows as text items on one Canvas instead of one Entry per cell.
+    # A small pool of row "slots" is recycled while scrolling, so the cost of the
+    # table depends on the window height and not on max_rows or on the data size.
+    def __init__(self, master, data: Union[DataSourceVar, DataProvider, GridModel], max_rows: int = 50, paged=False, **kwargs):
+        self._paged = paged
+        self._canvas = None
+        self._slot_pos = []
+        self._slot_y = []
+        self._slot_texts = []
+        self._slot_even = []
+        self._slot_items = []
+        self._stale = set()
+        self._row_height = 0
+        self._col_width = 0
+        self._editing = None
+        # source index of the row being edited, the editor closes when it moves away
+        self._editing_index = None
+        self._editor_item = None
+        super().__init__(master, data, max_rows, **kwargs)
+        if not self._paged:
+            self._nav.grid_remove()
+
+    @timed('create_table')
+    def _create_table(self):
+        self._cells = []
+        self._entries = []
+        self._texts = []
+        self._filled = []
+        self._row_height = self._font.metrics('linespace') + 4 + 2 * self._border_width
+
+        # the canvas and its scrollbar replace the grid of entries
+        for i in range(self._num_cols):
+            self._body.columnconfigure(i, weight=0)
+        for i in range(self._max_rows):
+            self._body.rowconfigure(i, weight=0)
+        self._body.columnconfigure(0, weight=1)
+        self._body.rowconfigure(0, weight=1)
+        self._canvas = Canvas(self._body, highlightthickness=0, bg=self._even_row_bg,
+                              height=self._row_height * self._max_rows,
+                              yscrollincrement=max(self._row_height // 4, 1))
+        self._vbar = Scrollbar(self._body, orient='vertical', command=self._canvas.yview)
+        self._canvas.configure(yscrollcommand=self._on_scroll)
+        self._canvas.grid(row=0, column=0, sticky='nswe')
+        self._vbar.grid(row=0, column=1, sticky='ns')
+        self._head.columnconfigure(self._num_cols, minsize=self._vbar.winfo_reqwidth())
+
+        self._editor_var = StringVar(self._body)
+        self._editor = Entry(self._canvas, textvariable=self._editor_var, justify='center', font=self._font,
+                             relief='solid', bd=1)
+        self._editor.bind('<Return>', lambda event: self.save_cell(event, *self._editing))
+        self._editor.bind('<Escape>', lambda event: self.cancel_edit(event, *self._editing))
+
+        self._canvas.bind('<Configure>', self._on_resize)
+        self._canvas.bind('<Double-Button-1>', self._on_double_click)
+        self._canvas.bind('<MouseWheel>', self._on_wheel)
+        self._canvas.bind('<Button-4>', self._on_wheel)
+        self._canvas.bind('<Button-5>', self._on_wheel)
+        self._resize_scrollregion()
+
+    def _window(self) -> Tuple[int, int]:
+        if self._paged:
+            first, last = super()._window()
+            return first, min(last, self._num_rows)
+        return 0, self._num_rows
+
+    def _current_page(self) -> int:
+        if self._paged or not self._row_height:
+            return super()._current_page()
+        # while scrolling, "pages" are the max_rows blocks the page cache is made of
+        return int(self._canvas.canvasy(0) // self._row_height) // self._max_rows
+
+    def _resize_scrollregion(self) -> None:
+        first, last = self._window()
+        width = self._canvas.winfo_width()
+        height = max(last - first, 0) * self._row_height
+        self._canvas.configure(scrollregion=(0, 0, width, height))
+        self._canvas.delete('colline')
+        for col in range(1, self._num_cols):
+            x = col * self._col_width
+            self._canvas.create_line(x, 0, x, height, fill=self._border_color, width=self._border_width,
+                                     tags=('colline',))
+
+    def _reset_slots(self) -> None:
+        self._canvas.delete('slot')
+        self._slot_pos = []
+        self._slot_y = []
+        self._slot_texts = []
+        self._slot_even = []
+        self._slot_items = []
+        self._stale.clear()
+
+    def _add_slot(self) -> None:
+        slot = len(self._slot_pos)
+        tag = f'slot{slot}'
+        rect = self._canvas.create_rectangle(0, 0, self._canvas.winfo_width(), self._row_height,
+                                             fill=self._even_row_bg, outline=self._border_color,
+                                             width=self._border_width, state='hidden',
+                                             tags=('slot', tag, 'cellbg', 'even_bg'))
+        items = [rect]
+        for col in range(self._num_cols):
+            items.append(self._canvas.create_text((col + 0.5) * self._col_width, self._row_height / 2,
+                                                  text='', font=self._font, fill=self._even_row_fg,
+                                                  state='hidden', tags=('slot', tag, 'cell', 'even_fg')))
+        self._slot_pos.append(None)
+        self._slot_y.append(0)
+        self._slot_texts.append([''] * self._num_cols)
+        self._slot_even.append(True)
+        self._slot_items.append(items)
+
+    def _draw_slot(self, slot: int, pos: int, texts: List[str]) -> None:
+        canvas = self._canvas
+        tag = f'slot{slot}'
+        items = self._slot_items[slot]
+        calls = 0
+        if self._slot_pos[slot] is None:
+            canvas.itemconfigure(tag, state='normal')
+            calls += 1
+        y = pos * self._row_height
+        if y != self._slot_y[slot]:
+            canvas.move(tag, 0, y - self._slot_y[slot])
+            self._slot_y[slot] = y
+            calls += 1
+        # stripes follow the data row, not the recycled slot
+        even = pos % 2 == 0
+        if even != self._slot_even[slot]:
+            parity = 'even' if even else 'odd'
+            canvas.itemconfigure(items[0], fill=self._even_row_bg if even else self._odd_row_bg,
+                                 tags=('slot', tag, 'cellbg', parity + '_bg'))
+            for item in items[1:]:
+                canvas.itemconfigure(item, fill=self._even_row_fg if even else self._odd_row_fg,
+                                     tags=('slot', tag, 'cell', parity + '_fg'))
+            self._slot_even[slot] = even
+            calls += len(items)
+        painted = self._slot_texts[slot]
+        for col, text in enumerate(texts):
+            if painted[col] != text:
+                canvas.itemconfigure(items[col + 1], text=text)
+                calls += 1
+        self._slot_texts[slot] = texts
+        self._slot_pos[slot] = pos
+        self.stats.count('tk.configure', calls)
+
+    def _hide_slot(self, slot: int) -> None:
+        self._canvas.itemconfigure(f'slot{slot}', state='hidden')
+        self._slot_pos[slot] = None
+        self.stats.count('tk.configure')
+
+    @timed('layout')
+    def _layout(self) -> None:
+        first, last = self._window()
+        count = max(last - first, 0)
+        top = self._canvas.canvasy(0)
+        height = max(self._canvas.winfo_height(), self._row_height)
+        first_pos = max(int(top // self._row_height), 0)
+        last_pos = min(int((top + height) // self._row_height) + 1, count)
+        visible = int(height // self._row_height) + 2
+        if visible > len(self._slot_pos):
+            # the window grew: rebuild the pool, slot assignment depends on its size
+            self._reset_slots()
+            for _ in range(visible):
+                self._add_slot()
+        slots = len(self._slot_pos)
+        for pos in range(first_pos, last_pos):
+            slot = pos % slots
+            if self._slot_pos[slot] != pos or slot in self._stale:
+                self._draw_slot(slot, pos, self._model.texts(first + pos))
+        for slot, pos in enumerate(self._slot_pos):
+            if pos is not None and not first_pos <= pos < last_pos:
+                self._hide_slot(slot)
+        self._stale.clear()
+        self._schedule_prefetch()
+
+    def _paint_rows(self, first: int, last: int, force=False) -> None:
+        offset = self._window()[0]
+        for slot, pos in enumerate(self._slot_pos):
+            if pos is not None and first <= offset + pos < last:
+                if force:
+                    self._slot_texts[slot] = [None] * self._num_cols
+                self._stale.add(slot)
+        self._layout()
+
+    def _sync_rows(self) -> None:
+        num_rows = self._num_rows
+        super()._sync_rows()
+        if num_rows != self._num_rows:
+            self._resize_scrollregion()
+
+    @timed('update')
+    def update(self, *args, **kwargs) -> None:
+        page = self._page.get()
+        super().update(*args, **kwargs)
+        if self._page.get() != page:
+            self._end_edit()
+            self._resize_scrollregion()
+            self._canvas.yview_moveto(0)
+            self._layout()
+
+    def _show_position(self, position: int) -> None:
+        if self._paged:
+            super()._show_position(position)
+            return
+        if self._num_rows:
+            self._canvas.yview_moveto(position / self._num_rows)
+
+    def clear(self) -> None:
+        self._end_edit()
+        for slot in range(len(self._slot_pos)):
+            self._hide_slot(slot)
+
+    def _on_scroll(self, first, last) -> None:
+        self._vbar.set(first, last)
+        self._layout()
+
+    def _on_resize(self, event=None) -> None:
+        self._col_width = self._canvas.winfo_width() / max(self._num_cols, 1)
+        self._end_edit()
+        self._reset_slots()
+        self._resize_scrollregion()
+        self._layout()
+
+    def _on_wheel(self, event) -> None:
+        if event.num == 4 or event.delta > 0:
+            self._canvas.yview_scroll(-4, 'units')
+        else:
+            self._canvas.yview_scroll(4, 'units')
+
+    def _cell_at(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        first, last = self._window()
+        pos = int(self._canvas.canvasy(y) // self._row_height)
+        col = int(self._canvas.canvasx(x) // self._col_width) if self._col_width else 0
+        if 0 <= pos < last - first and 0 <= col < self._num_cols:
+            return pos, col
+        return None
+
+    def _on_double_click(self, event) -> None:
+        cell = self._cell_at(event.x, event.y)
+        if cell is None or self.toggle_group(self._window()[0] + cell[0]):
+            return
+        if not self._read_only:
+            self.begin_edit(*cell)
+
+    def begin_edit(self, pos: int, col: int) -> None:
+        # a single floating Entry is placed over the cell being edited
+        self._end_edit()
+        self._editing = (pos, col)
+        self._editing_index = self._shown_index(self._window()[0] + pos)
+        self._editor_var.set(self._model.texts(self._window()[0] + pos)[col])
+        self._editor_item = self._canvas.create_window(col * self._col_width, pos * self._row_height,
+                                                       window=self._editor, anchor='nw',
+                                                       width=self._col_width, height=self._row_height)
+        self._editor.focus_set()
+        self._editor.select_range(0, 'end')
+
+    def _end_edit(self) -> None:
+        if self._editor_item is not None:
+            self._canvas.delete(self._editor_item)
+            self._editor_item = None
+        self._editing = None
+        self._editing_index = None
+
+    def _drop_typed(self, moved: Optional[int]) -> None:
+        # the editor belongs to the row it was opened on: an insert or a sort that puts
+        # another row at its position closes it, instead of saving into that row
+        if self._editing is None:
+            return
+        index = self._editing_index
+        if (self._shown_index(self._window()[0] + self._editing[0]) != index
+                or (moved is not None and index is not None and index >= moved)):
+            self._end_edit()
+            self._canvas.focus_set()
+
+    @timed('save_cell')
+    def save_cell(self, event, grid: int, col: int):
+        # changes still waiting for the repaint may have moved the row away
+        self._flush()
+        if self._editing is None:
+            return
+        if self._commit_cell(self._window()[0] + grid, col, self._editor_var.get()):
+            self._end_edit()
+            self._canvas.focus_set()
+
+    def cancel_edit(self, event, grid: int, col: int):
+        self._end_edit()
+        self._canvas.focus_set()
+
+    def _style_font(self, family=None, size=None, weight=None):
+        # every text item shares the named font, one configure restyles the table
+        super()._style_font(family, size, weight)
+        self._row_height = self._font.metrics('linespace') + 4 + 2 * self._border_width
+        self._canvas.configure(yscrollincrement=max(self._row_height // 4, 1))
+        self._on_resize()
+
+    def _style_border(self, width=None, color=None):
+        if width:
+            self._border_width = width
+        if color:
+            self._border_color = color
+        self._canvas.itemconfigure('cellbg', outline=self._border_color, width=self._border_width)
+        self._canvas.itemconfigure('colline', fill=self._border_color, width=self._border_width)
+
+    def _update_style_config(self):
+        super()._update_style_config()
+        # the parity tags recolour every slot in four calls
+        self._canvas.configure(bg=self._even_row_bg)
+        self._canvas.itemconfigure('even_bg', fill=self._even_row_bg)
+        self._canvas.itemconfigure('odd_bg', fill=self._odd_row_bg)
+        self._canvas.itemconfigure('even_fg', fill=self._even_row_fg)
+        self._canvas.itemconfigure('odd_fg', fill=self._odd_row_fg)
+
+    def _apply_read_only(self) -> None:
+        if self._read_only:
+            self._end_edit()
+
+
+# Example usage
+if __name__ == '__main__':
+    root = Tk()
+    root.title('Canvas Grid View')
+    root.rowconfigure(0, weight=1)
+    root.columnconfigure(0, weight=1)
+
+    __data = DataSourceVar(value=[{'id': i, 'name': f'row {i}', 'even': i % 2 == 0} for i in range(100000)])
+    table = CanvasGridView(root, __data, 20)
+    table.grid(row=0, column=0, sticky='nsew')
+
+    root.mainloop()
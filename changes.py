@@ -0,0 +1,34 @@
+from typing import Any, NamedTuple, Optional
+
+
+class Change:
+    # [start, stop) holds every position whose row may differ after the mutation;
+    # insert, pop and remove shift rows, so they report up to the end of the list.
+    # old is what the mutation took away, when known: the removed row for pop and remove;
+    # for setitem, per edited row, a dict of the previous values of the columns that may
+    # have changed (the replaced row itself when it has them all). Merged (batched)
+    # changes, touch() and a row put back after edits in place don't carry it.
+    __slots__ = ('action', 'start', 'stop', 'old')
+
+    def __init__(self, action: str, start: int, stop: int, old: Optional[list] = None):
+        self.action = action
+        self.start = start
+        self.stop = stop
+        self.old = old
+
+    def __repr__(self):
+        return f'Change({self.action!r}, {self.start}, {self.stop})'
+
+    def merge(self, other: 'Change') -> 'Change':
+        if self.action in ('append', 'extend') and other.action in ('append', 'extend') and self.stop == other.start:
+            return Change('extend', self.start, other.stop)
+        return Change('batch', min(self.start, other.start), max(self.stop, other.stop))
+
+
+class CellChange(NamedTuple):
+    # a cell edited since the last DataSourceVar.commit(): the row as it is now, the
+    # column, the committed value and the current one
+    row: Any
+    column: str
+    old: Any
+    new: Any
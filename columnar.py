@@ -0,0 +1,229 @@
+from array import array
+from collections.abc import Mapping
+from itertools import compress
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+import sys
+
+# typed columns live in an array, None values are flagged in a parallel null mask
+_TYPECODES = {bool: 'b', int: 'q', float: 'd'}
+
+
+class RowView(Mapping):
+    # A row of a ColumnStore read in place; it follows the position it was taken at,
+    # so hold on to dicts (dict(view)) rather than views across insertions and removals.
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store: 'ColumnStore', index: int):
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, column: str):
+        return self._store.get_value(self._index, column)
+
+    def __setitem__(self, column: str, value):
+        self._store.set_value(self._index, column, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.headers)
+
+    def __len__(self) -> int:
+        return len(self._store.headers)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ColumnStore:
+    # List-of-rows API over one array (or plain list) per header. Key strings are stored
+    # once instead of once per row, and numeric columns take 8 bytes per value.
+    def __init__(self, rows: Iterable[Mapping] = (), headers: Optional[Sequence[str]] = None,
+                 types: Optional[Dict[str, type]] = None):
+        rows = rows if isinstance(rows, list) else list(rows)
+        if headers is None:
+            headers = list(rows[0].keys()) if rows else list(types or ())
+        self.headers = list(headers)
+        self._size = len(rows)
+        self._columns = {}
+        self._nulls = {}
+        self._kinds = {}
+        types = types or {}
+        for header in self.headers:
+            values = [row[header] for row in rows]
+            self._set_column(header, types.get(header) or self._infer(values), values)
+
+    @staticmethod
+    def _infer(values: list) -> Optional[type]:
+        kinds = set(map(type, values))
+        kinds.discard(type(None))
+        if len(kinds) == 1:
+            kind = kinds.pop()
+            if kind in _TYPECODES:
+                return kind
+        # ints among floats make a float column, as schema.infer_column has it
+        return float if kinds == {int, float} else None
+
+    def _set_column(self, header: str, kind: Optional[type], values: list) -> None:
+        if kind in _TYPECODES:
+            try:
+                self._columns[header] = array(_TYPECODES[kind], [0 if value is None else value for value in values])
+                self._nulls[header] = bytearray(value is None for value in values)
+                self._kinds[header] = kind
+                return
+            except (OverflowError, TypeError):
+                pass
+        self._columns[header] = list(values)
+        self._nulls.pop(header, None)
+        self._kinds[header] = None
+
+    def _degrade(self, header: str) -> None:
+        # a value the typed array can't hold turns the column into a plain list
+        self._set_column(header, None, self.column(header))
+
+    def _fits(self, header: str, value) -> bool:
+        # an int goes into a float column as a float; bools stay out of number columns
+        kind = self._kinds[header]
+        return value is None or type(value) is kind or (kind is float and type(value) is int)
+
+    def column(self, header: str) -> list:
+        values = self._columns[header].tolist() if self._kinds[header] else list(self._columns[header])
+        if self._kinds[header] is bool:
+            values = [bool(value) for value in values]
+        nulls = self._nulls.get(header)
+        if nulls is not None:
+            for index in compress(range(self._size), nulls):
+                values[index] = None
+        return values
+
+    def get_value(self, index: int, header: str):
+        nulls = self._nulls.get(header)
+        if nulls is not None and nulls[index]:
+            return None
+        value = self._columns[header][index]
+        return bool(value) if self._kinds[header] is bool else value
+
+    def set_value(self, index: int, header: str, value) -> None:
+        if self._kinds[header] and not self._fits(header, value):
+            self._degrade(header)
+        if self._kinds[header]:
+            try:
+                self._columns[header][index] = 0 if value is None else value
+            except OverflowError:
+                self._degrade(header)
+                self._columns[header][index] = value
+                return
+            self._nulls[header][index] = value is None
+        else:
+            self._columns[header][index] = value
+
+    def _position(self, index: int) -> int:
+        return range(self._size)[index]
+
+    def append(self, row: Mapping) -> None:
+        self.insert(self._size, row)
+
+    def insert(self, index: int, row: Mapping) -> None:
+        index = max(self._size + index, 0) if index < 0 else min(index, self._size)
+        # read the whole row first so a missing header leaves the columns untouched
+        for header, value in [(header, row[header]) for header in self.headers]:
+            if self._kinds[header] and not self._fits(header, value):
+                self._degrade(header)
+            if self._kinds[header]:
+                try:
+                    self._columns[header].insert(index, 0 if value is None else value)
+                except OverflowError:
+                    self._degrade(header)
+                    self._columns[header].insert(index, value)
+                    continue
+                self._nulls[header].insert(index, value is None)
+            else:
+                self._columns[header].insert(index, value)
+        self._size += 1
+
+    def extend(self, rows: Iterable[Mapping]) -> None:
+        rows = rows if isinstance(rows, list) else list(rows)
+        columns = [(header, [row[header] for row in rows]) for header in self.headers]
+        for header, values in columns:
+            if self._kinds[header] and not all(self._fits(header, value) for value in values):
+                self._degrade(header)
+            if self._kinds[header]:
+                try:
+                    column = self._columns[header]
+                    column.extend(array(column.typecode, [0 if value is None else value for value in values]))
+                except OverflowError:
+                    self._degrade(header)
+                    self._columns[header].extend(values)
+                    continue
+                self._nulls[header].extend(value is None for value in values)
+            else:
+                self._columns[header].extend(values)
+        self._size += len(rows)
+
+    def pop(self, index: int = -1) -> dict:
+        index = self._position(index)
+        row = dict(RowView(self, index))
+        del self[index]
+        return row
+
+    def remove(self, row: Mapping) -> None:
+        del self[self.index(row)]
+
+    def index(self, row: Mapping, start: int = 0, stop: int = sys.maxsize) -> int:
+        for index in range(self._size)[start:stop]:
+            if RowView(self, index) == row:
+                return index
+        raise ValueError(f'{row!r} is not in ColumnStore')
+
+    def count(self, row: Mapping) -> int:
+        return sum(1 for view in self if view == row)
+
+    def _permute(self, order: List[int]) -> None:
+        for header in self.headers:
+            values = self._columns[header]
+            if self._kinds[header]:
+                self._columns[header] = array(values.typecode, map(values.__getitem__, order))
+                self._nulls[header] = bytearray(map(self._nulls[header].__getitem__, order))
+            else:
+                self._columns[header] = [values[index] for index in order]
+
+    def sort(self, key=None, reverse: bool = False) -> None:
+        views = list(self)
+        order = sorted(range(self._size), key=lambda index: views[index] if key is None else key(views[index]),
+                       reverse=reverse)
+        self._permute(order)
+
+    def reverse(self) -> None:
+        for header in self.headers:
+            self._columns[header].reverse()
+            if header in self._nulls:
+                self._nulls[header].reverse()
+
+    def clear(self) -> None:
+        for header in self.headers:
+            del self._columns[header][:]
+            if header in self._nulls:
+                del self._nulls[header][:]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[RowView]:
+        return (RowView(self, index) for index in range(self._size))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [RowView(self, position) for position in range(self._size)[index]]
+        return RowView(self, self._position(index))
+
+    def __setitem__(self, index: int, row: Mapping) -> None:
+        index = self._position(index)
+        for header in self.headers:
+            self.set_value(index, header, row[header])
+
+    def __delitem__(self, index: int) -> None:
+        index = self._position(index)
+        for header in self.headers:
+            del self._columns[header][index]
+            if header in self._nulls:
+                del self._nulls[header][index]
+        self._size -= 1
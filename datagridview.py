@@ -1,37 +1,97 @@
-from tkinter import Frame, IntVar, StringVar, Entry, Label, DISABLED, NORMAL, Tk
+import asyncio
+from tkinter import Frame, IntVar, StringVar, Label, DISABLED, NORMAL, Tk
+from tkinter.font import Font
 from tkinter.messagebox import showwarning
+from tkinter.ttk import Entry, Progressbar, Style
+from changes import Change
 from datasource import DataSourceVar
 from navigator import Navigator
-from typing import List
+from filters import Filter
+from providers import DataProvider
+from model import GridModel, SortSnapshot, SortSpec
+from parallel import ProcessJobs
+from asyncbridge import AsyncBridge
+from aggregates import FUNCTIONS
+from schema import Schema
+from instrumentation import Stats, timed
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from itertools import count
+
+# every grid gets its own ttk style names, so restyling one leaves the others alone
+_grid_ids = count(1)
+# keys a read-only cell still reacts to
+_NAVIGATION_KEYS = {'Left', 'Right', 'Home', 'End', 'Tab', 'ISO_Left_Tab', 'Return', 'Escape',
+                    'Shift_L', 'Shift_R', 'Control_L', 'Control_R'}
+_EDIT_EVENTS = ('<Key>', '<<Paste>>', '<<Cut>>', '<<Clear>>', '<<PasteSelection>>')
 
 
 class DataGridView(Frame):
-    def __init__(self, master, data: DataSourceVar, max_rows: int, read_only=False,
+    # Paints a GridModel (model.py) page by page. Paging, sorting, filtering, formatting
+    # and lookups are the model's; the grid turns them into Entry cells and model changes
+    # into repaints. data may also be a DataSourceVar or a DataProvider, wrapped in a new model.
+    def __init__(self, master, data: Union[DataSourceVar, DataProvider, GridModel], max_rows: int, read_only=False,
                  headers_bg='#000000', headers_fg='#ffffff',
                  even_row_bg='#ffffff', even_row_fg='#000000',
-                 odd_row_bg='#eeeeee', odd_row_fg='#000000',
-                 true_string='True', false_string='False'):
+                 odd_row_bg='#eeeeee', odd_row_fg='#000000', read_only_fg='#707070',
+                 true_string='True', false_string='False', cache_pages=16, prefetch_pages=2,
+                 schema: Schema = None, headers: Optional[Sequence[str]] = None):
         super().__init__(master)
-        self._headers = list(data[0].keys())
         self.master = master
         self._max_rows = max_rows
-        self._read_only = read_only
-        self._data = data
-        self._data.callable(self.update, 'all', True)
-        self._sorted_data = data.get()
-        self._page = IntVar(self, 0)
-        self._num_rows = len(data)
-        self._num_cols = len(data[0])
         self._true_string = true_string
         self._false_string = false_string
+        self._schema = schema
+        self._cache_pages = cache_pages
+        self._model = None
+        # a model made here is closed along with the grid, one passed in may serve other views
+        self._owns_model = False
+        # process pool for sorting and filtering big tables, see use_process_pool()
+        self._jobs = None
+        self._jobs_min_rows = 0
+        self._sorting = None
+        if isinstance(data, GridModel):
+            if data.page_size != max_rows:
+                raise ValueError(f'max_rows ({max_rows}) differs from the page size of the model ({data.page_size})')
+            self._set_model(data)
+        else:
+            self._set_model(GridModel(data, max_rows, schema, true_string, false_string, cache_pages, headers), True)
+        self.stats = self._model.stats
+        # providers are read-only views, edits go to the database or file itself
+        self._read_only = read_only or self._provider is not None
+        self._page = IntVar(self, 0)
+        self._num_rows = self._model.row_count()
+        self._last_page = self._model.last_page
+        self._num_cols = len(self._headers)
         self._cells = []
+        self._entries = []
+        self._texts = []
+        self._filled = []
+        # grid rows typed into since they were painted, their cells may not show _texts; by
+        # the source index they showed when the typing started
+        self._typed = {}
+        self._pending = None
+        self._refresh_id = None
+        # callbacks waiting for the next repaint, see refreshed()
+        self._paint_waiters = []
+        # how many pages on each side of the shown one the model formats ahead while idle
+        self._prefetch_pages = min(prefetch_pages, (cache_pages - 1) // 2)
+        self._prefetch_id = None
+        self._prefetch_anchor = 0
+        self._prefetch_step = 1
+        self._progress = None
+        self._foot = None
+        self._footer_functions = None
+        self._footer_labels = []
+        self._footer_texts = []
         self._head = Frame(self)
         self._body = Frame(self)
-        self._nav = Navigator(self, self._round(self._num_rows/self._max_rows), self._page)
+        self._nav = Navigator(self, self._last_page, self._page)
         self._nav.trace(self.update, True)
         self._head.grid(row=0, column=0, sticky='nswe')
         self._body.grid(row=1, column=0, sticky='nswe')
-        self._nav.grid(row=2, column=0, sticky='nswe')
+        # row 2 is the aggregates footer, see show_footer()
+        self._nav.grid(row=3, column=0, sticky='nswe')
 
         # style variables:
         self._headers_bg = headers_bg
@@ -40,18 +100,27 @@ class DataGridView(Frame):
         self._even_row_fg = even_row_fg
         self._odd_row_bg = odd_row_bg
         self._odd_row_fg = odd_row_fg
+        self._read_only_fg = read_only_fg
         self._font_family = 'Arial'
         self._font_size = 10
         self._font_weight = 'normal'
         self._border_width = 1
         self._border_color = 'black'
+        # the cells share one named font and one ttk style per row parity, restyling
+        # configures those objects instead of every cell
+        self._font = Font(self, family=self._font_family, size=self._font_size, weight=self._font_weight)
+        self._style_name = f'DataGrid{next(_grid_ids)}'
+        self._ttk_style = Style(self)
+        self._cell_tag = f'{self._style_name}Cell'
+        self._configure_styles()
+        # styles belong to a theme, the new one needs them too
+        self.bind('<<ThemeChanged>>', lambda event: self._configure_styles(), add=True)
 
-        self._sort_order = None
         # Set the row and column weights
         self.columnconfigure(0, weight=1)
         self.rowconfigure(0, weight=1)
         self.rowconfigure(1, weight=self._max_rows)
-        self.rowconfigure(2, weight=1)
+        self.rowconfigure(3, weight=1)
         self._head.rowconfigure(0, weight=1)
         for i in range(self._num_cols):
             self._head.columnconfigure(i, weight=2)
@@ -60,10 +129,10 @@ class DataGridView(Frame):
             self._body.rowconfigure(i, weight=1)
 
         # Create the table header
-        for col, key in enumerate(self._data[0].keys()):
+        for col, key in enumerate(self._headers):
             label = Label(self._head,
                              text=key,
-                             font=(self._font_family, self._font_size, self._font_weight),
+                             font=self._font,
                              bg=self._headers_bg,
                              fg=self._headers_fg,
                              highlightthickness=self._border_width,
@@ -71,150 +140,350 @@ class DataGridView(Frame):
                              relief='raised', width=20)
             label.grid(row=0, column=col, sticky='nswe')
             label.bind('<Button-1>', lambda event, col_=col: self.sort_column(col_))
+            label.bind('<Shift-Button-1>', lambda event, col_=col: self.sort_column(col_, add=True))
 
         self._create_table()
-
+        self._apply_read_only()
+        self._schedule_prefetch()
+
+    @property
+    def model(self) -> GridModel:
+        return self._model
+
+    def _set_model(self, model: GridModel, owned=False) -> None:
+        if self._model is not None:
+            self._model.unsubscribe(self._on_change)
+            if self._owns_model:
+                self._model.close()
+        self._owns_model = owned
+        if self._jobs is not None:
+            # results for the old model would be applied to the new one
+            self._jobs.cancel()
+            self._sorting = None
+        self._model = model
+        model.subscribe(self._on_change)
+        self._data = model.data
+        self._provider = model.provider
+        self._headers = model.headers
+
+    @property
+    def _sort_order(self):
+        # cget('sort_order'); the order itself lives in the model
+        return self._model.sort_order
+
+    @timed('create_table')
     def _create_table(self):
         self._cells = []
+        self._entries = []
+        self._texts = []
+        self._filled = []
         # Create the table _cells
-        for grid_row, row in enumerate(list(range(self._max_rows * self._page.get(), self._max_rows * (self._page.get() + 1)))):
+        first, last = self._window()
+        for grid_row, row in enumerate(range(first, last)):
             _test_ = row < self._num_rows
             row_cells = []
+            row_entries = []
+            row_texts = self._model.texts(row) if _test_ else [''] * self._num_cols
             is_even = grid_row % 2 == 0
             for col in range(self._num_cols):
-                cell_value = StringVar(
-                    master=self._body,
-                    value=self._revise_values(self._data[row][list(self._data[row].keys())[col]]) if _test_ else None)
-                cell_entry = Entry(self._body, textvariable=cell_value, justify='center',
-                                      font=(self._font_family, self._font_size, self._font_weight),
-                                      bg=self._even_row_bg if is_even else self._odd_row_bg,
-                                      fg=self._even_row_fg if is_even else self._odd_row_fg,
-                                      highlightthickness=self._border_width,
-                                      highlightcolor=self._border_color,
-                                      state=DISABLED if self._read_only or not _test_ else NORMAL)
+                cell_value = StringVar(master=self._body, value=row_texts[col])
+                cell_entry = Entry(self._body, textvariable=cell_value, justify='center', font=self._font,
+                                   style=self._parity_style(is_even),
+                                   state=DISABLED if not _test_ else NORMAL)
+                cell_entry.bindtags((str(cell_entry), self._cell_tag) + tuple(cell_entry.bindtags()[1:]))
                 cell_entry.grid(row=grid_row, column=col, sticky='nswe')
                 cell_entry.bind('<Return>', lambda event, row_=grid_row, col_=col: self.save_cell(event, row_, col_))
                 cell_entry.bind('<Escape>', lambda event, row_=grid_row, col_=col: self.cancel_edit(event, row_, col_))
+                cell_entry.bind('<Double-Button-1>', lambda event, row_=grid_row: self._on_cell_double_click(row_))
+                cell_entry.bind('<Key>', lambda event, row_=grid_row: self._on_key(row_))
                 row_cells.append(cell_value)
+                row_entries.append(cell_entry)
             self._cells.append(row_cells)
-
-    def _revise_values(self, value, reverse=False, none_type=False):
-        if not reverse:
-            if isinstance(value, bool):
-                return self._true_string if value else self._false_string
-            if value is None:
-                return None if none_type else ''
-            return value
-        else:
-            if value is None or value.strip() == '':
-                return None
-            elif isinstance(value, str) and value.strip().lower() == self._true_string.lower():
-                return True
-            elif isinstance(value, str) and value.strip().lower() == self._false_string.lower():
-                return False
-            else:
-                try:
-                    return int(value)
-                except:
-                    return value
-
-    def _get_row(self, grid: int) -> int:
-        row = grid
-        for page in range(self._page.get()):
-            row += self._max_rows
-        return row
-
+            self._entries.append(row_entries)
+            self._texts.append(row_texts)
+            self._filled.append(_test_)
+
+    def _on_key(self, grid: int) -> None:
+        if grid not in self._typed:
+            self._typed[grid] = self._shown_index(self._window()[0] + grid)
+
+    def _shown_index(self, pos: int) -> Optional[int]:
+        # source index of the row at pos, None past the last row; a provider's rows are
+        # known by position
+        if pos >= self._num_rows:
+            return None
+        return pos if self._provider is not None else self._model.source_index(pos)
+
+    def _current_page(self) -> int:
+        return self._model.page
+
+    def _schedule_prefetch(self) -> None:
+        if self._prefetch_id is None and self._prefetch_pages:
+            self._prefetch_id = self.after_idle(self._prefetch)
+
+    def _prefetch(self) -> None:
+        # format one neighbouring page per idle round, the direction the user moves in first
+        self._prefetch_id = None
+        self._flush()
+        page = self._current_page()
+        if page != self._prefetch_anchor:
+            self._prefetch_step = 1 if page > self._prefetch_anchor else -1
+            self._prefetch_anchor = page
+        last_page = self._model.last_page
+        for distance in range(1, self._prefetch_pages + 1):
+            for target in (page + self._prefetch_step * distance, page - self._prefetch_step * distance):
+                if 0 <= target <= last_page and not self._model.is_formatted(target):
+                    self._model.format_page(target)
+                    self._schedule_prefetch()
+                    return
+
+    def _on_cell_double_click(self, grid: int) -> None:
+        self.toggle_group(self._window()[0] + grid)
+
+    @timed('save_cell')
     def save_cell(self, event, grid: int, col: int):
-        row = self._get_row(grid)
-        value = self._revise_values(self._cells[grid][col].get(), True)
-        __value = self._data[row][self._headers[col]]
-        if type(value) != type(__value):
-            showwarning(title="Warning!",
-                        message=f"Incorrect type! Please insert a valid value.\n\nCOD: <{type(value)}{type(__value)}>",
-                        option_1="Cancel")
+        # Return on a group header row opens or closes the group
+        if self.toggle_group(self._window()[0] + grid) or self._read_only:
             return
-        self._data[row][list(self._data[row].keys())[col]] = value
-        self.master.focus()
+        if self._commit_cell(self._window()[0] + grid, col, self._cells[grid][col].get()):
+            self.master.focus()
+
+    def _commit_cell(self, pos: int, col: int, text: str) -> bool:
+        try:
+            self._model.edit(pos, col, text)
+        except ValueError as error:
+            showwarning(title="Warning!", message=str(error), option_1="Cancel")
+            return False
+        # show the edit (and where a sorted row moved to) right away
+        self._flush()
+        return True
 
     def cancel_edit(self, event, grid: int, col: int):
-        row = self._get_row(grid)
-        value = self._data[row][list(self._data[row].keys())[col]]
-        self._cells[grid][col].set(self._revise_values(value))
+        self._cells[grid][col].set(self._texts[grid][col])
         self.master.focus()
 
     def clear(self) -> None:
-        for row in range(self._max_rows):
-            for col in range(self._num_cols):
-                cell_value = self._cells[row][col]
-                cell_value.set('')
-        if not self._read_only:
-            __widget = self._body.grid_slaves()
-            for widget in __widget:
-                if isinstance(widget, Entry):
-                    widget.configure(state=DISABLED)
-
-    @staticmethod
-    def _round(decimal: float):
-        string = str(decimal)
-        sub = string[string.index('.') + 1:]
-        integer = int(sub)
-        if integer != 0:
-            return int(string[:string.index('.')]) + 1
-        else:
-            return int(string[:string.index('.')])
+        for grid_row in range(self._max_rows):
+            self._paint_row(grid_row, None, True)
 
     def _return_cells(self) -> List[Entry]:
-        __widget = self._body.grid_slaves()
-        __entry_list = []
-        for widget in __widget:
-            if isinstance(widget, Entry):
-                __entry_list.append(widget)
-        __entry_list.reverse()
-        return __entry_list
-
+        return [entry for row_entries in self._entries for entry in row_entries]
+
+    def _paint_row(self, grid_row: int, texts: Optional[List[str]], force=False) -> None:
+        # only touch the Tcl side for cells whose text or state actually changed
+        filled = texts is not None
+        texts = texts if filled else [''] * self._num_cols
+        painted = self._texts[grid_row]
+        cells = self._cells[grid_row]
+        sets = 0
+        for col, text in enumerate(texts):
+            if force or painted[col] != text:
+                cells[col].set(text)
+                sets += 1
+        self._texts[grid_row] = texts
+        self.stats.count('tk.set', sets)
+        if force or filled != self._filled[grid_row]:
+            state = DISABLED if not filled else NORMAL
+            for entry in self._entries[grid_row]:
+                entry.configure(state=state)
+            self._filled[grid_row] = filled
+            self.stats.count('tk.configure', len(self._entries[grid_row]))
+
+    def _window(self) -> Tuple[int, int]:
+        # range of row positions the table can show right now
+        return self._model.window()
+
+    def _paint_rows(self, first: int, last: int, force=False) -> None:
+        offset = self._model.window()[0]
+        for grid_row in range(max(first - offset, 0), min(last - offset, self._max_rows)):
+            row = offset + grid_row
+            self._paint_row(grid_row, self._model.texts(row) if row < self._num_rows else None, force)
+
+    def _on_change(self, change: Change) -> None:
+        # the model has caught up with the change; collapse every change of this
+        # event-loop turn into a single repaint
+        if self._pending is None:
+            self._pending = change
+        else:
+            self._pending = self._pending.merge(change)
+        if self._refresh_id is None:
+            self._refresh_id = self.after_idle(self._flush)
+
+    def _cancel_flush(self) -> None:
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+            self._refresh_id = None
+        self._pending = None
+
+    @timed('repaint')
+    def _flush(self) -> None:
+        change = self._pending
+        self._cancel_flush()
+        if change is None:
+            return
+        if self._model.page != self._page.get():
+            # the model was filtered (or paged) without going through the navigator
+            self._page.set(self._model.page)
+            self._nav.config(current=self._model.page)
+        self._sync_rows()
+        # source indices from change.start on name other rows after anything but an append
+        # or an edit; a sort or a filter keeps them
+        self._drop_typed(None if change.action in ('append', 'extend', 'setitem', 'reset') else change.start)
+        if change.action != 'reset' and self._model.is_identity():
+            self._paint_rows(change.start, change.stop)
+        else:
+            # positions moved under the permutation or the filter, diff the whole page
+            self._paint_rows(*self._window())
+        self._paint_footer()
+        self._schedule_prefetch()
+        self._painted()
+
+    def _drop_typed(self, moved: Optional[int]) -> None:
+        # a grid row typed into that shows another source row now loses what was typed,
+        # Return would save it into that row
+        if not self._typed:
+            return
+        offset = self._window()[0]
+        for grid_row, index in list(self._typed.items()):
+            pos = offset + grid_row
+            if self._shown_index(pos) != index or (moved is not None and index is not None and index >= moved):
+                del self._typed[grid_row]
+                self._texts[grid_row] = [None] * self._num_cols
+                self._paint_rows(pos, pos + 1)
+
+    def _sync_rows(self) -> None:
+        self._num_rows = self._model.row_count()
+        last_page = self._model.last_page
+        if last_page != self._last_page:
+            self._nav.config(last_page=last_page)
+            self._last_page = last_page
+
+    @timed('update')
     def update(self, *args, **kwargs) -> None:
+        # the whole page is diffed against what is painted below, a pending partial repaint
+        # is moot; force=True sets every cell again, for when the cells themselves changed
+        self._cancel_flush()
+        force = kwargs.pop('force', False)
         if 'page' in kwargs:
             self._page.set(kwargs.pop('page'))
-        self._num_rows = len(self._data)
-        self.clear()
-        entry_list = self._return_cells()
-        for grid_row, row in enumerate(list(range(self._max_rows * self._page.get(), self._max_rows * (self._page.get() + 1)))):
-            _test_ = row < self._num_rows
-            for col in range(self._num_cols):
-                this_entry = entry_list[grid_row * self._num_cols + col]
-                this_entry.configure(state=NORMAL)
-                self._cells[grid_row][col].set(
-                    self._revise_values(self._sorted_data[row][list(self._sorted_data[row].keys())[col]]) if _test_ else '')
-                this_entry.configure(state=DISABLED if self._read_only or not _test_ else NORMAL)
-
-    def sort_column(self, col):
-        if self._sort_order == col:
-            self._sort_order = None
-            reverse = True
+        page = self._model.set_page(self._page.get())
+        if page != self._page.get():
+            self._page.set(page)
+            self._nav.config(current=page)
+        self._sync_rows()
+        # an edit that wasn't saved is dropped, as it would otherwise end up in another row
+        typed, self._typed = self._typed, {}
+        for grid_row in typed:
+            self._texts[grid_row] = [None] * self._num_cols
+        self._paint_rows(*self._window(), force)
+        self._paint_footer()
+        self._schedule_prefetch()
+        self._painted()
+
+    def _painted(self) -> None:
+        waiters, self._paint_waiters = self._paint_waiters, []
+        for callback in waiters:
+            callback()
+
+    def _when_painted(self, callback: Callable[[], None]) -> None:
+        # callback() once the changes the model has sent so far are on screen
+        if self._refresh_id is None:
+            callback()
         else:
-            self._sort_order = col
-            reverse = False
-        # Sort the _data by the selected column
-        self._sorted_data = sorted(
-            self._data,
-            key=lambda row_:
-                (self._revise_values(row_[self._headers[col]], none_type=True) is not None,
-                 self._revise_values(row_[self._headers[col]], none_type=True)),
-            reverse=not reverse
-        )
-
-        # Re-create the cell widgets with the sorted _data
-        for row, row_data in enumerate(self._sorted_data):
-            if row == self._max_rows:
-                break
-            for col, key in enumerate(self._headers):
-                self._cells[row][col].set(self._revise_values(row_data[key]))
+            self._paint_waiters.append(callback)
+
+    async def refreshed(self) -> None:
+        # from a coroutine on the loop of an asyncbridge.AsyncBridge: returns once the
+        # changes made before the call are painted
+        bridge = AsyncBridge.current()
+        future = asyncio.get_running_loop().create_future()
+        bridge.call_in_tk(self._when_painted, lambda: bridge.resolve(future))
+        await future
+
+    def reload(self) -> None:
+        # the provider's rows changed behind the table's back, fetch the shown page again
+        self._model.reload()
+        self.update()
+
+    @timed('sort_column')
+    def sort_column(self, col: SortSpec, add=False):
+        if self._offloads():
+            # toggles and shift-clicks build on the order still being sorted
+            sort_order = self._model.next_sort_order(col, add, self._sorting)
+            if sort_order is not None:
+                self._sort_in_pool(self._model.sort_snapshot(sort_order))
+                return
+            col = None
+        if self._jobs is not None:
+            self._jobs.cancel('sort')
+            self._sorting = None
+        self._model.sort(col, add)
+
+        # Repaint the current page with the sorted _data
+        self.update()
+
+    def _sort_in_pool(self, snapshot: SortSnapshot, tries: int = 2) -> None:
+        # the page keeps its old order until the workers are done; when the data changed
+        # meanwhile the snapshot is sorted again, and after that sorted here
+        self._sorting = snapshot.sort_order
+
+        def done(order: List[int]) -> None:
+            if self._model.apply_order(snapshot, order):
+                self._sorting = None
+                self.update()
+            elif tries > 1:
+                self._sort_in_pool(self._model.sort_snapshot(snapshot.sort_order), tries - 1)
+            else:
+                self._sorting = None
+                self._model.sort(snapshot.sort_order)
+                self.update()
+
+        self._jobs.sort(snapshot.columns, snapshot.reverses, done)
+
+    def use_process_pool(self, executor: Optional[Executor] = None, min_rows: int = 1_000_000,
+                         chunk_rows: int = 250_000) -> ProcessJobs:
+        # sort, filter and group tables of min_rows or more on a process pool (a new one when
+        # executor is None), see parallel.ProcessJobs; clicking another header while a
+        # sort runs cancels it
+        if self._jobs is not None:
+            self._jobs.shutdown()
+        self._jobs = ProcessJobs(self, executor, chunk_rows, on_error=self._job_failed)
+        self._jobs_min_rows = min_rows
+        return self._jobs
+
+    def _offloads(self) -> bool:
+        return self._jobs is not None and self._provider is None and len(self._data) >= self._jobs_min_rows
+
+    def _job_failed(self, error: BaseException) -> None:
+        if not self._jobs.pending('sort'):
+            self._sorting = None
+        showwarning(title='Warning!', message=f'{type(error).__name__}: {error}')
+
+    def destroy(self) -> None:
+        if self._jobs is not None:
+            self._jobs.shutdown()
+        for after_id in (self._refresh_id, self._prefetch_id):
+            if after_id is not None:
+                self.after_cancel(after_id)
+        self._refresh_id = self._prefetch_id = None
+        # the data and the model would otherwise keep calling (and keeping alive) the grid
+        self._model.unsubscribe(self._on_change)
+        if self._owns_model:
+            self._model.close()
+        # nothing is going to be painted any more, don't keep refreshed() waiting
+        self._painted()
+        super().destroy()
 
     def cget(self, key: str):
         return getattr(self, '_' + key)
 
     def configure(self, **kwargs):
         for key, value in kwargs.items():
+            if key == '_sort_order':
+                # sort the data based on the new sort order
+                if value != self._model.sort_order:
+                    self.sort_column(value if value is None or isinstance(value, (list, tuple)) else [(value, 'asc')])
+                continue
             # get the current value of the variable
             current_value = getattr(self, key)
             # check if the new value is different from the current value
@@ -224,35 +493,58 @@ class DataGridView(Frame):
 
                 # update the table widget based on the variable that was changed
                 if key == '_read_only':
-                    # update the state of the Entry widgets
-                    __widgets = self._return_cells()
-                    for index, cell in enumerate(__widgets):
-                        __row = index // self._num_cols
-                        __col = index % self._num_cols
-                        if value:
-                            cell.config(state='readonly')
-                            cell.unbind('<Return>')
-                            cell.unbind('<Escape>')
-                        else:
-                            cell.config(state='normal')
-                            cell.bind('<Return>', lambda event, row=__row, col=__col: self.save_cell(event, row, col))
-                            cell.bind('<Escape>', lambda event, row=__row, col=__col: self.cancel_edit(event, row, col))
+                    self._apply_read_only()
                 elif key == '_data':
-                    # update the number of rows and columns
-                    self._num_rows = len(value)
+                    # a new model for the new rows, with the same settings
+                    self._set_model(GridModel(value, self._max_rows, self._schema, self._true_string,
+                                              self._false_string, self._cache_pages), True)
+                    self._model.stats = self.stats
                     self._num_cols = len(self._headers)
                     # update the table widget with the new data
-                    self.update()
+                    self.update(force=True)
                 elif key == '_headers':
-                    # update the number of rows and columns
-                    self._num_rows = len(self._data)
+                    self._model.set_headers(value)
                     self._num_cols = len(value)
                     # update the table widget with the new headers
-                    self.update()
-                elif key == '_sort_order':
-                    self._sort_order = value
-                    # sort the data based on the new sort order
-                    self.sort_column(self._sort_order)
+                    self.update(force=True)
+
+    def _parity_style(self, even: bool) -> str:
+        return f'{self._style_name}.{"Even" if even else "Odd"}.TEntry'
+
+    def _configure_styles(self) -> None:
+        ttk_style = self._ttk_style
+        # the cells draw clam's field whatever the theme: vista, xpnative and aqua draw their
+        # own, which ignores fieldbackground, and only clam's honours bordercolor
+        field = f'{self._style_name}.field'
+        if field not in ttk_style.element_names():
+            ttk_style.element_create(field, 'from', 'clam', 'field')
+        layout = [(field, {'sticky': 'nswe', 'border': '1', 'children': [
+            ('Entry.padding', {'sticky': 'nswe', 'children': [('Entry.textarea', {'sticky': 'nswe'})]})]})]
+        for even, bg, fg in ((True, self._even_row_bg, self._even_row_fg), (False, self._odd_row_bg, self._odd_row_fg)):
+            style = self._parity_style(even)
+            # read-only cells take no input (see _apply_read_only), their text is greyed out
+            fg = self._read_only_fg if self._read_only else fg
+            ttk_style.layout(style, layout)
+            ttk_style.configure(style, fieldbackground=bg, foreground=fg, lightcolor=bg, darkcolor=bg,
+                                borderwidth=self._border_width, bordercolor=self._border_color)
+            # rows past the end are disabled, keep them striped like the rest
+            ttk_style.map(style, fieldbackground=[('disabled', bg)], foreground=[('disabled', fg)])
+
+    def _block_edit(self, event):
+        # read-only cells still move the cursor and copy, but take no input
+        if event.keysym in _NAVIGATION_KEYS or (event.state & 0x4 and event.keysym.lower() in ('c', 'a')):
+            return None
+        return 'break'
+
+    def _apply_read_only(self) -> None:
+        # every cell carries the same bindtag, one class binding locks or unlocks them all,
+        # and the two parity styles give them their look
+        for event in _EDIT_EVENTS:
+            if self._read_only:
+                self.bind_class(self._cell_tag, event, self._block_edit if event == '<Key>' else lambda event: 'break')
+            else:
+                self.unbind_class(self._cell_tag, event)
+        self._configure_styles()
 
     def _style_font(self, family=None, size=None, weight=None):
         if family:
@@ -261,21 +553,18 @@ class DataGridView(Frame):
             self._font_size = size
         if weight:
             self._font_weight = weight
-        __widgets = self._return_cells()
-        for cell in __widgets:
-            cell.configure(font=(self._font_family, self._font_size, self._font_weight))
+        self._font.configure(family=self._font_family, size=self._font_size, weight=self._font_weight)
 
     def _style_border(self, width=None, color=None):
         if width:
             self._border_width = width
         if color:
             self._border_color = color
-        __widgets = self._return_cells()
-        for cell in __widgets:
-            cell.configure(highlightthickness=self._border_width, highlightcolor=self._border_color)
+        self._configure_styles()
 
     def style(self, **kwargs):
-        for key, value in kwargs:
+        colors = False
+        for key, value in kwargs.items():
             if 'headers_bg' in key:
                 self._headers_bg = value
             if 'headers_fg' in key:
@@ -288,59 +577,189 @@ class DataGridView(Frame):
                 self._odd_row_bg = value
             if 'odd_fg' in key:
                 self._odd_row_fg = value
+            if 'read_only_fg' in key:
+                self._read_only_fg = value
             if 'font' in key:
                 self._style_font(**value)
             if 'border' in key:
                 self._style_border(**value)
+            colors = colors or key.endswith(('_bg', '_fg'))
+        if colors:
+            self._update_style_config()
 
     def _update_style_config(self):
-        __headers = self._head.grid_slaves()
+        __headers = self._head.grid_slaves() + self._footer_labels
         for cell in __headers:
             if isinstance(cell, Label):
                 cell.configure(bg=self._headers_bg, fg=self._headers_fg)
-
-        __widgets = self._return_cells()
-        for index, cell in enumerate(__widgets):
-            row = index // self._num_cols
-            if row % 2 == 0:
-                cell.configure(bg=self._even_row_bg, fg=self._even_row_bg)
+        self._configure_styles()
+
+    def set_filter(self, predicate: Optional[Filter]) -> None:
+        # show only the rows matching predicate (see filters.py), None shows every row
+        if self._jobs is not None:
+            self._jobs.cancel('filter')
+            if predicate is not None and self._offloads() and not self._model.filter_cached(predicate):
+                self._filter_in_pool(predicate)
+                return
+        self._model.set_filter(predicate)
+        self._goto_page(0)
+
+    def _filter_in_pool(self, predicate: Filter, tries: int = 2) -> None:
+        version = self._model.version
+
+        def done(mask: bytearray) -> None:
+            if self._model.apply_filter(predicate, mask, version):
+                self._goto_page(0)
+            elif tries > 1:
+                self._filter_in_pool(predicate, tries - 1)
             else:
-                cell.configure(bg=self._odd_row_bg, fg=self._odd_row_bg)
+                self._model.set_filter(predicate)
+                self._goto_page(0)
+
+        self._jobs.filter(predicate, self._data.get(), done)
+
+    def clear_filter(self) -> None:
+        self.set_filter(None)
+
+    def _goto_page(self, page: int) -> None:
+        self._nav.config(current=page)
+        self.update(page=page)
 
     def index(self, row):
-        # Get all the widgets in the grid
-        slaves = self._head.grid_slaves() + self._body.grid_slaves()
-        slaves.reverse()
-
-        # Loop over all the widgets in the grid
-        __will_return = []
-        for i, widget in enumerate(slaves):
-            j = i
-            while j >= len(self._headers):
-                j -= len(self._headers)
-            # Check if the widget is an Entry widget and has the same values as the given row
-            if isinstance(widget, Entry) and self._revise_values(widget.get(), True) == row[self._headers[j]]:
-                __will_return.append(True)
+        # position of the row in the (sorted) table, whatever page is showing; -1 when absent
+        return self._model.index(row)
+
+    def find(self, index):
+        return self._model.find(index)
+
+    def locate(self, key) -> int:
+        # jump to the row with the given primary key, see DataSourceVar(key=...)
+        position = self._model.locate(key)
+        if position != -1:
+            self._show_position(position)
+        return position
+
+    def group_by(self, headers: Optional[Sequence[str]], expanded=False) -> None:
+        # a header row per group of equal values in headers, see GridModel.group_by; double
+        # click a header row (or press Return in it) to open or close its group
+        if self._jobs is not None:
+            self._jobs.cancel('group')
+            if headers and self._offloads():
+                self._group_in_pool(list(headers), expanded)
+                return
+        self._model.group_by(headers, expanded)
+        self._goto_page(0)
+
+    def _group_in_pool(self, headers: List[str], expanded: bool, tries: int = 2) -> None:
+        version = self._model.version
+
+        def done(members: Dict[tuple, List[int]]) -> None:
+            if self._model.apply_groups(headers, members, version, expanded):
+                self._goto_page(0)
+            elif tries > 1:
+                self._group_in_pool(headers, expanded, tries - 1)
             else:
-                __will_return.append(False)
-            if len(__will_return) == len(self._headers):
-                if False not in __will_return:
-                    return (i // len(self._headers)) - 1  # Return the index of the row if it exists
-                else:
-                    __will_return.clear()
+                self._model.group_by(headers, expanded)
+                self._goto_page(0)
+
+        self._jobs.group([self._data.column(header) for header in headers], done)
+
+    def ungroup(self) -> None:
+        self.group_by(None)
+
+    def toggle_group(self, pos: int) -> bool:
+        if not self._model.is_group_row(pos):
+            return False
+        self._model.toggle_group(pos)
+        self.update()
+        return True
+
+    def expand_all(self) -> None:
+        self._model.expand_all()
+        self.update()
+
+    def collapse_all(self) -> None:
+        self._model.collapse_all()
+        self.update()
+
+    def show_footer(self, functions: Sequence[str] = FUNCTIONS, headers: Optional[Sequence[str]] = None,
+                    scope: str = 'all') -> None:
+        # a row under the table with running aggregates of headers (every column by
+        # default) over all rows, or the filtered ones with scope='filter'
+        self._model.enable_aggregates(headers, scope, functions)
+        self._footer_functions = tuple(functions)
+        if self._foot is None:
+            self._foot = Frame(self)
+            for col in range(self._num_cols):
+                self._foot.columnconfigure(col, weight=2)
+                label = Label(self._foot, text='', font=self._font, bg=self._headers_bg, fg=self._headers_fg,
+                              relief='sunken', width=20)
+                label.grid(row=0, column=col, sticky='nswe')
+                self._footer_labels.append(label)
+        self._footer_texts = [None] * self._num_cols
+        self._foot.grid(row=2, column=0, sticky='nswe')
+        self._paint_footer()
+
+    def hide_footer(self) -> None:
+        self._model.disable_aggregates()
+        self._footer_functions = None
+        if self._foot is not None:
+            self._foot.grid_remove()
+
+    def _paint_footer(self) -> None:
+        if self._footer_functions is None:
+            return
+        results = self._model.aggregates(self._footer_functions)
+        labels = self._footer_labels
+        for col, header in enumerate(self._headers):
+            figures = results.get(header, {})
+            text = '  '.join(f'{function} {self._model.format_aggregate(col, function, value)}'
+                             for function, value in figures.items() if value is not None)
+            if text != self._footer_texts[col]:
+                labels[col].configure(text=text)
+                self._footer_texts[col] = text
+                self.stats.count('tk.configure')
+
+    def export(self, path: str, fmt: Optional[str] = None, chunk_size: int = 10000,
+               progress: Optional[Callable[[int, Optional[int]], None]] = None, **options) -> int:
+        # write the rows as shown (sorted, filtered) to a 'csv' or 'jsonl' file, see GridModel.export
+        return self._model.export(path, fmt, chunk_size, progress, **options)
+
+    def instrument(self, enabled: bool = True, stats: Optional[Stats] = None) -> Stats:
+        # start (or stop) recording; the grid and its DataSourceVar share one Stats, so
+        # grid.stats.snapshot() shows data work and Tk work side by side
+        if stats is not None:
+            self.stats = self._model.stats = stats
+        if self._provider is None:
+            self._data.stats = self.stats
+        self.stats.enabled = enabled
+        return self.stats
+
+    def show_progress(self, loaded: int, total: Optional[int] = None) -> None:
+        # loading indicator below the navigator, driven by loader.DataLoader
+        if self._progress is None:
+            self._progress = Frame(self)
+            self._progress_text = StringVar(self._progress)
+            self._progress_bar = Progressbar(self._progress, orient='horizontal')
+            self._progress_bar.pack(side='left', fill='x', expand=True)
+            Label(self._progress, textvariable=self._progress_text, width=30).pack(side='right')
+        self._progress.grid(row=4, column=0, sticky='nswe')
+        if total:
+            self._progress_bar.configure(mode='determinate', maximum=total, value=min(loaded, total))
+            self._progress_text.set(f'{loaded:,} / {total:,} rows')
+        else:
+            self._progress_bar.configure(mode='indeterminate')
+            self._progress_bar.step()
+            self._progress_text.set(f'{loaded:,} rows')
 
-        # Return -1 if the row doesn't exist
-        return -1
+    def hide_progress(self) -> None:
+        if self._progress is not None:
+            self._progress.grid_remove()
 
-    def find(self, index):
-        if not 0 <= index < self._num_rows:
-            return None
-        values = {}
-        for i, header in enumerate(self._headers):
-            cell = self._body.grid_slaves(row=index, column=i)[0]
-            if isinstance(cell, Entry):
-                values[header] = self._revise_values(cell.get(), True)
-        return values
+    def _show_position(self, position: int) -> None:
+        page = position // self._max_rows
+        if page != self._model.page:
+            self._goto_page(page)
 
 
 # Example usage
@@ -354,8 +773,9 @@ if __name__ == '__main__':
     table = DataGridView(root, __data, 10)
     table.grid(row=0, column=0, sticky='nsew')
     mynewrow = {'name': 'new name', 'age': 0, 'marriage': True}
-    for x in range(10):
-        __data.append(mynewrow)
+    with __data.batch():
+        for x in range(10):
+            __data.append(mynewrow)
     __index = table.index(mynewrow)
 
     root.mainloop()
@@ -1,100 +1,42 @@
 from tkinter import Variable, Tk
-from typing import Literal, Callable, Any
-
-
-class DataSourceVar(Variable):
-    def __init__(self, master=None, value=None, name=None):
-        super().__init__(master, value, name)
-        self._value = value if value is not None else []
-        self._callbacks = {'insert': [], 'remove': [], 'append': [],
-                           'pop': [], 'sort': [], 'all': [],
-                           'reverse': [], 'clear': []}
-
-    def get(self):
-        return self._value
-
-    def set(self, value):
-        self._value = value
-
-    def append(self, item):
-        self._value.append(item)
-        for func in self._callbacks['append']:
-            func(item)
-
-        for func in self._callbacks['all']:
-            func(item)
-
-    def remove(self, item):
-        self._value.remove(item)
-        for func in self._callbacks['remove']:
-            func(item)
-
-        for func in self._callbacks['all']:
-            func(item)
-
-    def insert(self, index, item):
-        self._value.insert(index, item)
-        for func in self._callbacks['insert']:
-            func(item)
-
-        for func in self._callbacks['all']:
-            func(item)
-
-    def pop(self, index):
-        self._value.pop(index)
-        for func in self._callbacks['pop']:
-            func(index)
-
-        for func in self._callbacks['all']:
-            func(index)
-
-    def sort(self, key: ... = None, reverse: bool = False):
-        self._value.sort(key=key, reverse=reverse)
-        for func in self._callbacks['sort']:
-            func(key, reverse)
-
-        for func in self._callbacks['all']:
-            func(key, reverse)
-
-    def reverse(self):
-        self._value.reverse()
-        for func in self._callbacks['reverse']:
-            func()
-
-        for func in self._callbacks['all']:
-            func()
-
-    def clear(self):
-        self._value.clear()
-        for func in self._callbacks['clear']:
-            func()
-
-        for func in self._callbacks['all']:
-            func()
-
-    def count(self, value) -> int:
-        return self._value.count(value)
-
-    def index(self, value, start, stop) -> int:
-        return self._value.index(value, start, stop)
-
-    def callable(self,
-                 func: Callable[[Any], Any],
-                 method: Literal['insert', 'remove', 'append', 'pop', 'sort', 'all', 'reverse', 'clear'],
-                 add=False):
-        if add:
-            self._callbacks[method.lower()].append(func)
-        else:
-            self._callbacks[method.lower()] = [func]
-
-    def __len__(self):
-        return len(self._value)
-
-    def __getitem__(self, key: int):
-        return self._value[key]
-
-    def __setitem__(self, key: int, newvalue: dict):
-        self._value[key] = newvalue
+from typing import Iterable, Optional, Union, Sequence
+from columnar import ColumnStore
+from rowsource import RowSource
+from schema import Schema
+import exchange
+
+
+class DataSourceVar(RowSource, Variable):
+    # A RowSource that is also a tkinter Variable, bound to the interpreter of master (the
+    # default root without one), for tables and widgets that take variables.
+    def __init__(self, master=None, value=None, name=None, key: Union[str, Sequence[str], None] = None,
+                 schema: Schema = None, headers: Optional[Sequence[str]] = None):
+        # the rows stay on the Python side, converting them to a Tcl list would only cost time
+        Variable.__init__(self, master, None, name)
+        RowSource.__init__(self, value, key, schema, headers)
+
+    @classmethod
+    def columnar(cls, rows: Iterable[dict] = (), headers: Sequence[str] = None, types: dict = None,
+                 master=None, name=None, key: Union[str, Sequence[str], None] = None) -> 'DataSourceVar':
+        # same API, rows kept as one typed array per header, see columnar.ColumnStore
+        return cls(master, ColumnStore(rows, headers, types), name, key, types)
+
+    @classmethod
+    def from_csv(cls, path: str, schema: Schema = None, chunk_size: int = 10000,
+                 progress: Optional[exchange.Progress] = None, master=None, name=None,
+                 key: Union[str, Sequence[str], None] = None, encoding: str = 'utf-8', **fmtparams) -> 'DataSourceVar':
+        # columns in schema are parsed with their dtype, progress(bytes_read, file_size)
+        var = cls(master, None, name, key, schema, exchange.csv_headers(path, encoding, **fmtparams))
+        var.load(exchange.read_csv(path, schema, chunk_size, progress, encoding, **fmtparams))
+        return var
+
+    @classmethod
+    def from_jsonl(cls, path: str, schema: Schema = None, chunk_size: int = 10000,
+                   progress: Optional[exchange.Progress] = None, master=None, name=None,
+                   key: Union[str, Sequence[str], None] = None, encoding: str = 'utf-8') -> 'DataSourceVar':
+        var = cls(master, None, name, key, schema)
+        var.load(exchange.read_jsonl(path, schema, chunk_size, progress, encoding))
+        return var
 
 
 if __name__ == '__main__':
@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+import os
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+from schema import Schema, compile_column
+
+# progress(done, total): rows written for exports, bytes read for imports
+Progress = Callable[[int, Optional[int]], None]
+
+
+def format_of(path: str) -> str:
+    # 'jsonl' for .jsonl and .ndjson files, 'csv' for anything else
+    return 'jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson') else 'csv'
+
+
+def write_csv(path: str, headers: Sequence[str], chunks: Iterable[List[dict]], total: Optional[int] = None,
+              progress: Optional[Progress] = None, encoding: str = 'utf-8', **fmtparams) -> int:
+    # a header row, then one record per row; None is written as an empty field
+    written = 0
+    with open(path, 'w', encoding=encoding, newline='') as file:
+        writer = csv.writer(file, **fmtparams)
+        writer.writerow(headers)
+        for chunk in chunks:
+            writer.writerows([[row[header] for header in headers] for row in chunk])
+            written += len(chunk)
+            if progress is not None:
+                progress(written, total)
+    return written
+
+
+def write_jsonl(path: str, headers: Sequence[str], chunks: Iterable[List[dict]], total: Optional[int] = None,
+                progress: Optional[Progress] = None, encoding: str = 'utf-8') -> int:
+    # one JSON object per line; dates and Decimals are written as their str()
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str).encode
+    written = 0
+    with open(path, 'w', encoding=encoding, newline='\n') as file:
+        for chunk in chunks:
+            file.write(''.join([encode({header: row[header] for header in headers}) + '\n' for row in chunk]))
+            written += len(chunk)
+            if progress is not None:
+                progress(written, total)
+    return written
+
+
+def write(path: str, headers: Sequence[str], chunks: Iterable[List[dict]], fmt: Optional[str] = None,
+          total: Optional[int] = None, progress: Optional[Progress] = None, **options) -> int:
+    fmt = fmt or format_of(path)
+    if fmt == 'csv':
+        return write_csv(path, headers, chunks, total, progress, **options)
+    if fmt == 'jsonl':
+        return write_jsonl(path, headers, chunks, total, progress, **options)
+    raise ValueError(f"format must be 'csv' or 'jsonl', not {fmt!r}")
+
+
+def _parsers(schema: Optional[Schema]) -> dict:
+    # text parser of every declared column, blank text reads as None
+    return {header: compile_column(column)[1] for header, column in (schema or {}).items()}
+
+
+def csv_headers(path: str, encoding: str = 'utf-8', **fmtparams) -> Optional[List[str]]:
+    # the header row of a CSV file, None for an empty file
+    with open(path, encoding=encoding, newline='') as file:
+        return next(csv.reader(file, **fmtparams), None)
+
+
+def read_csv(path: str, schema: Optional[Schema] = None, chunk_size: int = 10000,
+             progress: Optional[Progress] = None, encoding: str = 'utf-8', **fmtparams) -> Iterator[List[dict]]:
+    # the records of a CSV file with a header row, as dicts, chunk_size at a time; columns
+    # declared in schema are parsed with their dtype, the others stay strings
+    total = os.path.getsize(path)
+    parsers = _parsers(schema)
+    with open(path, 'rb') as binary:
+        text = io.TextIOWrapper(binary, encoding=encoding, newline='')
+        reader = csv.reader(text, **fmtparams)
+        headers = next(reader, None)
+        if headers is None:
+            return
+        width = len(headers)
+        columns = [(index, header, parsers.get(header)) for index, header in enumerate(headers)]
+        chunk = []
+        for record in reader:
+            if not record:
+                continue
+            if len(record) != width:
+                record = (record + [''] * width)[:width]
+            chunk.append({header: record[index] if parse is None else parse(record[index])
+                          for index, header, parse in columns})
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+                if progress is not None:
+                    # the decoder reads ahead a little, close enough for a progress bar
+                    progress(binary.tell(), total)
+        if chunk:
+            yield chunk
+        if progress is not None:
+            progress(total, total)
+
+
+def read_jsonl(path: str, schema: Optional[Schema] = None, chunk_size: int = 10000,
+               progress: Optional[Progress] = None, encoding: str = 'utf-8') -> Iterator[List[dict]]:
+    # one object per non-blank line, chunk_size at a time; strings in columns declared in
+    # schema are parsed with their dtype (dates and Decimals come back from their str())
+    total = os.path.getsize(path)
+    parsers = [(header, parse) for header, parse in _parsers(schema).items()
+               if getattr(schema[header], 'dtype', schema[header]) is not str]
+    loads = json.loads
+    with open(path, 'rb') as binary:
+        text = io.TextIOWrapper(binary, encoding=encoding)
+        chunk = []
+        for line in text:
+            if not line.strip():
+                continue
+            row = loads(line)
+            for header, parse in parsers:
+                value = row.get(header)
+                if isinstance(value, str):
+                    row[header] = parse(value)
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+                if progress is not None:
+                    progress(binary.tell(), total)
+        if chunk:
+            yield chunk
+        if progress is not None:
+            progress(total, total)
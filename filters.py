@@ -0,0 +1,261 @@
+import re
+from collections import OrderedDict
+from itertools import compress, repeat
+from operator import eq
+from typing import Any, Optional, Sequence
+
+
+def _text(value, case: bool) -> str:
+    if value is None:
+        return ''
+    text = value if isinstance(value, str) else str(value)
+    return text if case else text.lower()
+
+
+def _values(rows: Sequence[dict], column: str) -> list:
+    # columnar sources hand out a whole column without building the rows
+    values = getattr(rows, 'column', None)
+    if values is not None:
+        return values(column)
+    return [row[column] for row in rows]
+
+
+class Filter:
+    # Predicates over rows. Equal filters share one cached result in a FilterCache,
+    # so they must describe themselves with a hashable key.
+    key: tuple = ()
+
+    def test(self, row: dict) -> bool:
+        raise NotImplementedError
+
+    def evaluate(self, rows: Sequence[dict], cache: 'FilterCache') -> bytearray:
+        return bytearray(map(self.test, rows))
+
+    def narrows(self, other: 'Filter') -> bool:
+        # True when every row matching self also matches other
+        return False
+
+    def __and__(self, other: 'Filter') -> 'Filter':
+        return And(self, other)
+
+    def __or__(self, other: 'Filter') -> 'Filter':
+        return Or(self, other)
+
+    def __invert__(self) -> 'Filter':
+        return Not(self)
+
+    def __eq__(self, other):
+        return isinstance(other, Filter) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f'{type(self).__name__}{self.key[1:]!r}'
+
+
+class Equals(Filter):
+    def __init__(self, column: str, value: Any):
+        self.column = column
+        self.value = value
+        self.key = ('equals', column, value)
+
+    def test(self, row: dict) -> bool:
+        return row[self.column] == self.value
+
+    def evaluate(self, rows: Sequence[dict], cache: 'FilterCache') -> bytearray:
+        return bytearray(map(eq, _values(rows, self.column), repeat(self.value)))
+
+
+class Range(Filter):
+    # inclusive bounds, None leaves that side open; None values never match
+    def __init__(self, column: str, low: Any = None, high: Any = None):
+        self.column = column
+        self.low = low
+        self.high = high
+        self.key = ('range', column, low, high)
+
+    def test(self, row: dict) -> bool:
+        value = row[self.column]
+        if value is None:
+            return False
+        try:
+            return (self.low is None or self.low <= value) and (self.high is None or value <= self.high)
+        except TypeError:
+            return False
+
+    def evaluate(self, rows: Sequence[dict], cache: 'FilterCache') -> bytearray:
+        low, high = self.low, self.high
+        values = _values(rows, self.column)
+        try:
+            return bytearray(value is not None and (low is None or low <= value) and (high is None or value <= high)
+                             for value in values)
+        except TypeError:
+            return bytearray(map(self._test_value, values))
+
+    def _test_value(self, value) -> bool:
+        return self.test({self.column: value})
+
+    def narrows(self, other: Filter) -> bool:
+        if not isinstance(other, Range) or other.column != self.column:
+            return False
+        try:
+            low = other.low is None or (self.low is not None and other.low <= self.low)
+            high = other.high is None or (self.high is not None and self.high <= other.high)
+        except TypeError:
+            return False
+        return low and high
+
+
+class Contains(Filter):
+    def __init__(self, column: str, text: str, case: bool = False):
+        self.column = column
+        self.text = text if case else text.lower()
+        self.case = case
+        self.key = ('contains', column, self.text, case)
+
+    def test(self, row: dict) -> bool:
+        return self.text in _text(row[self.column], self.case)
+
+    def evaluate(self, rows: Sequence[dict], cache: 'FilterCache') -> bytearray:
+        text, case = self.text, self.case
+        return bytearray(text in _text(value, case) for value in _values(rows, self.column))
+
+    def narrows(self, other: Filter) -> bool:
+        # typing one more character only has to look at the rows the shorter text matched
+        return (isinstance(other, Contains) and other.column == self.column and other.case == self.case
+                and other.text in self.text)
+
+
+class Regex(Filter):
+    def __init__(self, column: str, pattern: str, flags: int = 0):
+        self.column = column
+        self.pattern = re.compile(pattern, flags)
+        self.key = ('regex', column, pattern, flags)
+
+    def test(self, row: dict) -> bool:
+        return self.pattern.search(_text(row[self.column], True)) is not None
+
+    def evaluate(self, rows: Sequence[dict], cache: 'FilterCache') -> bytearray:
+        search = self.pattern.search
+        return bytearray(search(_text(value, True)) is not None for value in _values(rows, self.column))
+
+
+class _Compound(Filter):
+    def __init__(self, *filters: Filter):
+        self.filters = filters
+        self.key = (type(self).__name__.lower(),) + tuple(predicate.key for predicate in filters)
+
+    def __repr__(self):
+        return f'{type(self).__name__}{self.filters!r}'
+
+
+class And(_Compound):
+    def test(self, row: dict) -> bool:
+        return all(predicate.test(row) for predicate in self.filters)
+
+    def evaluate(self, rows: Sequence[dict], cache: 'FilterCache') -> bytearray:
+        # masks hold 0/1 bytes, so they combine as big integers
+        result = -1
+        for predicate in self.filters:
+            result &= int.from_bytes(cache.mask(predicate, rows), 'little')
+        return bytearray((result & _ones(len(rows))).to_bytes(len(rows), 'little'))
+
+    def narrows(self, other: Filter) -> bool:
+        return any(predicate == other or predicate.narrows(other) for predicate in self.filters)
+
+
+class Or(_Compound):
+    def test(self, row: dict) -> bool:
+        return any(predicate.test(row) for predicate in self.filters)
+
+    def evaluate(self, rows: Sequence[dict], cache: 'FilterCache') -> bytearray:
+        result = 0
+        for predicate in self.filters:
+            result |= int.from_bytes(cache.mask(predicate, rows), 'little')
+        return bytearray(result.to_bytes(len(rows), 'little'))
+
+
+class Not(_Compound):
+    def __init__(self, predicate: Filter):
+        super().__init__(predicate)
+
+    def test(self, row: dict) -> bool:
+        return not self.filters[0].test(row)
+
+    def evaluate(self, rows: Sequence[dict], cache: 'FilterCache') -> bytearray:
+        mask = int.from_bytes(cache.mask(self.filters[0], rows), 'little')
+        return bytearray((mask ^ _ones(len(rows))).to_bytes(len(rows), 'little'))
+
+
+def _ones(size: int) -> int:
+    return int.from_bytes(b'\x01' * size, 'little')
+
+
+class FilterCache:
+    # One 0/1 bytearray per recently used filter, aligned with the source rows and kept
+    # in step with DataSourceVar changes, so a new row is tested once per cached filter.
+    def __init__(self, size: int = 32):
+        self._size = size
+        self._masks = OrderedDict()
+
+    def mask(self, predicate: Filter, rows: Sequence[dict]) -> bytearray:
+        mask = self._masks.get(predicate)
+        if mask is not None:
+            self._masks.move_to_end(predicate)
+            return mask
+        base = self._narrowest(predicate)
+        if base is not None:
+            mask = bytearray(len(rows))
+            test = predicate.test
+            for index in compress(range(len(rows)), base):
+                if test(rows[index]):
+                    mask[index] = 1
+        else:
+            mask = predicate.evaluate(rows, self)
+        self.put(predicate, mask)
+        return mask
+
+    def put(self, predicate: Filter, mask: bytearray) -> None:
+        # a mask worked out elsewhere, e.g. on a process pool (see parallel.py)
+        self._masks[predicate] = mask
+        self._masks.move_to_end(predicate)
+        while len(self._masks) > self._size:
+            self._masks.popitem(last=False)
+
+    def __contains__(self, predicate: Filter) -> bool:
+        return predicate in self._masks
+
+    def get(self, predicate: Filter) -> Optional[bytearray]:
+        # the cached mask of predicate, None instead of testing the rows
+        return self._masks.get(predicate)
+
+    def _narrowest(self, predicate: Filter) -> Optional[bytearray]:
+        best = None
+        for cached, mask in self._masks.items():
+            if predicate.narrows(cached) and (best is None or mask.count(1) < best.count(1)):
+                best = mask
+        return best
+
+    def update(self, rows: Sequence[dict], change) -> None:
+        if not self._masks:
+            return
+        action = change.action
+        if action in ('append', 'extend', 'insert'):
+            start = change.start
+            stop = start + 1 if action == 'insert' else change.stop
+            new = [rows[index] for index in range(start, stop)]
+            for predicate, mask in self._masks.items():
+                mask[start:start] = bytearray(map(predicate.test, new))
+        elif action in ('pop', 'remove'):
+            for mask in self._masks.values():
+                del mask[change.start]
+        elif action == 'setitem':
+            for predicate, mask in self._masks.items():
+                for index in range(change.start, change.stop):
+                    mask[index] = predicate.test(rows[index])
+        else:
+            self._masks.clear()
+
+    def clear(self) -> None:
+        self._masks.clear()
@@ -0,0 +1,93 @@
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Sequence, Set
+from changes import Change
+
+
+class Groups:
+    # Source indices of the rows of a DataSourceVar by their tuple of values in headers, a
+    # dict of ascending index lists. Fed one mutation at a time (see DataSourceVar
+    # 'mutation' callbacks) like aggregates.Aggregator: appends and edits only touch the
+    # groups of the rows involved, inserts and pops also shift the indices after them.
+    def __init__(self, data, headers: Sequence[str], members: Optional[Dict[tuple, List[int]]] = None):
+        self._data = data
+        self.headers = list(headers)
+        self.rebuild(members)
+
+    def rebuild(self, members: Optional[Dict[tuple, List[int]]] = None) -> None:
+        # the group of every source index, so a pop or an edit knows which list to leave;
+        # members, when given, are the groups already worked out (see parallel.py)
+        self._keys = list(zip(*[self._data.column(header) for header in self.headers]))
+        if members is None:
+            members = {}
+            for index, key in enumerate(self._keys):
+                members.setdefault(key, []).append(index)
+        self.members: Dict[tuple, List[int]] = members
+        # groups whose rows changed since take_changed(), None for all of them
+        self._changed: Optional[Set[tuple]] = None
+        # a group came or went, the order of the groups has to be worked out again
+        self.keys_changed = True
+
+    def key_of(self, index: int) -> tuple:
+        return self._keys[index]
+
+    def take_changed(self) -> Optional[Set[tuple]]:
+        changed, self._changed = self._changed, set()
+        return changed
+
+    def _touch(self, key: tuple) -> None:
+        if self._changed is not None:
+            self._changed.add(key)
+
+    def _key(self, row) -> tuple:
+        return tuple(row[header] for header in self.headers)
+
+    def _add(self, key: tuple, index: int) -> None:
+        indices = self.members.get(key)
+        if indices is None:
+            indices = self.members[key] = []
+            self.keys_changed = True
+        insort(indices, index)
+        self._touch(key)
+
+    def _discard(self, key: tuple, index: int) -> None:
+        indices = self.members[key]
+        del indices[bisect_left(indices, index)]
+        if not indices:
+            del self.members[key]
+            self.keys_changed = True
+        self._touch(key)
+
+    def _shift(self, start: int, delta: int) -> None:
+        # every index from start on moves by delta; only the tail of each list is rewritten
+        for indices in self.members.values():
+            first = bisect_left(indices, start)
+            if first < len(indices):
+                indices[first:] = [index + delta for index in indices[first:]]
+
+    def update(self, change: Change) -> None:
+        action = change.action
+        if action in ('append', 'extend', 'insert'):
+            start = change.start
+            stop = start + 1 if action == 'insert' else change.stop
+            if start < len(self._keys):
+                self._shift(start, stop - start)
+            keys = [self._key(self._data[index]) for index in range(start, stop)]
+            self._keys[start:start] = keys
+            for index, key in enumerate(keys, start):
+                self._add(key, index)
+        elif action in ('pop', 'remove'):
+            index = change.start
+            self._discard(self._keys.pop(index), index)
+            self._shift(index + 1, -1)
+        elif action == 'setitem':
+            for index in range(change.start, change.stop):
+                old, new = self._keys[index], self._key(self._data[index])
+                if new == old:
+                    # same group, other values: its subtotals are out of date
+                    self._touch(old)
+                    continue
+                self._discard(old, index)
+                self._add(new, index)
+                self._keys[index] = new
+        else:
+            self.rebuild()
@@ -0,0 +1,129 @@
+import logging
+import time
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+
+class _Timer:
+    __slots__ = ('_stats', '_name', '_start')
+
+    def __init__(self, stats: 'Stats', name: str):
+        self._stats = stats
+        self._name = name
+
+    def __enter__(self):
+        self._stats._active.add(self._name)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._start
+        self._stats._active.discard(self._name)
+        self._stats.record(self._name, elapsed)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Stats:
+    # Opt-in counters and timers. While disabled, timed() hands out a shared no-op context
+    # and count() returns at once, so the hooks can stay in the hot paths.
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._counts = {}
+        self._totals = {}
+        self._maxima = {}
+        self._active = set()
+        self._sinks = []
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if self.enabled and amount:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def timed(self, name: str):
+        # nested timers of the same name (an override calling super()) count once
+        if not self.enabled or name in self._active:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def record(self, name: str, seconds: float) -> None:
+        self._counts[name] = self._counts.get(name, 0) + 1
+        self._totals[name] = self._totals.get(name, 0.0) + seconds
+        if seconds > self._maxima.get(name, 0.0):
+            self._maxima[name] = seconds
+        for sink in self._sinks:
+            sink(name, seconds)
+
+    def add_sink(self, sink: Callable[[str, float], None]) -> None:
+        # sink(name, seconds) hears about every timed call as it ends
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink: Callable[[str, float], None]) -> None:
+        self._sinks.remove(sink)
+
+    def snapshot(self) -> Dict[str, dict]:
+        # plain counters only have a count, timers also have total, mean and max in ms
+        result = {}
+        for name, count in sorted(self._counts.items()):
+            entry = {'count': count}
+            if name in self._totals:
+                total = self._totals[name] * 1000
+                entry.update(total_ms=total, mean_ms=total / count, max_ms=self._maxima[name] * 1000)
+            result[name] = entry
+        return result
+
+    def reset(self) -> None:
+        self._counts.clear()
+        self._totals.clear()
+        self._maxima.clear()
+
+
+def timed(name: str):
+    # method decorator timing the call under name in self.stats
+    def decorate(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            stats = self.stats
+            if not stats.enabled:
+                return method(self, *args, **kwargs)
+            with stats.timed(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class LoggingSink:
+    # logs timed calls slower than threshold_ms, e.g. Stats.add_sink(LoggingSink(threshold_ms=50))
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.DEBUG, threshold_ms: float = 0):
+        self._logger = logger or logging.getLogger('datagridview')
+        self._level = level
+        self._threshold = threshold_ms / 1000
+
+    def __call__(self, name: str, seconds: float) -> None:
+        if seconds >= self._threshold:
+            self._logger.log(self._level, '%s took %.2f ms', name, seconds * 1000)
+
+
+def __getattr__(name: str):
+    # StatsOverlay needs tkinter, which the rest of this module (and GridModel) does not
+    if name == 'StatsOverlay':
+        from statsoverlay import StatsOverlay
+        return StatsOverlay
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,180 @@
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Callable, Iterable, Optional, Union
+from datasource import DataSourceVar
+
+# queue items besides row chunks
+_DONE = object()
+
+
+class _Failure:
+    __slots__ = ('error',)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class DataLoader:
+    # Thread-safe way into a DataSourceVar. Worker threads (or a concurrent.futures pool)
+    # put chunks of rows on a queue; the Tk thread drains it from after() in bounded time
+    # slices, one batched extend per slice, so the UI keeps handling events while loading.
+    def __init__(self, data: DataSourceVar, widget, total: Optional[int] = None, chunk_size: int = 1000,
+                 slice_ms: int = 20, interval_ms: int = 50,
+                 on_done: Optional[Callable[[Optional[BaseException]], None]] = None,
+                 on_chunk: Optional[Callable[[int], None]] = None):
+        self._data = data
+        # any widget can schedule the drain; a DataGridView also shows the progress
+        self._widget = widget
+        self.total = total
+        self._chunk_size = chunk_size
+        self._slice = slice_ms / 1000
+        self._interval = interval_ms
+        self._on_done = on_done
+        # told the size of every chunk once it is in the DataSourceVar, on the Tk thread
+        self._on_chunk = on_chunk
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._producers = 0
+        self._finished = False
+        self._cancelled = threading.Event()
+        self._after_id = None
+        self.loaded = 0
+        self.error = None
+        self.done = False
+
+    # producer side, safe from any thread
+
+    def put(self, row: dict) -> None:
+        self._queue.put([row])
+
+    def put_many(self, rows: Iterable[dict]) -> None:
+        rows = rows if isinstance(rows, list) else list(rows)
+        if rows:
+            self._queue.put(rows)
+
+    def finish(self) -> None:
+        # one producer is done; the load is over once every producer has finished
+        self._queue.put(_DONE)
+
+    def fail(self, error: BaseException) -> None:
+        self._queue.put(_Failure(error))
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def _register(self) -> None:
+        with self._lock:
+            self._producers += 1
+
+    def _consume(self, source: Union[Iterable[dict], Callable[[], Iterable[dict]]]) -> None:
+        # a callable source is called on the worker, so the query or the parse runs there
+        chunk = []
+        try:
+            for row in source() if callable(source) else source:
+                chunk.append(row)
+                if len(chunk) >= self._chunk_size:
+                    self._queue.put(chunk)
+                    chunk = []
+                    if self._cancelled.is_set():
+                        break
+        except BaseException as error:
+            self.fail(error)
+        finally:
+            # the rows read before an error still get loaded
+            if chunk and not self._cancelled.is_set():
+                self._queue.put(chunk)
+            self.finish()
+
+    # consumer side, Tk thread only; run() and submit() start a worker, but also schedule
+    # the drain with after(), so they are called from the Tk thread too
+
+    def run(self, source: Union[Iterable[dict], Callable[[], Iterable[dict]]]) -> threading.Thread:
+        # iterate source (a csv.DictReader, a cursor, ...) on a daemon thread
+        self._register()
+        thread = threading.Thread(target=self._consume, args=(source,), daemon=True)
+        thread.start()
+        self.start()
+        return thread
+
+    def submit(self, executor: Executor, source: Union[Iterable[dict], Callable[[], Iterable[dict]]]) -> Future:
+        self._register()
+        future = executor.submit(self._consume, source)
+        self.start()
+        return future
+
+    def start(self) -> None:
+        if self._after_id is None and not self.done:
+            self._after_id = self._widget.after(self._interval, self._drain)
+
+    def cancel(self) -> None:
+        # producers stop at their next chunk, rows still queued are dropped
+        self._cancelled.set()
+        if self._after_id is not None:
+            self._widget.after_cancel(self._after_id)
+            self._after_id = None
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._finish()
+
+    def _drain(self) -> None:
+        self._after_id = None
+        if self.done:
+            return
+        deadline = time.perf_counter() + self._slice
+        busy = False
+        failure = None
+        with self._data.batch():
+            while True:
+                if time.perf_counter() >= deadline:
+                    busy = True
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    with self._lock:
+                        self._producers -= 1
+                        self._finished = self._producers <= 0
+                elif isinstance(item, _Failure):
+                    self.error = self.error or item.error
+                else:
+                    try:
+                        self._data.extend(item)
+                    except Exception as error:
+                        failure = error
+                        break
+                    self.loaded += len(item)
+                    if self._on_chunk is not None:
+                        self._on_chunk(len(item))
+        if failure is not None:
+            # rows that can't go in (a duplicate key, a column missing for a columnar store)
+            # end the load: producers stop, queued rows are dropped and on_done hears why
+            self.error = failure
+            self.cancel()
+            return
+        if self._finished and not busy:
+            self._finish()
+            return
+        self._show_progress()
+        # a full slice means more rows are waiting, come back as soon as events are handled
+        self._after_id = self._widget.after(1 if busy else self._interval, self._drain)
+
+    def _show_progress(self) -> None:
+        show = getattr(self._widget, 'show_progress', None)
+        if show is not None:
+            show(self.loaded, self.total)
+
+    def _finish(self) -> None:
+        self.done = True
+        hide = getattr(self._widget, 'hide_progress', None)
+        if hide is not None:
+            hide()
+        if self._on_done is not None:
+            self._on_done(self.error)
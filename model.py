@@ -0,0 +1,1024 @@
+import sys
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from itertools import compress
+from aggregates import FUNCTIONS, Aggregator, subtotal
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Protocol, Sequence, Tuple, Union
+import exchange
+from changes import Change
+from filters import Filter, FilterCache
+from groups import Groups
+from instrumentation import Stats, timed
+from pagecache import PageCache
+from providers import DataProvider
+from schema import Schema, compile_column, infer_column
+from sortkeys import SortKey, argsort
+
+# a column by position or header, alone or as a list of (column, 'asc' | 'desc')
+SortSpec = Union[int, str, Sequence[Tuple[Union[int, str], str]], None]
+
+
+class DataSource(Protocol):
+    # The rows a GridModel holds in memory, as rowsource.RowSource (and DataSourceVar, the
+    # same rows as a tkinter Variable) has them. callable() must call back with a
+    # changes.Change: every single mutation right away for 'mutation', once per batch of
+    # them for 'change'. Looked up with getattr, so optional: schema (declared columns),
+    # headers() (the columns of a source without rows) and remove_callable() (for
+    # GridModel.close()).
+    def __len__(self) -> int: ...
+
+    def __getitem__(self, index: int) -> dict: ...
+
+    def get(self) -> Sequence[dict]: ...
+
+    def column(self, header: str) -> list: ...
+
+    def index(self, row: dict) -> int: ...
+
+    def locate(self, key) -> int: ...
+
+    def row_version(self, row: dict) -> int: ...
+
+    def set_cell(self, index: int, column: str, value: Any) -> None: ...
+
+    def callable(self, func: Callable[[Change], Any], method: str, add=False) -> None: ...
+
+
+class SortSnapshot(NamedTuple):
+    # what a worker needs to sort the rows in sort_order, see GridModel.sort_snapshot
+    sort_order: list
+    columns: List[list]
+    reverses: Tuple[bool, ...]
+    wrapped: frozenset
+    version: int
+
+
+class _Layout(NamedTuple):
+    # the groups shown, the position of the header row of each and the number of positions
+    keys: List[tuple]
+    starts: List[int]
+    start_of: dict
+    size: int
+
+
+class GridModel:
+    # Everything a table knows that isn't a widget: paging, the sort permutation, the
+    # filter, cell formatting and parsing, and lookups. Nothing here imports tkinter, so
+    # the model runs headless (a server process, a test, a benchmark) as well as behind a
+    # DataGridView, which subscribes to it and only paints.
+    # data is a RowSource or a DataSourceVar (or another DataSource) or a DataProvider.
+    def __init__(self, data: Union[DataSource, DataProvider], page_size: int = 50, schema: Schema = None,
+                 true_string='True', false_string='False', cache_pages=16, headers: Optional[Sequence[str]] = None):
+        self.stats = Stats()
+        # a DataProvider is paged through instead of held in memory, see providers.py
+        self._provider = data if isinstance(data, DataProvider) else None
+        self.data = data
+        self.headers = list(headers) if headers is not None else self._data_headers()
+        self.page_size = page_size
+        self.true_string = true_string
+        self.false_string = false_string
+        self._page = 0
+        self._listeners = []
+        self._blocks = OrderedDict()
+        self._count = None
+        self.sort_order = None
+        self._order = None
+        # rows added at the end that the order doesn't hold yet, see _sort_added()
+        self._added = 0
+        self._positions = None
+        self._keys = {}
+        self._wrapped = set()
+        self._filter = None
+        self._filters = FilterCache()
+        self._rows = None
+        self._rows_stale = False
+        self._schema = schema
+        self._build_schema(schema)
+        # no rows to infer the column types from yet, the first ones to arrive tell them
+        self._untyped = self._provider is None and not len(data)
+        # formatted rows by identity, reused until the row is edited (see DataSourceVar.row_version)
+        self._display = OrderedDict()
+        self._display_size = max(cache_pages, 4) * page_size * 2
+        self._page_cache = PageCache(cache_pages)
+        self._aggregator = None
+        self._aggregate_scope = 'all'
+        # group header rows, see group_by()
+        self._groups = None
+        self._group_default = False
+        self._toggled = set()
+        self._group_keys = None
+        self._layout = None
+        self._group_rows_cache = {}
+        self._summaries = {}
+        # counts the mutations of the data, tells if a snapshot taken for a worker is out of date
+        self.version = 0
+        if self._provider is None:
+            self.data.callable(self._on_change, 'change', True)
+            self.data.callable(self._on_mutation, 'mutation', True)
+
+    @property
+    def provider(self) -> Optional[DataProvider]:
+        return self._provider
+
+    @property
+    def filter(self) -> Optional[Filter]:
+        return self._filter
+
+    def subscribe(self, listener: Callable[[Change], None]) -> None:
+        # listener(change) hears about every data change once the model has caught up with
+        # it, and about sorting and filtering as a Change('reset', ...) covering every position
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[Change], None]) -> None:
+        self._listeners.remove(listener)
+
+    def close(self) -> None:
+        # stop following the data, e.g. once the only view of the model is gone; the data
+        # no longer keeps the model (and its caches) alive
+        remove = getattr(self.data, 'remove_callable', None)
+        if self._provider is None and remove is not None:
+            remove(self._on_change, 'change')
+            remove(self._on_mutation, 'mutation')
+        self._listeners.clear()
+
+    def _notify(self, change: Change) -> None:
+        for listener in self._listeners:
+            listener(change)
+
+    def _reset(self) -> None:
+        # every position may show another row now
+        self._notify(Change('reset', 0, sys.maxsize))
+
+    # paging
+
+    @property
+    def page(self) -> int:
+        return self._page
+
+    def set_page(self, page: int) -> int:
+        self._page = max(0, min(page, self.last_page))
+        return self._page
+
+    @property
+    def page_count(self) -> int:
+        # an empty table still shows one (blank) page
+        return max(-(-self.row_count() // self.page_size), 1)
+
+    @property
+    def last_page(self) -> int:
+        return self.page_count - 1
+
+    def window(self) -> Tuple[int, int]:
+        # positions [first, first + page_size) of the current page, the ones past the end are blank
+        first = self._page * self.page_size
+        return first, first + self.page_size
+
+    def row_count(self) -> int:
+        # shown positions: rows, or group header rows and the rows of expanded groups
+        if self._provider is not None:
+            if self._count is None:
+                self._count = self._provider.count(self._filter)
+            return self._count
+        if self._groups is not None:
+            return self._group_layout().size
+        return self._row_total()
+
+    def _row_total(self) -> int:
+        rows = self._visible()
+        return len(self.data) if rows is None else len(rows)
+
+    # formatting
+
+    def _revise_values(self, value, reverse=False, none_type=False):
+        if not reverse:
+            if isinstance(value, bool):
+                return self.true_string if value else self.false_string
+            if value is None:
+                return None if none_type else ''
+            return value
+        else:
+            if value is None or value.strip() == '':
+                return None
+            elif isinstance(value, str) and value.strip().lower() == self.true_string.lower():
+                return True
+            elif isinstance(value, str) and value.strip().lower() == self.false_string.lower():
+                return False
+            else:
+                try:
+                    return int(value)
+                except ValueError:
+                    return value
+
+    def _format_auto(self, value) -> str:
+        # columns without a declared or inferable dtype keep the historical formatting
+        value = self._revise_values(value)
+        return value if isinstance(value, str) else str(value)
+
+    def _data_headers(self) -> List[str]:
+        # an empty list has no row to read the keys of, a RowSource may still know them
+        data = self.data
+        if self._provider is not None or callable(getattr(data, 'headers', None)):
+            headers = data.headers()
+        else:
+            headers = list(data[0].keys()) if len(data) else []
+        if not headers:
+            raise ValueError('the data has no rows to take the headers from, pass headers=')
+        return list(headers)
+
+    def _build_schema(self, schema: Optional[Schema]) -> None:
+        # the model's schema wins over the data's; undeclared columns take the type of their
+        # values, see schema.infer_column
+        declared = {**getattr(self.data, 'schema', {}), **(schema or {})}
+        self._formats = []
+        self._parsers = []
+        self._dtypes = []
+        for header in self.headers:
+            column = declared.get(header)
+            if column is None and self._provider is None:
+                column = infer_column(self.data.column(header))
+            if column is None:
+                self._formats.append((header, self._format_auto))
+                self._parsers.append(None)
+                self._dtypes.append(None)
+                continue
+            format_value, parse_text = compile_column(column, self.true_string, self.false_string)
+            self._formats.append((header, format_value))
+            self._parsers.append(parse_text)
+            self._dtypes.append(getattr(column, 'dtype', column))
+
+    def set_headers(self, headers: Sequence[str]) -> None:
+        # show other columns of the same rows; the sort order refers to the old ones and is dropped
+        self.headers = list(headers)
+        self._build_schema(self._schema)
+        self._display.clear()
+        self.sort_order = None
+        self._keys.clear()
+        self._wrapped.clear()
+        self._groups = None
+        self._apply_sort()
+        self._reset()
+
+    def format_row(self, row: dict) -> List[str]:
+        if self._provider is not None or not isinstance(row, dict):
+            return [format_value(row[header]) for header, format_value in self._formats]
+        display = self._display
+        entry = display.get(id(row))
+        version = self.data.row_version(row)
+        if entry is not None and entry[0] is row and entry[1] == version:
+            display.move_to_end(id(row))
+            return entry[2]
+        texts = [format_value(row[header]) for header, format_value in self._formats]
+        # the row itself is kept in the entry, so its id can't be reused while cached
+        display[id(row)] = (row, version, texts)
+        if len(display) > self._display_size:
+            display.popitem(last=False)
+        return texts
+
+    def texts(self, pos: int) -> List[str]:
+        # cell strings of the row shown at pos, formatted a page at a time and cached
+        page = pos // self.page_size
+        texts = self._page_cache.get(page)
+        if texts is None:
+            texts = self.format_page(page)
+        return texts[pos - page * self.page_size]
+
+    @timed('format_page')
+    def format_page(self, page: int) -> List[List[str]]:
+        first = page * self.page_size
+        last = min(first + self.page_size, self.row_count())
+        texts = [self._texts_at(pos) for pos in range(first, last)]
+        self._page_cache.put(page, texts)
+        return texts
+
+    def _texts_at(self, pos: int) -> List[str]:
+        if self._groups is not None:
+            key, index = self._group_entry(pos)
+            return self._group_texts(key) if index == -1 else self.format_row(self.data[index])
+        return self.format_row(self.row(pos))
+
+    def is_formatted(self, page: int) -> bool:
+        return page in self._page_cache
+
+    # editing
+
+    def parse(self, col: int, text: str, current=None):
+        # the value text stands for in column col; ValueError carries a message for the user
+        parse_text = self._parsers[col]
+        if parse_text is None:
+            # undeclared columns only take a value of the type already in the cell
+            value = self._revise_values(text, True)
+            if type(value) != type(current):
+                raise ValueError(f"Incorrect type! Please insert a valid value.\n\nCOD: <{type(value)}{type(current)}>")
+            return value
+        try:
+            return parse_text(text)
+        except (ValueError, ArithmeticError):
+            dtype = self._dtypes[col]
+            raise ValueError(f"Incorrect type! Please insert a valid {getattr(dtype, '__name__', dtype)}.") from None
+
+    def edit(self, pos: int, col: int, text: str):
+        # parse text into the cell at (pos, col); the data's setitem change then moves the
+        # row under the sort and the filter. ValueError when the text or the key is rejected
+        if self._provider is not None:
+            raise ValueError('rows of a data provider are read-only')
+        row = self.source_index(pos)
+        if row == -1:
+            raise ValueError("A group row can't be edited.")
+        header = self.headers[col]
+        value = self.parse(col, text, self.data[row][header])
+        self.data.set_cell(row, header, value)
+        return value
+
+    # changes of the data
+
+    def _on_change(self, change: Change) -> None:
+        # once per batch: the order and the masks already follow the data (see _on_mutation),
+        # what is left is to drop what was painted from them
+        if self._untyped and len(self.data):
+            self._untyped = False
+            self._build_schema(self._schema)
+            self._display.clear()
+        if self._groups is not None:
+            changed = self._groups.take_changed()
+            layout = self._layout
+            self._regroup(changed)
+            if (layout is not None and changed is not None and self._filter is None and not self._groups.keys_changed
+                    and not any(map(self._is_expanded, changed))):
+                # only collapsed groups changed, each still takes its one header row
+                self._layout = layout
+        if self._order is None and self._filter is None and self._groups is None:
+            self._page_cache.invalidate_rows(change.start, change.stop, self.page_size)
+        else:
+            # sorted or filtered positions move around, no page can be trusted
+            self._page_cache.clear()
+        self._notify(change)
+
+    def _on_mutation(self, change: Change) -> None:
+        # unbatched, so the sort permutation, the filter masks and the aggregates follow
+        # every single append, pop and edit; a batch mixing them merges into one Change that
+        # says too little to patch them with
+        self.version += 1
+        self._forget_display(change)
+        shown = self._shown_before(change)
+        if self._order is not None:
+            self._update_order(change)
+        self._filters.update(self.data, change)
+        self._patch_rows(change, shown)
+        if self._aggregator is not None:
+            self._aggregator.update(change)
+        if self._groups is not None:
+            self._groups.update(change)
+
+    def _forget_display(self, change: Change) -> None:
+        # the versions of rows that left the data start over if they come back, their
+        # formatted texts would look current
+        if change.action in ('set', 'clear'):
+            self._display.clear()
+        elif change.old is not None and change.action in ('pop', 'remove', 'setitem'):
+            display = self._display
+            for row in change.old:
+                entry = display.get(id(row))
+                if entry is not None and entry[0] is row:
+                    del display[id(row)]
+
+    def _shown_before(self, change: Change) -> Optional[bytearray]:
+        # which of the rows a pop or an edit is about passed the filter before it
+        mask = None if self._filter is None else self._filters.get(self._filter)
+        if mask is None:
+            return None
+        if change.action in ('pop', 'remove'):
+            return mask[change.start:change.start + 1]
+        return mask[change.start:change.stop] if change.action == 'setitem' else bytearray()
+
+    def _patch_rows(self, change: Change, shown: Optional[bytearray]) -> None:
+        # move the filtered rows along with one mutation, instead of going over the whole
+        # mask again on the next read; big or unusual changes still build them anew
+        self._positions = None
+        if self._filter is None:
+            self._rows = self._order
+            return
+        rows = self._rows
+        mask = self._filters.get(self._filter)
+        action = change.action
+        count = 1 if action in ('insert', 'pop', 'remove') else change.stop - change.start
+        if (self._rows_stale or rows is None or mask is None or shown is None or self._added
+                or count * 8 >= len(mask)):
+            self._rows_stale = True
+            return
+        sorted_ = self._order is not None
+        if action in ('append', 'extend', 'insert'):
+            start = change.start
+            if start + count < len(mask):
+                rows = self._rows = [index + count if index >= start else index for index in rows]
+            self._show([index for index in range(start, start + count) if mask[index]])
+        elif action in ('pop', 'remove'):
+            index = change.start
+            if sorted_:
+                self._rows = [i - 1 if i > index else i for i in rows if i != index]
+            else:
+                place = bisect_left(rows, index)
+                if shown[0]:
+                    del rows[place]
+                if place < len(rows):
+                    rows[place:] = [i - 1 for i in rows[place:]]
+        elif action == 'setitem':
+            added = []
+            for index, was in zip(range(change.start, change.stop), shown):
+                if was and (sorted_ or not mask[index]):
+                    # sorted rows move to the place of their new values
+                    if sorted_:
+                        rows.remove(index)
+                    else:
+                        del rows[bisect_left(rows, index)]
+                if mask[index] and (sorted_ or not was):
+                    added.append(index)
+            self._show(added)
+        else:
+            self._rows_stale = True
+
+    def _show(self, indices: List[int]) -> None:
+        if not indices:
+            return
+        if self._order is None:
+            for index in indices:
+                insort(self._rows, index)
+        else:
+            self._insert_sorted(self._rows, indices)
+
+    def reload(self) -> None:
+        # the provider's rows changed behind the model's back, fetch them again
+        self._drop_pages()
+        self._reset()
+
+    def _drop_pages(self) -> None:
+        self._blocks.clear()
+        self._page_cache.clear()
+        self._count = None
+
+    # rows by position
+
+    def _visible(self) -> Optional[List[int]]:
+        # source index of every shown position: the sort permutation, narrowed by the
+        # filter; None while the table shows the source list as it is
+        if self._added:
+            self._sort_added()
+        if self._rows_stale:
+            self._rows_stale = False
+            self._positions = None
+            if self._filter is None:
+                self._rows = self._order
+            else:
+                mask = self._filters.mask(self._filter, self.data.get())
+                if self._order is None:
+                    self._rows = list(compress(range(len(mask)), mask))
+                else:
+                    self._rows = [index for index in self._order if mask[index]]
+        return self._rows
+
+    def is_identity(self) -> bool:
+        # True while position n shows source row n
+        return self._provider is None and self._groups is None and self._visible() is None
+
+    def row(self, pos: int) -> dict:
+        # rows are read through the sort permutation, the source list is never copied
+        if self._provider is not None:
+            return self._fetch_row(pos)
+        index = self.source_index(pos)
+        # a group header row stands for no row of the data
+        return None if index == -1 else self.data[index]
+
+    def _provider_sort(self) -> Optional[List[Tuple[str, str]]]:
+        return [(self.headers[col], direction) for col, direction in self.sort_order or []] or None
+
+    def _fetch_row(self, pos: int) -> dict:
+        # providers are read one page at a time, the last few pages are kept
+        start = pos - pos % self.page_size
+        rows = self._blocks.get(start)
+        if rows is None:
+            with self.stats.timed('fetch'):
+                rows = self._blocks[start] = self._provider.fetch(start, self.page_size, self._provider_sort(),
+                                                                  self._filter)
+            while len(self._blocks) > 4:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(start)
+        return rows[pos - start]
+
+    def source_index(self, pos: int) -> int:
+        # -1 for a group header row
+        if self._groups is not None:
+            return self._group_entry(pos)[1]
+        rows = self._visible()
+        return pos if rows is None else rows[pos]
+
+    def _ranks(self) -> Optional[List[int]]:
+        # place of every source row under the sort and the filter (-1 when filtered out),
+        # None while that is the source index itself
+        rows = self._visible()
+        if rows is None:
+            return None
+        if self._positions is None:
+            # inverse of the shown rows, built once per order or filter
+            self._positions = [-1] * len(self.data)
+            for position, source in enumerate(rows):
+                self._positions[source] = position
+        return self._positions
+
+    def position(self, index: int) -> int:
+        # position of source row index under the sort, the filter and the groups, -1 when
+        # filtered out or in a collapsed group
+        ranks = self._ranks()
+        if self._groups is None:
+            return index if ranks is None else ranks[index]
+        if ranks is not None and ranks[index] == -1:
+            return -1
+        key = self._groups.key_of(index)
+        start = self._group_layout().start_of.get(key)
+        if start is None or not self._is_expanded(key):
+            return -1
+        rows = self._group_rows(key)
+        offset = bisect_left(rows, index) if ranks is None else bisect_left(rows, ranks[index], key=ranks.__getitem__)
+        return start + 1 + offset
+
+    def index(self, row) -> int:
+        # position of the row in the (sorted, filtered) table, whatever page is showing
+        if self._provider is not None:
+            # a provider can't be searched without reading it all
+            return -1
+        try:
+            return self.position(self.data.index(row))
+        except ValueError:
+            return -1
+
+    def find(self, pos: int) -> Optional[dict]:
+        if not 0 <= pos < self.row_count():
+            return None
+        row = self.row(pos)
+        return None if row is None else dict(row)
+
+    def locate(self, key) -> int:
+        # position of the row with the given primary key, see DataSourceVar(key=...)
+        if self._provider is not None:
+            raise ValueError('locate() needs a DataSourceVar with a key')
+        index = self.data.locate(key)
+        if index == -1:
+            return -1
+        if self._groups is not None:
+            # the row is shown in its group, open it
+            self.set_expanded(self._groups.key_of(index))
+        return self.position(index)
+
+    def chunks(self, size: int = 10000) -> Iterator[list]:
+        # every shown row in the shown order, size rows at a time; only a chunk is held.
+        # Group header rows are left out and collapsed groups are not
+        total = self.row_count() if self._provider is not None else self._row_total()
+        if self._provider is not None:
+            sort = self._provider_sort()
+            for offset in range(0, total, size):
+                yield self._provider.fetch(offset, size, sort, self._filter)
+            return
+        data = self.data
+        rows = self._visible()
+        for start in range(0, total, size):
+            stop = min(start + size, total)
+            yield [data[index] for index in (range(start, stop) if rows is None else rows[start:stop])]
+
+    @timed('export')
+    def export(self, path: str, fmt: Optional[str] = None, chunk_size: int = 10000,
+               progress: Optional[exchange.Progress] = None, **options) -> int:
+        # stream the shown columns of the shown rows (sorted, filtered) to a 'csv' or 'jsonl'
+        # file, fmt defaults to the path's extension; progress(rows_written, rows)
+        total = self.row_count() if self._provider is not None else self._row_total()
+        return exchange.write(path, self.headers, self.chunks(chunk_size), fmt, total, progress, **options)
+
+    # sorting
+
+    def _wrap_keys(self, values: list) -> list:
+        # None sorts first and booleans sort by their strings, as they are shown
+        true_string, false_string = self.true_string, self.false_string
+        return [(False, None) if value is None else
+                (True, (true_string if value else false_string) if isinstance(value, bool) else value)
+                for value in values]
+
+    def _sort_keys(self, col: int) -> list:
+        # decoded key column, kept in step with the data by _update_order
+        keys = self._keys.get(col)
+        if keys is None:
+            keys, wrapped = self._key_column(col)
+            if wrapped:
+                self._wrapped.add(col)
+            else:
+                self._wrapped.discard(col)
+            self._keys[col] = keys
+        return keys
+
+    def _key_column(self, col: int) -> Tuple[list, bool]:
+        keys = self.data.column(self.headers[col])
+        types = set(map(type, keys))
+        if bool in types or type(None) in types:
+            return self._wrap_keys(keys), True
+        return keys, False
+
+    def _set_keys(self, col: int, start: int, stop: int, values: list) -> None:
+        # plain values compare as they are; the column switches to wrapped keys the first
+        # time a None or a boolean shows up
+        keys = self._keys[col]
+        if col not in self._wrapped and any(value is None or isinstance(value, bool) for value in values):
+            keys[:] = self._wrap_keys(keys)
+            self._wrapped.add(col)
+        keys[start:stop] = self._wrap_keys(values) if col in self._wrapped else values
+
+    def _sort_spec(self) -> List[Tuple[int, bool]]:
+        return [(col, direction == 'desc') for col, direction in self.sort_order or []]
+
+    def _apply_sort(self) -> None:
+        self._page_cache.clear()
+        if self._provider is not None:
+            # the provider sorts, the pages fetched in the old order are useless now
+            self._blocks.clear()
+            return
+        self._rows_stale = True
+        self._added = 0
+        self._regroup()
+        spec = self._sort_spec()
+        for col in list(self._keys):
+            if col not in dict(spec):
+                del self._keys[col]
+                self._wrapped.discard(col)
+        if not spec:
+            self._order = None
+            return
+        self._order = argsort([self._sort_keys(col) for col, _ in spec], [reverse for _, reverse in spec])
+
+    def _order_key(self) -> Callable[[int], SortKey]:
+        # the place of a source index in the order, for binary searches
+        spec = self._sort_spec()
+        columns = [self._keys[col] for col, _ in spec]
+        reverses = tuple(reverse for _, reverse in spec)
+
+        def key(index):
+            return SortKey(tuple(keys[index] for keys in columns), index, reverses)
+
+        return key
+
+    def _insert_sorted(self, order: List[int], indices: Sequence[int]) -> None:
+        # binary search the sorted position of every given row instead of sorting again;
+        # more than one row is spliced in with a single copy of order
+        key = self._order_key()
+        if len(indices) == 1:
+            order.insert(bisect_right(order, key(indices[0]), key=key), indices[0])
+            return
+        merged, last = [], 0
+        for index in sorted(indices, key=key):
+            place = bisect_right(order, key(index), last, key=key)
+            merged += order[last:place]
+            merged.append(index)
+            last = place
+        merged += order[last:]
+        order[:] = merged
+
+    def _sort_added(self) -> None:
+        # stable sorts of the nearly sorted order place every added row at once; rows with
+        # equal keys stay in source order, as the added indices are behind the old ones
+        order = self._order
+        order.extend(range(len(order), len(order) + self._added))
+        self._added = 0
+        self._positions = None
+        spec = self._sort_spec()
+        argsort([self._sort_keys(col) for col, _ in spec], [reverse for _, reverse in spec], order)
+
+    def _update_order(self, change: Change) -> None:
+        order = self._order
+        action = change.action
+        count = 1 if action == 'insert' else change.stop - change.start
+        if action in ('append', 'extend') and (self._added or count * 512 > len(order)):
+            # many rows at the end (a load, a batch of appends): their keys now, their
+            # places once the order is read again
+            rows = [self.data[index] for index in range(change.start, change.stop)]
+            for col in self._keys:
+                self._set_keys(col, change.start, change.start, [row[self.headers[col]] for row in rows])
+            self._added += count
+            return
+        if self._added:
+            self._sort_added()
+            order = self._order
+        if action in ('append', 'extend', 'insert') and count * 8 < len(self.data):
+            start = change.start
+            rows = [self.data[index] for index in range(start, start + count)]
+            for col in self._keys:
+                self._set_keys(col, start, start, [row[self.headers[col]] for row in rows])
+            if start < len(order):
+                order = self._order = [index + count if index >= start else index for index in order]
+            self._insert_sorted(order, range(start, start + count))
+        elif action in ('pop', 'remove'):
+            index = change.start
+            for keys in self._keys.values():
+                del keys[index]
+            self._order = [i - 1 if i > index else i for i in order if i != index]
+        elif action == 'setitem' and count * 8 < len(self.data):
+            # rows edited in place: refresh their keys and move them to their new place
+            start, stop = change.start, change.stop
+            key = self._order_key()
+            for index in range(start, stop):
+                # found by the keys they had before the edit
+                del order[bisect_left(order, key(index), key=key)]
+            rows = [self.data[index] for index in range(start, stop)]
+            for col in self._keys:
+                self._set_keys(col, start, stop, [row[self.headers[col]] for row in rows])
+            self._insert_sorted(order, range(start, stop))
+        else:
+            self._keys.clear()
+            self._apply_sort()
+
+    def _sort_pair(self, col: Union[int, str], direction: str) -> Tuple[int, str]:
+        if isinstance(col, str):
+            col = self.headers.index(col)
+        if direction not in ('asc', 'desc'):
+            raise ValueError(f"sort direction must be 'asc' or 'desc', not {direction!r}")
+        return col, direction
+
+    def next_sort_order(self, col: SortSpec, add=False, current: Optional[list] = None) -> Optional[list]:
+        # the sort order sort(col, add) leads to from current (the model's by default): a
+        # column toggles between descending and ascending, add=True extends (or flips a
+        # column of) the order, a list is the whole order, None unsorts
+        if col is None:
+            return None
+        if isinstance(col, (list, tuple)):
+            return [self._sort_pair(col_, direction) for col_, direction in col] or None
+        col, _ = self._sort_pair(col, 'asc')
+        current = (self.sort_order if current is None else current) or []
+        if add:
+            if col in dict(current):
+                return [(col_, ('asc' if direction == 'desc' else 'desc') if col_ == col else direction)
+                        for col_, direction in current]
+            return current + [(col, 'desc')]
+        if current == [(col, 'desc')]:
+            return [(col, 'asc')]
+        return [(col, 'desc')]
+
+    @timed('sort')
+    def sort(self, col: SortSpec, add=False) -> None:
+        self.sort_order = self.next_sort_order(col, add)
+        self._apply_sort()
+        self._reset()
+
+    def sort_snapshot(self, sort_order: list) -> SortSnapshot:
+        # copies of the key columns of sort_order, for sorting somewhere else (a process
+        # pool, see parallel.py) while the data keeps changing here
+        columns, wrapped = [], set()
+        for col, _ in sort_order:
+            if col in self._keys:
+                keys, wraps = list(self._keys[col]), col in self._wrapped
+            else:
+                keys, wraps = self._key_column(col)
+            columns.append(keys)
+            if wraps:
+                wrapped.add(col)
+        return SortSnapshot(list(sort_order), columns, tuple(direction == 'desc' for _, direction in sort_order),
+                            frozenset(wrapped), self.version)
+
+    def apply_order(self, snapshot: SortSnapshot, order: List[int]) -> bool:
+        # show the rows in order, the source indices of the snapshot sorted; False, and
+        # nothing changes, when the data changed since the snapshot was taken
+        if snapshot.version != self.version:
+            return False
+        self.sort_order = snapshot.sort_order
+        self._keys = {col: keys for (col, _), keys in zip(snapshot.sort_order, snapshot.columns)}
+        self._wrapped = set(snapshot.wrapped)
+        self._order = order
+        self._added = 0
+        self._rows_stale = True
+        self._regroup()
+        self._page_cache.clear()
+        self._reset()
+        return True
+
+    # filtering
+
+    @timed('set_filter')
+    def set_filter(self, predicate: Optional[Filter]) -> None:
+        # show only the rows matching predicate (see filters.py), None shows every row;
+        # the model goes back to the first page
+        if self._provider is not None and predicate is not None:
+            self._provider.check_filter(predicate)
+        self._filter = predicate
+        self._rows_stale = True
+        self._regroup(None)
+        self._drop_pages()
+        self._page = 0
+        if self._aggregator is not None and self._aggregate_scope == 'filter':
+            self._aggregator.predicate = predicate
+            self._aggregator.rebuild()
+        self._reset()
+
+    def filter_cached(self, predicate: Filter) -> bool:
+        # True when set_filter(predicate) needs no rows tested
+        return predicate in self._filters
+
+    def apply_filter(self, predicate: Filter, mask: bytearray, version: int) -> bool:
+        # set_filter with the mask of predicate worked out elsewhere (see parallel.py) from
+        # the data at version; False, and nothing changes, when the data changed since
+        if version != self.version:
+            return False
+        self._filters.put(predicate, mask)
+        self.set_filter(predicate)
+        return True
+
+    # grouping
+
+    @property
+    def grouped_by(self) -> Optional[List[str]]:
+        return None if self._groups is None else list(self._groups.headers)
+
+    def group_by(self, headers: Optional[Sequence[str]], expanded=False,
+                 members: Optional[Dict[tuple, List[int]]] = None) -> None:
+        # show a header row per distinct tuple of values in headers, with the count and the
+        # subtotals of its rows, and the rows of the group under it while it's expanded;
+        # groups start collapsed unless expanded=True. None (or no headers) ungroups
+        if self._provider is not None:
+            raise ValueError('grouping needs the rows in memory, a DataProvider only hands out pages')
+        self._groups = Groups(self.data, headers, members) if headers else None
+        self._group_default = expanded
+        self._toggled = set()
+        self._group_keys = None
+        self._regroup(None)
+        self._page_cache.clear()
+        self._page = 0
+        self._reset()
+
+    def apply_groups(self, headers: Sequence[str], members: Dict[tuple, List[int]], version: int,
+                     expanded=False) -> bool:
+        # group_by with the source indices of each group worked out elsewhere (see
+        # parallel.py) from the data at version; False, and nothing changes, when the data
+        # changed since
+        if version != self.version:
+            return False
+        self.group_by(headers, expanded, members)
+        return True
+
+    def ungroup(self) -> None:
+        self.group_by(None)
+
+    def _regroup(self, changed: Optional[Sequence[tuple]] = ()) -> None:
+        # positions under the groups moved; the summaries of the changed groups (of all of
+        # them with None) are out of date
+        self._layout = None
+        self._group_rows_cache.clear()
+        if changed is None:
+            self._summaries.clear()
+        else:
+            for key in changed:
+                self._summaries.pop(key, None)
+
+    @staticmethod
+    def _group_order(key: tuple) -> tuple:
+        # groups of None come first, as None sorts first
+        return tuple((False, '') if value is None else (True, value) for value in key)
+
+    def _is_expanded(self, key: tuple) -> bool:
+        return (key in self._toggled) != self._group_default
+
+    def _group_layout(self) -> _Layout:
+        # a group takes its header row, plus a row per shown member while it's expanded;
+        # groups with every row filtered out are left out
+        if self._layout is None:
+            groups = self._groups
+            if groups.keys_changed or self._group_keys is None:
+                try:
+                    self._group_keys = sorted(groups.members, key=self._group_order)
+                except TypeError:
+                    # values of mixed types have no order, go by what is shown
+                    self._group_keys = sorted(groups.members, key=lambda key: tuple(map(str, key)))
+                groups.keys_changed = False
+            mask = None if self._filter is None else self._filters.mask(self._filter, self.data.get())
+            keys, starts, position = [], [], 0
+            for key in self._group_keys:
+                if self._is_expanded(key):
+                    rows = len(self._group_rows(key))
+                    shown = rows > 0
+                else:
+                    rows = 0
+                    shown = mask is None or any(map(mask.__getitem__, groups.members[key]))
+                if shown:
+                    keys.append(key)
+                    starts.append(position)
+                    position += 1 + rows
+            self._layout = _Layout(keys, starts, dict(zip(keys, starts)), position)
+        return self._layout
+
+    def _group_rows(self, key: tuple) -> List[int]:
+        # source indices of the shown members of a group, in the order of the sort; only
+        # worked out for the groups that are expanded
+        rows = self._group_rows_cache.get(key)
+        if rows is None:
+            members = self._groups.members[key]
+            ranks = self._ranks()
+            if ranks is None:
+                rows = members
+            else:
+                rows = [index for index in members if ranks[index] != -1]
+                rows.sort(key=ranks.__getitem__)
+            self._group_rows_cache[key] = rows
+        return rows
+
+    def _group_entry(self, pos: int) -> Tuple[tuple, int]:
+        # the group at pos and the source index of the row there, -1 for the header row
+        layout = self._group_layout()
+        slot = bisect_right(layout.starts, pos) - 1
+        if slot < 0 or pos >= layout.size:
+            raise IndexError(f'position {pos} out of range')
+        key = layout.keys[slot]
+        offset = pos - layout.starts[slot]
+        return key, -1 if offset == 0 else self._group_rows(key)[offset - 1]
+
+    def is_group_row(self, pos: int) -> bool:
+        return self._groups is not None and 0 <= pos < self.row_count() and self._group_entry(pos)[1] == -1
+
+    def group_key(self, pos: int) -> Optional[tuple]:
+        # values of the grouped headers of the group pos belongs to
+        return None if self._groups is None else self._group_entry(pos)[0]
+
+    def group_summary(self, key: tuple) -> Tuple[int, dict]:
+        # (rows shown, {header: subtotal}) of a group; worked out the first time a header
+        # row of the group is formatted, then kept until its rows or the filter change
+        summary = self._summaries.get(key)
+        if summary is None:
+            members = self._groups.members.get(key, [])
+            if self._filter is not None:
+                mask = self._filters.mask(self._filter, self.data.get())
+                members = [index for index in members if mask[index]]
+            rows = [self.data[index] for index in members]
+            grouped = self._groups.headers
+            totals = {header: subtotal([row[header] for row in rows])
+                      for header in self.headers if header not in grouped}
+            summary = self._summaries[key] = (len(members), totals)
+        return summary
+
+    def _group_texts(self, key: tuple) -> List[str]:
+        # the label (values, row count) in the first column, subtotals under the others
+        count, totals = self.group_summary(key)
+        formats = dict(self._formats)
+        values = ' / '.join(formats[header](value) if header in formats else str(value)
+                            for header, value in zip(self._groups.headers, key))
+        texts = [self.format_aggregate(col, 'sum', totals.get(header)) for col, header in enumerate(self.headers)]
+        texts[0] = f"{'▾' if self._is_expanded(key) else '▸'} {values} ({count:,})"
+        return texts
+
+    def set_expanded(self, key: tuple, expanded=True) -> None:
+        if self._is_expanded(key) == expanded:
+            return
+        self._toggled ^= {key}
+        self._regroup()
+        self._page_cache.clear()
+        self._reset()
+
+    def toggle_group(self, pos: int) -> bool:
+        # open or close the group whose header row is at pos; False when there is none
+        if not self.is_group_row(pos):
+            return False
+        key = self._group_entry(pos)[0]
+        self.set_expanded(key, not self._is_expanded(key))
+        return True
+
+    def expand_all(self, expanded=True) -> None:
+        self._group_default = expanded
+        self._toggled.clear()
+        self._regroup()
+        self._page_cache.clear()
+        self._reset()
+
+    def collapse_all(self) -> None:
+        self.expand_all(False)
+
+    # aggregates
+
+    def enable_aggregates(self, headers: Optional[Sequence[str]] = None, scope: str = 'all',
+                          functions: Sequence[str] = FUNCTIONS) -> None:
+        # keep functions (count, sum, mean, min and max by default) of headers (every column
+        # by default) up to date over all rows, or over the rows passing the filter with
+        # scope='filter'
+        if self._provider is not None:
+            raise ValueError('aggregates need the rows in memory, a DataProvider only hands out pages')
+        if scope not in ('all', 'filter'):
+            raise ValueError(f"scope must be 'all' or 'filter', not {scope!r}")
+        self._aggregate_scope = scope
+        self._aggregator = Aggregator(self.data, self.headers if headers is None else headers,
+                                      self._filter if scope == 'filter' else None, functions)
+
+    def disable_aggregates(self) -> None:
+        self._aggregator = None
+
+    def aggregates(self, functions: Sequence[str] = FUNCTIONS) -> dict:
+        # {header: {function: value}}, value is None where the function doesn't apply
+        return {} if self._aggregator is None else self._aggregator.results(functions)
+
+    def format_aggregate(self, col: int, function: str, value) -> str:
+        if value is None:
+            return ''
+        if function == 'count':
+            return str(value)
+        try:
+            return self._formats[col][1](value)
+        except (TypeError, ValueError):
+            # e.g. the mean of a column formatted as whole numbers
+            return f'{value:.6g}' if isinstance(value, float) else str(value)
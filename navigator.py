@@ -16,9 +16,12 @@ class Navigator(Frame):
 
         self._begin_label = Label(self, textvariable=self._begin_page_var, justify='center', width=20)
         self._begin_button = Button(self, text='|<', command=self.goto_beginning, width=20)
-        self._previous_button = Button(self, text='<', command=self.goto_previous, width=20)
+        # holding the arrow buttons keeps paging, the grid prefetches the pages ahead
+        self._previous_button = Button(self, text='<', command=self.goto_previous, width=20,
+                                       repeatdelay=400, repeatinterval=60)
         self._entry = Entry(self, textvariable=self._current_page_var, width=20, justify='center')
-        self._next_button = Button(self, text='>', command=self.goto_next, width=20)
+        self._next_button = Button(self, text='>', command=self.goto_next, width=20,
+                                   repeatdelay=400, repeatinterval=60)
         self._end_button = Button(self, text='>|', command=self.goto_end, width=20)
         self._end_label = Label(self, textvariable=self._last_page_var, justify='center', width=20)
 
@@ -0,0 +1,39 @@
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class PageCache:
+    # Formatted cell strings of the most recently used pages, keyed by page number.
+    # A page is a list with one list of strings per row; pages past the end are short.
+    def __init__(self, size: int = 16):
+        self._size = size
+        self._pages = OrderedDict()
+
+    def get(self, page: int) -> Optional[List[List[str]]]:
+        texts = self._pages.get(page)
+        if texts is not None:
+            self._pages.move_to_end(page)
+        return texts
+
+    def put(self, page: int, texts: List[List[str]]) -> None:
+        self._pages[page] = texts
+        self._pages.move_to_end(page)
+        while len(self._pages) > self._size:
+            self._pages.popitem(last=False)
+
+    def invalidate_rows(self, start: int, stop: int, page_size: int) -> None:
+        # drop the pages holding positions [start, stop)
+        if stop <= start:
+            return
+        first, last = start // page_size, (stop - 1) // page_size
+        for page in [page for page in self._pages if first <= page <= last]:
+            del self._pages[page]
+
+    def clear(self) -> None:
+        self._pages.clear()
+
+    def __contains__(self, page: int) -> bool:
+        return page in self._pages
+
+    def __len__(self) -> int:
+        return len(self._pages)
@@ -0,0 +1,172 @@
+import os
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor
+from heapq import merge
+from typing import Callable, Dict, Generator, List, Optional, Sequence
+from filters import Filter
+from sortkeys import SortKey, argsort
+
+# The functions below run in worker processes: they only import tkinter-free modules and
+# take and return plain picklable values. Row indices travel as array('q'), which pickles
+# as one bytes object instead of a list of ints.
+
+
+def sort_run(columns: List[list], reverses: tuple, offset: int) -> array:
+    # source indices of one chunk of rows in sorted order; columns are the chunk's key columns
+    return array('q', [offset + index for index in argsort(columns, reverses)])
+
+
+def merge_runs(columns: List[list], reverses: tuple, runs: List[array]) -> array:
+    # the sorted runs merged into one order over the whole key columns. The runs come in
+    # source order and the merge takes equal keys from the earlier run first, so rows with
+    # equal keys keep it
+    if len(set(reverses)) == 1:
+        # one direction: plain values (tuples of them for several columns) compare in C
+        keys = columns[0] if len(columns) == 1 else list(zip(*columns))
+        return array('q', merge(*runs, key=keys.__getitem__, reverse=reverses[0]))
+    keys = list(zip(*columns))
+    return array('q', merge(*runs, key=lambda index: SortKey(keys[index], index, reverses)))
+
+
+def filter_run(predicate: Filter, rows: List[dict]) -> bytearray:
+    return bytearray(map(predicate.test, rows))
+
+
+def group_run(columns: List[list], offset: int) -> Dict[tuple, array]:
+    # source indices of one chunk of rows by their tuple of group values
+    groups = {}
+    for index, key in enumerate(zip(*columns), offset):
+        groups.setdefault(key, []).append(index)
+    return {key: array('q', indices) for key, indices in groups.items()}
+
+
+class ProcessJobs:
+    # Sorting, filtering and grouping of big tables on a process pool. The Tk thread takes
+    # a snapshot (key columns or rows), the workers sort, test or group chunks of it and
+    # the result is handed to on_done on the Tk thread from after() polling. Starting a
+    # job cancels the pending one of the same kind, e.g. a click on another header.
+    # Filters and the values of the rows must pickle; on platforms that spawn workers the
+    # main script needs an `if __name__ == '__main__':` guard.
+    def __init__(self, widget, executor: Optional[Executor] = None, chunk_rows: int = 250_000,
+                 interval_ms: int = 50, on_error: Optional[Callable[[BaseException], None]] = None):
+        self._widget = widget
+        self._own_executor = executor is None
+        self._executor = executor if executor is not None else ProcessPoolExecutor(os.cpu_count())
+        self.chunk_rows = chunk_rows
+        self._interval = interval_ms
+        self._on_error = on_error
+        # kind -> [job generator, futures it waits for]
+        self._jobs = {}
+        self._after_id = None
+
+    def pending(self, kind: Optional[str] = None) -> bool:
+        return bool(self._jobs) if kind is None else kind in self._jobs
+
+    def _chunks(self, size: int) -> List[range]:
+        return [range(start, min(start + self.chunk_rows, size)) for start in range(0, size, self.chunk_rows)]
+
+    def sort(self, columns: List[list], reverses: Sequence[bool], on_done: Callable[[List[int]], None]) -> None:
+        # on_done(order) gets the source indices in sorted order
+        self._start('sort', self._sort(columns, tuple(reverses), on_done))
+
+    def _sort(self, columns, reverses, on_done) -> Generator:
+        submit = self._executor.submit
+        size = len(columns[0]) if columns else 0
+        runs = yield [submit(sort_run, [keys[chunk.start:chunk.stop] for keys in columns], reverses, chunk.start)
+                      for chunk in self._chunks(size)]
+        if len(runs) > 1:
+            runs = yield [submit(merge_runs, columns, reverses, runs)]
+        on_done(runs[0].tolist() if runs else [])
+
+    def filter(self, predicate: Filter, rows: Sequence[dict], on_done: Callable[[bytearray], None]) -> None:
+        # on_done(mask) gets a 0/1 bytearray aligned with rows
+        self._start('filter', self._filter(predicate, rows, on_done))
+
+    def _filter(self, predicate, rows, on_done) -> Generator:
+        submit = self._executor.submit
+        # row views of a columnar store don't pickle, their dicts do
+        chunk_of = ((lambda chunk: rows[chunk.start:chunk.stop]) if isinstance(rows, list) else
+                    (lambda chunk: [dict(rows[index]) for index in chunk]))
+        masks = yield [submit(filter_run, predicate, chunk_of(chunk)) for chunk in self._chunks(len(rows))]
+        on_done(bytearray().join(masks))
+
+    def group(self, columns: List[list], on_done: Callable[[Dict[tuple, List[int]]], None]) -> None:
+        # on_done(groups) gets {tuple of values: source indices} in order of first appearance
+        self._start('group', self._group(columns, on_done))
+
+    def _group(self, columns, on_done) -> Generator:
+        submit = self._executor.submit
+        size = len(columns[0]) if columns else 0
+        parts = yield [submit(group_run, [keys[chunk.start:chunk.stop] for keys in columns], chunk.start)
+                       for chunk in self._chunks(size)]
+        groups = {}
+        for part in parts:
+            for key, indices in part.items():
+                groups.setdefault(key, []).extend(indices)
+        on_done(groups)
+
+    def _start(self, kind: str, job: Generator) -> None:
+        self.cancel(kind)
+        self._jobs[kind] = [job, None]
+        self._advance(kind, None)
+        self._schedule()
+
+    def _advance(self, kind: str, results: Optional[list]) -> None:
+        # run the job up to the futures it waits for next; on_done may start another job
+        # of the same kind, which then replaces this one
+        entry = self._jobs[kind]
+        try:
+            futures = entry[0].send(results)
+        except StopIteration:
+            futures = None
+        except BaseException:
+            if self._jobs.get(kind) is entry:
+                del self._jobs[kind]
+            raise
+        if self._jobs.get(kind) is entry:
+            if futures is None:
+                del self._jobs[kind]
+            else:
+                entry[1] = futures
+
+    def cancel(self, kind: Optional[str] = None) -> None:
+        # drop the pending job of kind (every job with None); chunks already running finish
+        # in their worker but their results are thrown away
+        for kind_ in [kind] if kind is not None else list(self._jobs):
+            entry = self._jobs.pop(kind_, None)
+            if entry is None:
+                continue
+            for future in entry[1] or ():
+                future.cancel()
+            if not entry[0].gi_running:
+                entry[0].close()
+
+    def _schedule(self) -> None:
+        if self._jobs and self._after_id is None:
+            self._after_id = self._widget.after(self._interval, self._poll)
+
+    def _poll(self) -> None:
+        self._after_id = None
+        try:
+            for kind, entry in list(self._jobs.items()):
+                if self._jobs.get(kind) is not entry or not all(future.done() for future in entry[1]):
+                    # replaced by the on_done of another job, or still running
+                    continue
+                try:
+                    self._advance(kind, [future.result() for future in entry[1]])
+                except Exception as error:
+                    if self._jobs.get(kind) is entry:
+                        self.cancel(kind)
+                    if self._on_error is None:
+                        raise
+                    self._on_error(error)
+        finally:
+            self._schedule()
+
+    def shutdown(self) -> None:
+        self.cancel()
+        if self._after_id is not None:
+            self._widget.after_cancel(self._after_id)
+            self._after_id = None
+        if self._own_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,293 @@
+import csv
+import io
+import re
+import sqlite3
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import compress
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from filters import Filter, FilterCache, Equals, Range, Contains, Regex, And, Or, Not
+
+SortOrder = Sequence[Tuple[str, str]]
+
+
+class DataProvider:
+    # Read-only row source that DataGridView pages through in place of a DataSourceVar.
+    # Sorting and filtering are handed to the provider, so the grid only ever holds the
+    # rows on screen. sort is a list of (header, 'asc' | 'desc'), filter a filters.Filter.
+    def headers(self) -> List[str]:
+        raise NotImplementedError
+
+    def count(self, filter: Optional[Filter] = None) -> int:
+        raise NotImplementedError
+
+    def fetch(self, offset: int, limit: int, sort: Optional[SortOrder] = None,
+              filter: Optional[Filter] = None) -> List[dict]:
+        raise NotImplementedError
+
+    def check_filter(self, filter: Filter) -> None:
+        # raise ValueError for a filter the provider can't apply; GridModel.set_filter asks
+        # before the filter is used, instead of count() or fetch() failing in a repaint
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return self.count()
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+@lru_cache(maxsize=64)
+def _pattern(pattern: str, flags: int):
+    return re.compile(pattern, flags)
+
+
+def _regexp(pattern: str, flags: int, value) -> bool:
+    # NULL is searched as '', like filters.Regex does with None
+    return _pattern(pattern, flags).search('' if value is None else str(value)) is not None
+
+
+def _compile(predicate: Filter) -> Tuple[str, list]:
+    # translate a filters.Filter into a WHERE clause with the same meaning
+    if isinstance(predicate, Equals):
+        if predicate.value is None:
+            return f'{_quote(predicate.column)} IS NULL', []
+        return f'{_quote(predicate.column)} = ?', [predicate.value]
+    if isinstance(predicate, Range):
+        column = _quote(predicate.column)
+        parts, params = [f'{column} IS NOT NULL'], []
+        if predicate.low is not None:
+            parts.append(f'{column} >= ?')
+            params.append(predicate.low)
+        if predicate.high is not None:
+            parts.append(f'{column} <= ?')
+            params.append(predicate.high)
+        return ' AND '.join(parts), params
+    if isinstance(predicate, Contains):
+        column = _quote(predicate.column)
+        if predicate.case:
+            return f'instr(COALESCE({column}, \'\'), ?) > 0', [predicate.text]
+        return f'instr(lower(COALESCE({column}, \'\')), ?) > 0', [predicate.text]
+    if isinstance(predicate, Regex):
+        return f'py_regexp(?, ?, {_quote(predicate.column)})', [predicate.pattern.pattern, predicate.pattern.flags]
+    if isinstance(predicate, (And, Or)):
+        parts, params = [], []
+        for child in predicate.filters:
+            sql, child_params = _compile(child)
+            parts.append(f'({sql})')
+            params.extend(child_params)
+        return (' AND ' if isinstance(predicate, And) else ' OR ').join(parts), params
+    if isinstance(predicate, Not):
+        # SQL NULL is neither true nor false, the Python filters treat it as false
+        sql, params = _compile(predicate.filters[0])
+        return f'NOT COALESCE(({sql}), 0)', params
+    raise ValueError(f'{type(predicate).__name__} can not be pushed down to SQLite')
+
+
+class SQLiteProvider(DataProvider):
+    # Pages a table or view of a SQLite database with ORDER BY / WHERE / LIMIT / OFFSET.
+    def __init__(self, database: Union[str, sqlite3.Connection], table: str):
+        self._connection = database if isinstance(database, sqlite3.Connection) else sqlite3.connect(database)
+        self._connection.create_function('py_regexp', 3, _regexp, deterministic=True)
+        self._table = _quote(table)
+        self._headers = [row[1] for row in self._connection.execute(f'PRAGMA table_info({self._table})')]
+        if not self._headers:
+            raise ValueError(f'no such table: {table}')
+        try:
+            # rowid breaks ties so that pages never overlap; views and WITHOUT ROWID tables have none
+            self._connection.execute(f'SELECT rowid FROM {self._table} LIMIT 0')
+            self._tiebreak = 'rowid'
+        except sqlite3.OperationalError:
+            self._tiebreak = None
+
+    def headers(self) -> List[str]:
+        return list(self._headers)
+
+    @staticmethod
+    def _where(filter: Optional[Filter]) -> Tuple[str, list]:
+        if filter is None:
+            return '', []
+        sql, params = _compile(filter)
+        return f' WHERE {sql}', params
+
+    def check_filter(self, filter: Filter) -> None:
+        _compile(filter)
+
+    def count(self, filter: Optional[Filter] = None) -> int:
+        where, params = self._where(filter)
+        return self._connection.execute(f'SELECT COUNT(*) FROM {self._table}{where}', params).fetchone()[0]
+
+    def fetch(self, offset: int, limit: int, sort: Optional[SortOrder] = None,
+              filter: Optional[Filter] = None) -> List[dict]:
+        where, params = self._where(filter)
+        order = [f'{_quote(header)} {"DESC" if direction == "desc" else "ASC"}' for header, direction in sort or []]
+        if self._tiebreak:
+            order.append(self._tiebreak)
+        order = f' ORDER BY {", ".join(order)}' if order else ''
+        columns = ', '.join(map(_quote, self._headers))
+        cursor = self._connection.execute(
+            f'SELECT {columns} FROM {self._table}{where}{order} LIMIT ? OFFSET ?', params + [limit, offset])
+        return [dict(zip(self._headers, row)) for row in cursor]
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def _record_lines(lines: Iterable[str]) -> Iterator[str]:
+    # the lines csv.reader should see: one that is blank outside of quotes is no record, the
+    # rule CSVProvider._build_index applies to the bytes of the file. Lines end at '\n' only
+    # on both sides
+    quoted = False
+    for line in lines:
+        # bytes.strip() only takes ASCII whitespace off
+        if quoted or line.strip(' \t\n\r\x0b\x0c'):
+            yield line
+        if line.count('"') % 2:
+            quoted = not quoted
+
+
+class _CSVRow:
+    # a record read out of the loaded columns, a filter only loads the columns it asks for
+    __slots__ = ('_provider', '_index')
+
+    def __init__(self, provider: 'CSVProvider', index: int):
+        self._provider = provider
+        self._index = index
+
+    def __getitem__(self, header: str):
+        return self._provider._column(header)[self._index]
+
+
+class _CSVColumns:
+    # what FilterCache needs from a row source, backed by the columns the CSVProvider loaded
+    def __init__(self, provider: 'CSVProvider'):
+        self._provider = provider
+
+    def column(self, header: str) -> list:
+        return self._provider._column(header)
+
+    def __len__(self) -> int:
+        return len(self._provider._offsets)
+
+    def __getitem__(self, index: int) -> _CSVRow:
+        return _CSVRow(self._provider, index)
+
+
+class CSVProvider(DataProvider):
+    # Pages a CSV file through a byte offset index of its records. Rows are parsed when a
+    # page is fetched; sorting or filtering loads (and keeps) only the columns they use.
+    def __init__(self, path: str, encoding: str = 'utf-8', types: Optional[Dict[str, Callable[[str], object]]] = None,
+                 **fmtparams):
+        self._encoding = encoding
+        self._types = types or {}
+        self._fmtparams = fmtparams
+        self._file = open(path, 'rb')
+        self._offsets = array('q')
+        self._columns = {}
+        self._views = OrderedDict()
+        self._filters = FilterCache()
+        self._headers = self._build_index()
+
+    def _build_index(self) -> List[str]:
+        offsets = self._offsets
+        position = 0
+        quoted = False
+        for line in self._file:
+            # a record goes on until its quotes are balanced, fields may hold newlines; see
+            # _record_lines for the parsing side
+            if not quoted and line.strip():
+                offsets.append(position)
+            if line.count(b'"') % 2:
+                quoted = not quoted
+            position += len(line)
+        self._end = position
+        if not offsets:
+            raise ValueError('the CSV file has no header row')
+        header_offset = offsets.pop(0)
+        self._file.seek(header_offset)
+        stop = offsets[0] if offsets else self._end
+        return next(csv.reader(io.StringIO(self._file.read(stop - header_offset).decode(self._encoding)),
+                               **self._fmtparams))
+
+    def headers(self) -> List[str]:
+        return list(self._headers)
+
+    def _convert(self, header: str, text: str):
+        if text == '':
+            return None
+        convert = self._types.get(header)
+        return convert(text) if convert is not None else text
+
+    def _parse(self, data: bytes) -> List[dict]:
+        rows = []
+        for record in csv.reader(_record_lines(io.StringIO(data.decode(self._encoding))),
+                                 **self._fmtparams):
+            if record:
+                rows.append({header: self._convert(header, text) for header, text in zip(self._headers, record)})
+        return rows
+
+    def _read(self, start: int, stop: int) -> List[dict]:
+        # records [start, stop) are contiguous in the file, one read covers them
+        if start >= stop:
+            return []
+        first = self._offsets[start]
+        last = self._offsets[stop] if stop < len(self._offsets) else self._end
+        self._file.seek(first)
+        return self._parse(self._file.read(last - first))
+
+    def _column(self, header: str) -> list:
+        values = self._columns.get(header)
+        if values is None:
+            col = self._headers.index(header)
+            self._file.seek(self._offsets[0] if self._offsets else self._end)
+            text = io.TextIOWrapper(self._file, encoding=self._encoding, newline='\n')
+            values = [self._convert(header, record[col] if col < len(record) else '')
+                      for record in csv.reader(_record_lines(text), **self._fmtparams) if record]
+            text.detach()
+            self._columns[header] = values
+        return values
+
+    def _view(self, sort: Optional[SortOrder], filter: Optional[Filter]) -> Optional[array]:
+        # record numbers in display order, None when the file order is shown as it is
+        if not sort and filter is None:
+            return None
+        key = (tuple(sort or ()), filter)
+        view = self._views.get(key)
+        if view is not None:
+            self._views.move_to_end(key)
+            return view
+        records = range(len(self._offsets))
+        if filter is not None:
+            records = list(compress(records, self._filters.mask(filter, _CSVColumns(self))))
+        else:
+            records = list(records)
+        for header, direction in reversed(list(sort or ())):
+            values = self._column(header)
+            records.sort(key=lambda record: (values[record] is not None, values[record]), reverse=direction == 'desc')
+        view = self._views[key] = array('q', records)
+        while len(self._views) > 4:
+            self._views.popitem(last=False)
+        return view
+
+    def count(self, filter: Optional[Filter] = None) -> int:
+        if filter is None:
+            return len(self._offsets)
+        return len(self._view(None, filter))
+
+    def fetch(self, offset: int, limit: int, sort: Optional[SortOrder] = None,
+              filter: Optional[Filter] = None) -> List[dict]:
+        view = self._view(sort, filter)
+        if view is None:
+            return self._read(offset, min(offset + limit, len(self._offsets)))
+        rows = []
+        for record in view[offset:offset + limit]:
+            rows.extend(self._read(record, record + 1))
+        return rows
+
+    def close(self) -> None:
+        self._file.close()
@@ -0,0 +1,435 @@
+from typing import Literal, Callable, Any, Iterable, List, Optional, Union, Sequence
+from contextlib import contextmanager
+from schema import Schema
+from instrumentation import Stats
+from changes import Change, CellChange
+import sys
+
+
+class RowSource:
+    # A list of row dicts (or a columnar.ColumnStore) that tells its listeners about every
+    # change, with an optional primary-key index, row versions and edit tracking. It
+    # doesn't import tkinter, so a GridModel can run on it without a Tcl interpreter;
+    # datasource.DataSourceVar is the same list as a tkinter Variable.
+    def __init__(self, value=None, key: Union[str, Sequence[str], None] = None, schema: Schema = None,
+                 headers: Optional[Sequence[str]] = None):
+        self._value = value if value is not None else []
+        # column dtypes, parsers and formatters for the views, see schema.py
+        self.schema = dict(schema or {})
+        # the columns, for views of a list that starts out empty, see headers()
+        self._headers = None if headers is None else list(headers)
+        # edits made in place bump a row's version, keyed by id() of the row; versions come
+        # from one counter that never goes back, so a number is never handed out twice
+        self._versions = {}
+        self._clock = 0
+        # cells edited since the last commit(): dict rows by id() -> [row, {column: committed
+        # value}], columnar rows (views made on demand) by position -> {column: committed value}
+        self._dirty = {}
+        self._dirty_at = {}
+        # optional primary key: a dict from key to position, positions below _key_valid are exact
+        self._key = key if key is None or isinstance(key, str) else tuple(key)
+        self._key_columns = () if key is None else (key,) if isinstance(key, str) else tuple(key)
+        self._key_index = {}
+        self._key_valid = 0
+        self._build_key_index()
+        self._callbacks = {'insert': [], 'remove': [], 'append': [],
+                           'pop': [], 'sort': [], 'all': [],
+                           'reverse': [], 'clear': [], 'change': [],
+                           'extend': [], 'set': [], 'setitem': [], 'mutation': [], 'cell': []}
+        self._batch_depth = 0
+        self._pending = None
+        # opt-in timings of every callback dispatch, see DataGridView.instrument()
+        self.stats = Stats()
+
+    def load(self, chunks: Iterable[list]) -> int:
+        # one extend, so one notification and one repaint, per chunk of rows
+        loaded = 0
+        for chunk in chunks:
+            self.extend(chunk)
+            loaded += len(chunk)
+        return loaded
+
+    def get(self):
+        return self._value
+
+    def headers(self) -> List[str]:
+        # the ones given to the constructor, else a columnar store's, else the keys of the
+        # first row, else the declared columns; empty when nothing tells
+        if self._headers is not None:
+            return list(self._headers)
+        headers = getattr(self._value, 'headers', None)
+        if headers is not None:
+            return list(headers)
+        if self._value:
+            return list(self._value[0].keys())
+        return list(self.schema)
+
+    def column(self, header: str) -> list:
+        column = getattr(self._value, 'column', None)
+        if column is not None:
+            return column(header)
+        return [row[header] for row in self._value]
+
+    def set(self, value):
+        size = len(self._value)
+        self._value = value if value is not None else []
+        self._versions.clear()
+        self._dirty.clear()
+        self._dirty_at.clear()
+        self._build_key_index()
+        self._notify(Change('set', 0, max(size, len(self._value))), self._value)
+
+    def _dispatch(self, method: str, *args):
+        stats = self.stats
+        for func in self._callbacks[method]:
+            if stats.enabled:
+                with stats.timed(f'callback.{method}'):
+                    func(*args)
+            else:
+                func(*args)
+
+    def _notify(self, change: Change, *args):
+        self._dispatch(change.action, *args)
+        # 'mutation' listeners hear about every change as it happens, even inside a batch
+        self._dispatch('mutation', change)
+
+        if self._batch_depth:
+            # 'all' and 'change' listeners hear about the whole batch once, in end_update
+            self._pending = change if self._pending is None else self._pending.merge(change)
+            return
+
+        self._dispatch('all', *args)
+        self._dispatch('change', change)
+
+    @property
+    def key(self) -> Union[str, tuple, None]:
+        return self._key
+
+    def row_key(self, row: dict):
+        if isinstance(self._key, str):
+            return row[self._key]
+        return tuple(row[column] for column in self._key)
+
+    def _build_key_index(self):
+        self._key_index = {}
+        self._key_valid = 0
+        if self._key is None:
+            return
+        self._index_rows(0)
+        if len(self._key_index) != len(self._value):
+            raise ValueError(f'duplicate values for key {self._key!r}')
+
+    def _index_rows(self, start: int):
+        index = self._key_index
+        value = self._value
+        for position in range(start, len(value)):
+            index[self.row_key(value[position])] = position
+        self._key_valid = len(value)
+
+    def _new_keys(self, items: list) -> list:
+        # the dict always holds exactly the keys present, only positions may be stale
+        keys = [self.row_key(item) for item in items]
+        if len(set(keys)) != len(keys) or any(key in self._key_index for key in keys):
+            raise ValueError(f'duplicate values for key {self._key!r}')
+        return keys
+
+    def _unindex(self, position: int):
+        del self._key_index[self.row_key(self._value[position])]
+        self._key_valid = min(self._key_valid, position)
+
+    def row_version(self, row) -> int:
+        return self._versions.get(id(row), 0)
+
+    def _bump(self, row):
+        # columnar rows are views made on demand, they have no identity to key on
+        if isinstance(row, dict):
+            self._clock += 1
+            self._versions[id(row)] = self._clock
+
+    def touch(self, index: int):
+        # call after changing a row in place, so views format and test it again
+        index = range(len(self._value))[index]
+        self._bump(self._value[index])
+        self._notify(Change('setitem', index, index + 1), index)
+
+    def locate(self, key) -> int:
+        if self._key is None:
+            raise ValueError(f'{type(self).__name__} has no key, pass key= to the constructor')
+        position = self._key_index.get(key)
+        if position is None:
+            return -1
+        if position >= self._key_valid:
+            self._index_rows(self._key_valid)
+            position = self._key_index[key]
+        return position
+
+    def begin_update(self):
+        self._batch_depth += 1
+
+    def end_update(self):
+        if not self._batch_depth:
+            raise RuntimeError('end_update() called without a matching begin_update()')
+        self._batch_depth -= 1
+        if self._batch_depth or self._pending is None:
+            return
+        change, self._pending = self._pending, None
+        self._dispatch('all')
+        self._dispatch('change', change)
+
+    @contextmanager
+    def batch(self):
+        self.begin_update()
+        try:
+            yield self
+        finally:
+            self.end_update()
+
+    def append(self, item):
+        if self._key is not None:
+            key, = self._new_keys([item])
+            self._key_index[key] = len(self._value)
+            if self._key_valid == len(self._value):
+                self._key_valid += 1
+        self._value.append(item)
+        size = len(self._value)
+        self._notify(Change('append', size - 1, size), item)
+
+    def extend(self, items: Iterable):
+        items = list(items)
+        if not items:
+            return
+        start = len(self._value)
+        if self._key is not None:
+            for position, key in enumerate(self._new_keys(items), start):
+                self._key_index[key] = position
+            if self._key_valid == start:
+                self._key_valid = start + len(items)
+        self._value.extend(items)
+        self._notify(Change('extend', start, len(self._value)), items)
+
+    def remove(self, item):
+        index = self.index(item)
+        if self._key is not None:
+            self._unindex(index)
+        removed = self._forget(index)
+        del self._value[index]
+        self._notify(Change('remove', index, len(self._value) + 1, [removed]), item)
+
+    def insert(self, index, item):
+        # list.insert clamps the index, report the position actually used
+        size = len(self._value)
+        index = max(size + index, 0) if index < 0 else min(index, size)
+        if self._key is not None:
+            key, = self._new_keys([item])
+            self._key_index[key] = index
+            self._key_valid = min(self._key_valid, index)
+        self._value.insert(index, item)
+        if self._dirty_at:
+            self._shift_dirty(index, 1)
+        self._notify(Change('insert', index, len(self._value)), item)
+
+    def pop(self, index):
+        index = range(len(self._value))[index]
+        if self._key is not None:
+            self._unindex(index)
+        removed = self._forget(index)
+        self._value.pop(index)
+        self._notify(Change('pop', index, len(self._value) + 1, [removed]), index)
+
+    def sort(self, key: ... = None, reverse: bool = False):
+        if self._dirty_at:
+            # columnar rows are tracked by position, and the new positions can't be known
+            raise ValueError('commit() or rollback() the edited cells before sorting a columnar DataSourceVar')
+        self._value.sort(key=key, reverse=reverse)
+        self._key_valid = 0
+        self._notify(Change('sort', 0, len(self._value)), key, reverse)
+
+    def reverse(self):
+        self._value.reverse()
+        last = len(self._value) - 1
+        self._dirty_at = {last - index: originals for index, originals in self._dirty_at.items()}
+        self._key_valid = 0
+        self._notify(Change('reverse', 0, len(self._value)))
+
+    def clear(self):
+        size = len(self._value)
+        self._value.clear()
+        self._versions.clear()
+        self._dirty.clear()
+        self._dirty_at.clear()
+        self._key_index.clear()
+        self._key_valid = 0
+        self._notify(Change('clear', 0, size))
+
+    def count(self, value) -> int:
+        return self._value.count(value)
+
+    def index(self, value, start: int = 0, stop: int = sys.maxsize) -> int:
+        if self._key is not None:
+            # with a key the row can only be at one position
+            position = self.locate(self.row_key(value))
+            if position in range(len(self._value))[start:stop] and self._value[position] == value:
+                return position
+            raise ValueError(f'{value!r} is not in {type(self).__name__}')
+        return self._value.index(value, start, stop)
+
+    def set_cell(self, index: int, column: str, value):
+        index = range(len(self._value))[index]
+        row = self._value[index]
+        if column in self._key_columns:
+            old_key = self.row_key(row)
+            new_key = self.row_key({**row, column: value})
+            if new_key != old_key:
+                if new_key in self._key_index:
+                    raise ValueError(f'duplicate values for key {self._key!r}')
+                position = self._key_index.pop(old_key)
+                self._key_index[new_key] = position
+        old = row.get(column)
+        row[column] = value
+        self._bump(row)
+        self._cell_changed(index, row, column, old, value)
+        self._notify(Change('setitem', index, index + 1, [{column: old}]), index)
+
+    def _cell_changed(self, index: int, row, column: str, old, new):
+        if old == new and type(old) is type(new):
+            return
+        self._track(index, row, column, old, new)
+        self._dispatch('cell', index, column, old, new)
+
+    def _track(self, index: int, row, column: str, old, new):
+        # remember the committed value of an edited cell, forget it once the edit is undone
+        if isinstance(row, dict):
+            entry = self._dirty.get(id(row))
+            originals = entry[1] if entry is not None else {}
+        else:
+            originals = self._dirty_at.get(index, {})
+        if column not in originals:
+            originals[column] = old
+        elif originals[column] == new and type(originals[column]) is type(new):
+            del originals[column]
+        if isinstance(row, dict):
+            if originals:
+                # the row is kept in the entry, so its id can't be reused while tracked
+                self._dirty[id(row)] = [row, originals]
+            else:
+                self._dirty.pop(id(row), None)
+        elif originals:
+            self._dirty_at[index] = originals
+        else:
+            self._dirty_at.pop(index, None)
+
+    def _forget(self, index: int):
+        # the row at index is going away, and with it its version and its uncommitted edits;
+        # returns the row, a columnar one read out before the store drops it
+        row = self._value[index]
+        if isinstance(row, dict):
+            self._versions.pop(id(row), None)
+            self._dirty.pop(id(row), None)
+            return row
+        if self._dirty_at:
+            self._shift_dirty(index, -1)
+        return dict(row)
+
+    def _shift_dirty(self, index: int, step: int):
+        # positions of tracked columnar rows behind index move along with an insert or a pop
+        shifted = {}
+        for position, originals in self._dirty_at.items():
+            if position < index:
+                shifted[position] = originals
+            elif step > 0 or position > index:
+                shifted[position + step] = originals
+        self._dirty_at = shifted
+
+    def changes(self) -> List[CellChange]:
+        # every cell edited since the last commit(), e.g. to save just those to a database
+        result = []
+        for row, originals in self._dirty.values():
+            result.extend(CellChange(row, column, old, row.get(column)) for column, old in originals.items())
+        for index, originals in sorted(self._dirty_at.items()):
+            row = self._value[index]
+            result.extend(CellChange(row, column, old, row.get(column)) for column, old in originals.items())
+        return result
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty or self._dirty_at)
+
+    def commit(self) -> List[CellChange]:
+        # accept the edits: they become the committed values, and are returned once more
+        changes = self.changes()
+        self._dirty.clear()
+        self._dirty_at.clear()
+        return changes
+
+    def rollback(self):
+        # put the committed values back, with the usual cell events and one repaint
+        positions = dict(self._dirty_at)
+        if self._dirty:
+            for index, row in enumerate(self._value):
+                if id(row) in self._dirty:
+                    positions[index] = self._dirty[id(row)][1]
+        with self.batch():
+            for index, originals in positions.items():
+                for column, value in list(originals.items()):
+                    self.set_cell(index, column, value)
+        self._dirty.clear()
+        self._dirty_at.clear()
+
+    def callable(self,
+                 func: Callable[[Any], Any],
+                 method: Literal['insert', 'remove', 'append', 'pop', 'sort', 'all', 'reverse', 'clear', 'change',
+                                 'extend', 'set', 'setitem', 'mutation', 'cell'],
+                 add=False):
+        if add:
+            self._callbacks[method.lower()].append(func)
+        else:
+            self._callbacks[method.lower()] = [func]
+
+    def remove_callable(self, func: Callable[[Any], Any], method: str):
+        # undo callable(func, method); functions that aren't registered are ignored
+        callbacks = self._callbacks[method.lower()]
+        if func in callbacks:
+            callbacks.remove(func)
+
+    def __len__(self):
+        return len(self._value)
+
+    def __getitem__(self, key: int):
+        return self._value[key]
+
+    def __setitem__(self, key: int, newvalue: dict):
+        position = range(len(self._value))[key]
+        old_row = self._value[position]
+        if self._key is not None:
+            old_key = self.row_key(old_row)
+            new_key = self.row_key(newvalue)
+            if new_key != old_key:
+                if new_key in self._key_index:
+                    raise ValueError(f'duplicate values for key {self._key!r}')
+                del self._key_index[old_key]
+                self._key_index[new_key] = position
+        # a columnar row is a view of the store, read it before it is overwritten
+        old_values = dict(old_row)
+        self._versions.pop(id(old_row), None)
+        entry = self._dirty.pop(id(old_row), None) if isinstance(old_row, dict) else None
+        self._value[position] = newvalue
+        row = self._value[position]
+        # the same dict may be put back after changes made in place
+        self._bump(row)
+        if entry is not None and isinstance(row, dict):
+            # the replacement takes over the committed values of the row it replaces
+            self._dirty[id(row)] = [row, entry[1]]
+        columns = dict.fromkeys([*old_values, *row])
+        for column in columns:
+            self._cell_changed(position, row, column, old_values.get(column), row.get(column))
+        # the replaced dict itself still holds the old values of every column, and views may
+        # have it cached; else the old values, None for the columns it didn't have. A dict
+        # edited in place and put back has lost them: old_values are its new ones already
+        if old_row is row:
+            replaced = None
+        elif isinstance(old_row, dict) and len(old_row) == len(columns):
+            replaced = [old_row]
+        else:
+            replaced = [{column: old_values.get(column) for column in columns}]
+        self._notify(Change('setitem', position, position + 1, replaced), position)
+
@@ -0,0 +1,104 @@
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+
+class Column:
+    # How one column is shown and edited. dtype picks a built-in parser and formatter,
+    # parser/formatter override them; None always shows as '' and '' always parses to None.
+    __slots__ = ('dtype', 'parser', 'formatter')
+
+    def __init__(self, dtype: Optional[type] = None, parser: Optional[Callable[[str], Any]] = None,
+                 formatter: Optional[Callable[[Any], str]] = None):
+        self.dtype = dtype
+        self.parser = parser
+        self.formatter = formatter
+
+    def __repr__(self):
+        return f'Column({self.dtype!r}, {self.parser!r}, {self.formatter!r})'
+
+
+# a schema maps headers to a Column, or just to a dtype
+Schema = Dict[str, Union[type, Column]]
+
+# a number with thousands separators as '{:,}' and '{:,.2f}' write them
+_GROUPED = re.compile(r'[+-]?\d{1,3}(,\d{3})+(\.\d*)?')
+
+
+def _ungrouped(parse: Callable[[str], Any]) -> Callable[[str], Any]:
+    # numbers read back what a grouping formatter shows; other commas are still errors
+    def parse_number(text: str):
+        if ',' in text and _GROUPED.fullmatch(text):
+            text = text.replace(',', '')
+        return parse(text)
+    return parse_number
+
+
+# str() already gives ISO dates and plain numbers, fromisoformat reads both date forms back
+_PARSERS = {int: _ungrouped(int), float: _ungrouped(float), Decimal: _ungrouped(Decimal),
+            datetime: datetime.fromisoformat, date: date.fromisoformat, str: str}
+
+# columns mixing these kinds of numbers hold the wider one
+_WIDER = {frozenset((int, float)): float, frozenset((int, Decimal)): Decimal}
+
+
+def infer(value) -> Optional[type]:
+    kind = type(value)
+    return kind if kind is bool or kind in _PARSERS else None
+
+
+def infer_column(values: Iterable) -> Optional[type]:
+    # dtype of a whole column, None left out: its one kind of value, or the wider kind of
+    # ints mixed with floats or Decimals; None for no values or for any other mix
+    kinds = set(map(type, values))
+    kinds.discard(type(None))
+    if len(kinds) == 1:
+        kind = kinds.pop()
+        return kind if kind is bool or kind in _PARSERS else None
+    return _WIDER.get(frozenset(kinds))
+
+
+def _bool_formatter(true_string: str, false_string: str) -> Callable[[Any], str]:
+    def format_bool(value) -> str:
+        return true_string if value else false_string
+    return format_bool
+
+
+def _bool_parser(true_string: str, false_string: str) -> Callable[[str], bool]:
+    true_text, false_text = true_string.lower(), false_string.lower()
+
+    def parse_bool(text: str) -> bool:
+        text = text.lower()
+        if text == true_text:
+            return True
+        if text == false_text:
+            return False
+        raise ValueError(f'expected {true_string} or {false_string}')
+    return parse_bool
+
+
+def compile_column(column: Union[type, Column], true_string: str = 'True', false_string: str = 'False'
+                   ) -> Tuple[Callable[[Any], str], Callable[[str], Any]]:
+    # (format, parse) pair for one column; parse raises ValueError (or InvalidOperation
+    # for Decimal) on text it can't read
+    if not isinstance(column, Column):
+        column = Column(column)
+    dtype = column.dtype
+    if dtype is bool:
+        formatter = column.formatter or _bool_formatter(true_string, false_string)
+        parser = column.parser or _bool_parser(true_string, false_string)
+    else:
+        formatter = column.formatter or str
+        parser = column.parser or _PARSERS.get(dtype, str)
+    strip = dtype is not str
+
+    def format_value(value) -> str:
+        return '' if value is None else formatter(value)
+
+    def parse_text(text: str):
+        stripped = text.strip()
+        if not stripped:
+            return None
+        return parser(stripped if strip else text)
+    return format_value, parse_text
@@ -0,0 +1,32 @@
+from typing import List, Optional, Sequence
+
+# Multi-column sorting of key columns (one list of comparable values per sort column),
+# shared by GridModel and the process pool workers of parallel.py.
+
+
+class SortKey:
+    # compares rows on several key columns with mixed directions, ties keep source order
+    __slots__ = ('values', 'index', 'reverses')
+
+    def __init__(self, values: tuple, index: int, reverses: tuple):
+        self.values = values
+        self.index = index
+        self.reverses = reverses
+
+    def __lt__(self, other: 'SortKey') -> bool:
+        for mine, theirs, reverse in zip(self.values, other.values, self.reverses):
+            if mine == theirs:
+                continue
+            return theirs < mine if reverse else mine < theirs
+        return self.index < other.index
+
+
+def argsort(columns: Sequence[list], reverses: Sequence[bool], order: Optional[List[int]] = None) -> List[int]:
+    # stable sorts from the last key to the first give the multi-column order. order, the
+    # indices to sort (all of them by default), is sorted in place and rows with equal
+    # keys keep their place in it; sorted runs in it are merged rather than sorted again
+    if order is None:
+        order = list(range(len(columns[0]))) if columns else []
+    for keys, reverse in reversed(list(zip(columns, reverses))):
+        order.sort(key=keys.__getitem__, reverse=reverse)
+    return order
@@ -0,0 +1,35 @@
+from tkinter import Label, Toplevel
+from typing import List
+from instrumentation import Stats
+
+
+class StatsOverlay(Toplevel):
+    # small always-on-top window listing the busiest timers, refreshed every interval_ms
+    def __init__(self, master, stats: Stats, interval_ms: int = 500, lines: int = 12):
+        super().__init__(master)
+        self.title('Grid stats')
+        self.attributes('-topmost', True)
+        self._stats = stats
+        self._interval = interval_ms
+        self._lines = lines
+        self._label = Label(self, justify='left', anchor='nw', font=('Courier', 9))
+        self._label.pack(fill='both', expand=True)
+        self._after_id = None
+        self._refresh()
+
+    def _refresh(self) -> None:
+        snapshot = self._stats.snapshot()
+        timers = sorted((item for item in snapshot.items() if 'total_ms' in item[1]),
+                        key=lambda item: item[1]['total_ms'], reverse=True)
+        counters = [item for item in snapshot.items() if 'total_ms' not in item[1]]
+        text: List[str] = [f'{name:<22}{entry["count"]:>8}{entry["total_ms"]:>11.1f}ms{entry["max_ms"]:>9.1f}ms'
+                           for name, entry in timers[:self._lines]]
+        text += [f'{name:<22}{entry["count"]:>8}' for name, entry in counters]
+        self._label.configure(text='\n'.join(text) or 'no samples yet')
+        self._after_id = self.after(self._interval, self._refresh)
+
+    def destroy(self) -> None:
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        super().destroy()
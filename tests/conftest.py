@@ -0,0 +1,16 @@
+import os
+import sys
+import tkinter
+import pytest
+
+# the modules import each other by their plain names, like the scripts in the repository do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def tcl():
+    # an interpreter without a display is enough for variables and after()
+    interpreter = tkinter.Tcl()
+    tkinter._default_root = interpreter
+    yield interpreter
+    tkinter._default_root = None
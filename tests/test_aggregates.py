@@ -0,0 +1,62 @@
+import random
+import pytest
+from aggregates import Aggregator
+from datasource import DataSourceVar
+from filters import Range
+from model import GridModel
+
+
+def brute(data, headers, predicate):
+    rows = [row for row in data.get() if predicate is None or predicate.test(row)]
+    result = {}
+    for header in headers:
+        values = [row[header] for row in rows if row[header] is not None]
+        result[header] = {'count': len(values), 'sum': sum(values) if values else None,
+                          'min': min(values, default=None), 'max': max(values, default=None)}
+    return result
+
+
+@pytest.mark.parametrize('predicate', [None, Range('a', 20)])
+def test_follows_every_mutation(tcl, predicate):
+    rand = random.Random(3)
+
+    def row():
+        return {'a': rand.randrange(50), 'b': rand.choice([None, rand.randrange(9)])}
+
+    data = DataSourceVar(tcl, value=[row() for _ in range(100)])
+    aggregator = Aggregator(data, ['a', 'b'], predicate, ('sum', 'count', 'min', 'max'))
+    data.callable(aggregator.update, 'mutation', True)
+    for step in range(300):
+        action = step % 5
+        if action == 0:
+            data.append(row())
+        elif action == 1:
+            data.pop(rand.randrange(len(data)))
+        elif action == 2:
+            data.set_cell(rand.randrange(len(data)), 'a', rand.randrange(50))
+        elif action == 3:
+            data[rand.randrange(len(data))] = row()
+        else:
+            data.insert(rand.randrange(len(data)), row())
+        assert aggregator.results(('count', 'sum', 'min', 'max')) == brute(data, ['a', 'b'], predicate)
+
+
+def test_min_and_max_only_when_asked_for(tcl):
+    data = DataSourceVar(tcl, value=[{'a': 1}, {'a': 5}])
+    aggregator = Aggregator(data, ['a'], functions=('sum',))
+    assert aggregator.results(('sum', 'min')) == {'a': {'sum': 6, 'min': None}}
+    with pytest.raises(ValueError):
+        Aggregator(data, ['a'], functions=('median',))
+
+
+def test_row_edited_in_place_and_put_back(tcl):
+    # what show_footer(('min', 'max')) sets up on the table's model
+    data = DataSourceVar(tcl, value=[{'v': 1}, {'v': 4}])
+    model = GridModel(data)
+    model.enable_aggregates(functions=('min', 'max'))
+    row = data[0]
+    row['v'] = 10
+    data[0] = row
+    assert model.aggregates(('min', 'max')) == {'v': {'min': 4, 'max': 10}}
+    data.pop(0)
+    assert model.aggregates(('min', 'max')) == {'v': {'min': 4, 'max': 4}}
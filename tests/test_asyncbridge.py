@@ -0,0 +1,56 @@
+import asyncio
+import gc
+import time
+from itertools import chain, count
+import pytest
+from asyncbridge import AsyncBridge, AsyncDataSource
+from datasource import DataSourceVar
+
+
+async def rows(ids):
+    for id_ in ids:
+        await asyncio.sleep(0)
+        yield {'id': id_}
+
+
+def run_until(tcl, condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        tcl.update()
+        time.sleep(0.001)
+
+
+@pytest.fixture(params=['poll', 'thread'])
+def bridge(tcl, request):
+    # Tcl variables must be collected on the Tk thread, not whenever the loop thread
+    # happens to run the collector: a feed and its loader refer to each other, and so do
+    # the models and data sources of the other tests
+    gc.collect()
+    bridge = AsyncBridge(tcl, mode=request.param)
+    yield bridge
+    bridge.close()
+    gc.collect()
+
+
+def test_feed_loads_every_row(tcl, bridge):
+    data = DataSourceVar(tcl, headers=['id'], key='id')
+    done = []
+    feed = AsyncDataSource(data, rows(range(25)), bridge, batch_size=4, max_pending=2, on_done=done.append).start()
+    waited = bridge.submit(feed.wait())
+    run_until(tcl, waited.done)
+    assert waited.result() is None and done == [None]
+    assert feed.loaded == 25 and [row['id'] for row in data.get()] == list(range(25))
+
+
+def test_rows_that_fail_end_the_feed(tcl, bridge):
+    data = DataSourceVar(tcl, headers=['id'], key='id')
+    done = []
+    # the duplicate key comes in the second batch, the source would go on for ever
+    feed = AsyncDataSource(data, rows(chain([1, 2, 3, 1], count(4))), bridge, batch_size=3, max_pending=1,
+                           on_done=done.append).start()
+    waited = bridge.submit(feed.wait())
+    run_until(tcl, waited.done)
+    assert isinstance(waited.exception(), ValueError)
+    assert feed.done and len(done) == 1 and done[0] is feed.error
+    assert [row['id'] for row in data.get()] == [1, 2, 3]
@@ -0,0 +1,42 @@
+from columnar import ColumnStore
+from model import GridModel
+from rowsource import RowSource
+
+
+def typecodes(store):
+    return {header: getattr(store._columns[header], 'typecode', None) for header in store.headers}
+
+
+def test_ints_stay_in_float_columns():
+    store = ColumnStore([{'x': 1.5, 'n': 1}, {'x': None, 'n': 2}])
+    store.set_value(0, 'x', 3)
+    store.append({'x': 4, 'n': 3})
+    store.insert(0, {'x': 5, 'n': 0})
+    store.extend([{'x': 6, 'n': 4}, {'x': 7.5, 'n': 5}])
+    store[1] = {'x': 8, 'n': 1}
+    assert typecodes(store) == {'x': 'd', 'n': 'q'}
+    assert store.column('x') == [5.0, 8.0, None, 4.0, 6.0, 7.5]
+    assert all(type(value) is float for value in store.column('x') if value is not None)
+    # ints mixed with floats from the start make a float column too
+    assert typecodes(ColumnStore([{'x': 1}, {'x': 2.5}, {'x': None}])) == {'x': 'd'}
+
+
+def test_values_a_typed_column_cannot_hold_turn_it_into_a_list():
+    store = ColumnStore([{'x': 1.5, 'n': 1, 'b': True}])
+    # a float in an int column, a bool in a float one and an int in a bool one
+    store.set_value(0, 'n', 2.5)
+    store.append({'x': False, 'n': 3, 'b': 1})
+    assert typecodes(store) == {'x': None, 'n': None, 'b': None}
+    assert store.column('x') == [1.5, False] and store.column('n') == [2.5, 3] and store.column('b') == [True, 1]
+    store = ColumnStore([{'x': 1.5}])
+    store.set_value(0, 'x', 10 ** 400)
+    assert typecodes(store) == {'x': None} and store.column('x') == [10 ** 400]
+
+
+def test_editing_through_the_model_keeps_the_array():
+    data = RowSource(ColumnStore([{'price': float(index), 'qty': index} for index in range(10)]))
+    model = GridModel(data)
+    model.sort([('price', 'asc')])
+    data.set_cell(3, 'price', 42)
+    assert typecodes(data.get()) == {'price': 'd', 'qty': 'q'}
+    assert model.row(model.row_count() - 1)['price'] == 42.0
@@ -0,0 +1,32 @@
+import pytest
+from datasource import DataSourceVar
+from model import GridModel
+
+
+def test_model_on_empty_list_needs_headers(tcl):
+    with pytest.raises(ValueError):
+        GridModel(DataSourceVar(tcl))
+    model = GridModel(DataSourceVar(tcl), headers=['a', 'b'])
+    assert model.headers == ['a', 'b'] and model.row_count() == 0
+
+
+def test_headers_from_the_source(tcl):
+    assert GridModel(DataSourceVar(tcl, headers=['a'])).headers == ['a']
+    assert GridModel(DataSourceVar.columnar([], ['x', 'y'], master=tcl)).headers == ['x', 'y']
+
+
+def test_header_only_csv(tcl, tmp_path):
+    path = tmp_path / 'empty.csv'
+    path.write_text('id,name\n')
+    data = DataSourceVar.from_csv(str(path), master=tcl)
+    model = GridModel(data)
+    assert model.headers == ['id', 'name'] and model.row_count() == 0
+
+
+def test_types_inferred_from_the_first_rows(tcl):
+    data = DataSourceVar(tcl, headers=['n'])
+    model = GridModel(data)
+    data.extend([{'n': 1.5}, {'n': 2.0}])
+    assert model.texts(1) == ['2.0']
+    assert model.parse(0, '3') == 3.0
+
@@ -0,0 +1,56 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from datasource import DataSourceVar
+from filters import Range
+from model import GridModel
+
+SCHEMA = {'id': int, 'name': str, 'price': Decimal, 'day': date, 'paid': bool}
+
+
+def rows():
+    names = ['plain', 'with, comma', 'with "quotes"', 'two\nlines', None, 'ünïcode']
+    return [{'id': index, 'name': names[index % len(names)],
+             'price': None if index % 5 == 0 else Decimal(f'{index * 7 % 23}.{index:02d}'),
+             'day': None if index % 4 == 0 else date(2024, 1 + index % 12, 1 + index % 28),
+             'paid': index % 3 == 0} for index in range(40)]
+
+
+class Counting(DataSourceVar):
+    # remembers the size of every extend
+    def extend(self, rows):
+        self.extends = getattr(self, 'extends', []) + [len(rows)]
+        super().extend(rows)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'jsonl'])
+def test_export_sorted_and_filtered_loads_back(tcl, tmp_path, fmt):
+    data = DataSourceVar(tcl, value=rows())
+    model = GridModel(data)
+    model.sort([('price', 'desc'), ('id', 'asc')])
+    model.set_filter(Range('id', 5, 30))
+    shown = [dict(model.row(pos)) for pos in range(model.row_count())]
+    path = str(tmp_path / f'rows.{fmt}')
+    progress = []
+    assert model.export(path, chunk_size=7, progress=lambda done, total: progress.append((done, total))) == len(shown)
+    assert progress == [(done, len(shown)) for done in (7, 14, 21, 26)]
+    load = DataSourceVar.from_csv if fmt == 'csv' else DataSourceVar.from_jsonl
+    loaded = load(path, SCHEMA, master=tcl)
+    assert loaded.headers() == list(SCHEMA)
+    assert loaded.get() == shown
+    # the loaded rows keep their types, None included
+    assert isinstance(loaded[0]['price'], Decimal) and isinstance(loaded[1]['day'], date)
+    assert any(row['name'] is None for row in loaded.get())
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'jsonl'])
+def test_load_extends_once_per_chunk(tcl, tmp_path, fmt):
+    data = DataSourceVar(tcl, value=rows())
+    path = str(tmp_path / f'rows.{fmt}')
+    GridModel(data).export(path)
+    load = Counting.from_csv if fmt == 'csv' else Counting.from_jsonl
+    progress = []
+    loaded = load(path, SCHEMA, chunk_size=16, master=tcl, progress=lambda done, total: progress.append(done))
+    assert loaded.extends == [16, 16, 8]
+    assert loaded.get() == rows()
+    assert progress[-1] == (tmp_path / f'rows.{fmt}').stat().st_size
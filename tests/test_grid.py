@@ -0,0 +1,90 @@
+import tkinter
+import pytest
+from datasource import DataSourceVar
+from model import GridModel
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError:
+        pytest.skip('no display')
+    yield root
+    root.destroy()
+
+
+def test_grid_on_empty_source(root):
+    from datagridview import DataGridView
+    data = DataSourceVar(root, headers=['a', 'b'])
+    grid = DataGridView(root, data, 5)
+    data.append({'a': 1, 'b': 'x'})
+    root.update()
+    assert grid.model.texts(0) == ['1', 'x']
+
+
+def test_destroy_unsubscribes(root):
+    from datagridview import DataGridView
+    data = DataSourceVar(root, value=[{'a': 1}])
+    shared = GridModel(data, 5)
+    DataGridView(root, shared, 5).destroy()
+    grid = DataGridView(root, data, 5)
+    model = grid.model
+    grid.destroy()
+    assert not model._listeners and not shared._listeners
+    assert data._callbacks['change'] == [shared._on_change]
+
+
+def test_page_turn_drops_typed_text(root):
+    from datagridview import DataGridView
+    data = DataSourceVar(root, value=[{'a': 1} for _ in range(10)])
+    grid = DataGridView(root, data, 5)
+    root.update()
+    # typed but not committed; the next page shows the same text in that cell
+    grid._cells[0][0].set('typed')
+    grid._on_key(0)
+    grid.update(page=1)
+    root.update()
+    assert grid._cells[0][0].get() == '1'
+
+
+def test_row_moving_under_typed_text_drops_it(root):
+    from datagridview import DataGridView
+    data = DataSourceVar(root, value=[{'a': 1}, {'a': 1}])
+    grid = DataGridView(root, data, 5)
+    root.update()
+    grid._cells[1][0].set('7')
+    grid._on_key(1)
+    # the row under grid row 1 is another one now, with the same text
+    data.insert(0, {'a': 1})
+    root.update()
+    assert grid._cells[1][0].get() == '1'
+    grid.save_cell(None, 1, 0)
+    assert [row['a'] for row in data.get()] == [1, 1, 1]
+
+
+def test_canvas_editor_closes_when_its_row_moves(root):
+    from canvasgridview import CanvasGridView
+    data = DataSourceVar(root, value=[{'a': n} for n in range(10)])
+    grid = CanvasGridView(root, data, 5)
+    root.update()
+    grid.begin_edit(3, 0)
+    grid._editor_var.set('77')
+    data.insert(0, {'a': -1})
+    grid.save_cell(None, 3, 0)
+    assert grid._editing is None
+    assert [row['a'] for row in data.get()][:5] == [-1, 0, 1, 2, 3]
+
+
+def test_cell_styles_work_in_every_theme(root):
+    from datagridview import DataGridView
+    data = DataSourceVar(root, value=[{'a': 1}])
+    grid = DataGridView(root, data, 3, read_only=True)
+    style = grid._ttk_style
+    name = grid._parity_style(False)
+    # clam's field, which honours fieldbackground and bordercolor
+    assert style.layout(name)[0][0] == f'{grid._style_name}.field'
+    assert style.lookup(name, 'fieldbackground') == '#eeeeee'
+    assert style.lookup(name, 'foreground') == '#707070'
+    grid.configure(_read_only=False)
+    assert style.lookup(name, 'foreground') == '#000000'
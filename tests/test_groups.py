@@ -0,0 +1,104 @@
+import random
+import pytest
+from filters import Range
+from model import GridModel
+from rowsource import RowSource
+
+
+def shown(model):
+    # (group, value of v) per position, None for v on the header rows
+    return [(model.group_key(pos), None if model.is_group_row(pos) else model.row(pos)['v'])
+            for pos in range(model.row_count())]
+
+
+def expected(data, low, sort, expanded=True):
+    rows = [row for row in data.get() if row['v'] >= low]
+    if sort:
+        rows.sort(key=lambda row: row['v'], reverse=True)
+    keys = sorted({(row['g'],) for row in rows}, key=lambda key: (key[0] is not None, key[0] or ''))
+    layout = []
+    for key in keys:
+        layout.append((key, None))
+        if expanded:
+            layout.extend((key, row['v']) for row in rows if (row['g'],) == key)
+    return layout
+
+
+@pytest.mark.parametrize('sort', [False, True])
+def test_groups_follow_appends_pops_and_edits(sort):
+    rand = random.Random(3)
+
+    def row():
+        return {'g': rand.choice(['a', 'b', 'c', None]), 'v': rand.randrange(100)}
+
+    data = RowSource([row() for _ in range(200)])
+    model = GridModel(data, 20)
+    if sort:
+        model.sort([('v', 'desc')])
+    model.set_filter(Range('v', 20))
+    model.group_by(['g'], expanded=True)
+    for _ in range(30):
+        data.append(row())
+        data.pop(rand.randrange(len(data)))
+        data.insert(rand.randrange(len(data)), row())
+        data[rand.randrange(len(data))] = row()
+        data.set_cell(rand.randrange(len(data)), 'g', rand.choice(['a', 'd', None]))
+        with data.batch():
+            data.extend([row() for _ in range(3)])
+            data.pop(0)
+        assert shown(model) == expected(data, 20, sort)
+    # a group whose last row goes away goes with it
+    for index in reversed(range(len(data))):
+        if data[index]['g'] == 'a':
+            data.pop(index)
+    assert ('a',) not in {key for key, _ in shown(model)}
+    assert shown(model) == expected(data, 20, sort)
+
+
+def test_collapsed_groups_page_by_header_rows():
+    data = RowSource([{'g': index % 7, 'v': index} for index in range(100)])
+    model = GridModel(data, 5)
+    model.group_by(['g'])
+    # seven header rows: two pages
+    assert model.row_count() == 7 and model.last_page == 1
+    assert model.find(0) is None and model.find(7) is None
+    assert [model.group_key(pos) for pos in range(7)] == [(g,) for g in range(7)]
+    model.set_expanded((1,))
+    assert model.row_count() == 7 + 15 and model.last_page == 4
+    # the rows of group 1 sit under its header row, at 2
+    assert [model.find(pos)['v'] for pos in range(2, 2 + 15)] == list(range(1, 100, 7))
+    assert model.index(data[8]) == 3 and model.index(data[7]) == -1
+    model.collapse_all()
+    assert model.row_count() == 7 and model.find(2) is None
+    model.expand_all()
+    assert model.row_count() == 107 and model.last_page == 21
+    # a filter leaving a group empty hides its header row too
+    model.set_filter(Range('v', 95))
+    assert [model.group_key(pos) for pos in range(model.row_count())] == \
+           [(0,), (0,), (1,), (1,), (4,), (4,), (5,), (5,), (6,), (6,)]
+    model.collapse_all()
+    assert model.row_count() == 5 and model.last_page == 0
+
+
+def test_group_summary_subtotals():
+    data = RowSource([{'g': 'a', 'n': 1, 'x': 1.5, 's': 'p'}, {'g': 'b', 'n': 2, 'x': None, 's': 'q'},
+                      {'g': 'a', 'n': 3, 'x': None, 's': 'r'}, {'g': 'b', 'n': None, 'x': None, 's': 's'}])
+    model = GridModel(data)
+    model.group_by(['g'])
+    assert model.group_summary(('a',)) == (2, {'n': 4, 'x': 1.5, 's': None})
+    # no numbers at all: no subtotal
+    assert model.group_summary(('b',)) == (2, {'n': 2, 'x': None, 's': None})
+    data.set_cell(0, 'n', 10)
+    data.append({'g': 'a', 'n': 5, 'x': 2, 's': 't'})
+    assert model.group_summary(('a',)) == (3, {'n': 18, 'x': 3.5, 's': None})
+    # moving a row to another group changes both
+    data.set_cell(2, 'g', 'b')
+    assert model.group_summary(('a',))[0] == 2 and model.group_summary(('a',))[1]['n'] == 15
+    assert model.group_summary(('b',))[1]['n'] == 5
+    # the filter leaves rows out of the subtotals
+    model.set_filter(Range('n', 4))
+    assert model.group_summary(('a',)) == (2, {'n': 15, 'x': 3.5, 's': None})
+    assert model.group_summary(('b',)) == (0, {'n': None, 'x': None, 's': None})
+    # the header row's texts show the count and the subtotals
+    texts = model.texts(0)
+    assert texts[0] == '▸ a (2)' and texts[1:] == ['15', '3.5', '']
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_without_tkinter(code: str) -> str:
+    # a fresh interpreter where importing tkinter fails, so no Tcl can be made either
+    script = 'import sys\nsys.modules["tkinter"] = None\n' + textwrap.dedent(code)
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_model_on_a_row_source_without_tkinter():
+    output = run_without_tkinter('''
+        from filters import Range
+        from model import GridModel
+        from rowsource import RowSource
+
+        data = RowSource([{'id': n, 'v': n % 7} for n in range(20)], key='id')
+        model = GridModel(data, page_size=5)
+        model.sort([('v', 'desc'), ('id', 'asc')])
+        model.set_filter(Range('v', 3))
+        model.enable_aggregates(functions=('sum', 'max'))
+        data.append({'id': 20, 'v': 6})
+        data.set_cell(data.locate(3), 'v', 0)
+        with data.batch():
+            data.pop(data.locate(4))
+            data.insert(0, {'id': 21, 'v': 5})
+        rows = sorted((row for row in data.get() if row['v'] >= 3), key=lambda row: (-row['v'], row['id']))
+        assert [model.find(pos) for pos in range(model.row_count())] == rows
+        assert model.last_page == (len(rows) - 1) // 5
+        assert model.texts(0) == ['6', '6'] and model.position(data.locate(21)) == rows.index(data[0])
+        assert model.aggregates(('sum', 'max'))['v'] == {'sum': sum(row['v'] for row in data.get()), 'max': 6}
+        print('ok')
+    ''')
+    assert output == 'ok\n'
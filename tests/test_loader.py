@@ -0,0 +1,46 @@
+from datasource import DataSourceVar
+from loader import DataLoader
+
+
+class Widget:
+    # runs after() callbacks when told to, like a mainloop would
+    def __init__(self):
+        self.calls = []
+
+    def after(self, delay, function):
+        self.calls.append(function)
+        return len(self.calls)
+
+    def after_cancel(self, after_id):
+        self.calls[after_id - 1] = None
+
+    def run(self):
+        while any(self.calls):
+            calls, self.calls = self.calls, []
+            for function in filter(None, calls):
+                function()
+
+
+def test_rows_that_fail_end_the_load(tcl):
+    data = DataSourceVar(tcl, value=[{'id': 1}], key='id')
+    widget = Widget()
+    done = []
+    loader = DataLoader(data, widget, chunk_size=2, on_done=done.append)
+    loader.put_many([{'id': 2}, {'id': 3}])
+    loader.put_many([{'id': 3}])
+    loader.put_many([{'id': 4}])
+    loader.start()
+    widget.run()
+    assert loader.done and loader.cancelled
+    assert len(done) == 1 and isinstance(done[0], ValueError)
+    assert [row['id'] for row in data.get()] == [1, 2, 3]
+
+
+def test_load_from_a_thread(tcl):
+    data = DataSourceVar(tcl, headers=['n'])
+    widget = Widget()
+    done = []
+    loader = DataLoader(data, widget, chunk_size=10, on_done=done.append)
+    loader.run(({'n': n} for n in range(95))).join()
+    widget.run()
+    assert done == [None] and len(data) == 95
@@ -0,0 +1,67 @@
+import random
+import pytest
+from datasource import DataSourceVar
+from filters import Range
+from model import GridModel
+
+
+def shown(model):
+    return [(model.row(pos)['v'], model.row(pos)['w']) for pos in range(model.row_count())]
+
+
+def expected(data, low, sort):
+    rows = [row for row in data.get() if row['v'] >= low]
+    if sort:
+        rows.sort(key=lambda row: row['w'])
+        rows.sort(key=lambda row: row['v'], reverse=True)
+    return [(row['v'], row['w']) for row in rows]
+
+
+@pytest.mark.parametrize('sort', [False, True])
+def test_mixed_batches_keep_sort_and_filter(tcl, sort):
+    rand = random.Random(7)
+
+    def row():
+        return {'v': rand.randrange(100), 'w': rand.randrange(5)}
+
+    data = DataSourceVar(tcl, value=[row() for _ in range(300)])
+    model = GridModel(data)
+    if sort:
+        model.sort([('v', 'desc'), ('w', 'asc')])
+    model.set_filter(Range('v', 30))
+    for _ in range(40):
+        with data.batch():
+            data.append(row())
+            data.pop(rand.randrange(len(data)))
+            data.set_cell(rand.randrange(len(data)), 'v', rand.randrange(100))
+            data.extend([row() for _ in range(rand.randrange(3))])
+            data.insert(rand.randrange(len(data)), row())
+        assert shown(model) == expected(data, 30, sort)
+        data.set_cell(rand.randrange(len(data)), 'v', rand.randrange(100))
+        data.pop(rand.randrange(len(data)))
+        data.append(row())
+        assert shown(model) == expected(data, 30, sort)
+    data.extend([row() for _ in range(1000)])
+    data.pop(0)
+    assert shown(model) == expected(data, 30, sort)
+
+
+def test_rollback_keeps_order(tcl):
+    data = DataSourceVar(tcl, value=[{'v': value, 'w': 0} for value in range(50)])
+    model = GridModel(data)
+    model.sort('v')
+    data.set_cell(0, 'v', 100)
+    data.set_cell(1, 'v', -1)
+    data.rollback()
+    assert shown(model) == [(value, 0) for value in range(49, -1, -1)]
+
+
+def test_close_stops_following_the_data(tcl):
+    data = DataSourceVar(tcl, value=[{'v': 1, 'w': 0}])
+    model = GridModel(data)
+    heard = []
+    model.subscribe(heard.append)
+    model.close()
+    data.append({'v': 2, 'w': 0})
+    assert heard == [] and model.version == 0
+    assert data._callbacks['change'] == [] and data._callbacks['mutation'] == []
@@ -0,0 +1,127 @@
+import random
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+import pytest
+from filters import Equals, Range
+from model import GridModel
+from parallel import ProcessJobs, merge_runs, sort_run
+from rowsource import RowSource
+from sortkeys import argsort
+
+
+class Widget:
+    # runs after() callbacks when told to, like a mainloop would
+    def __init__(self):
+        self.calls = []
+
+    def after(self, delay, function):
+        self.calls.append(function)
+        return len(self.calls)
+
+    def after_cancel(self, after_id):
+        self.calls[after_id - 1] = None
+
+    def run(self):
+        while any(self.calls):
+            calls, self.calls = self.calls, []
+            for function in filter(None, calls):
+                function()
+
+
+class Inline(Executor):
+    # runs each job as it is submitted, the futures are done before the first poll
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+
+def columns_of(rows, headers):
+    return [[row[header] for row in rows] for header in headers]
+
+
+rng = random.Random(7)
+ROWS = [{'id': index, 'group': rng.choice('abc'), 'n': rng.randrange(20)} for index in range(1000)]
+
+
+@pytest.mark.parametrize('reverses', [(False,), (True,), (False, False), (True, True), (False, True), (True, False)])
+def test_merged_runs_match_one_sort(reverses):
+    # few distinct values: lots of ties, which keep source order across the runs
+    columns = columns_of(ROWS, ['group', 'n'][:len(reverses)])
+    runs = [sort_run([keys[start:start + 300] for keys in columns], reverses, start) for start in range(0, 1000, 300)]
+    assert list(merge_runs(columns, reverses, runs)) == argsort(columns, reverses)
+
+
+def test_sort_filter_and_group_in_chunks():
+    widget = Widget()
+    jobs = ProcessJobs(widget, Inline(), chunk_rows=128)
+    done = {}
+    columns = columns_of(ROWS, ['n', 'group'])
+    jobs.sort(columns, (True, False), lambda order: done.setdefault('sort', order))
+    jobs.filter(Range('n', 11), RowSource(ROWS), lambda mask: done.setdefault('filter', mask))
+    jobs.group(columns_of(ROWS, ['group']), lambda groups: done.setdefault('group', groups))
+    widget.run()
+    assert not jobs.pending()
+    assert done['sort'] == argsort(columns, (True, False))
+    assert done['filter'] == bytearray(row['n'] > 10 for row in ROWS)
+    assert done['group'] == {(group,): [row['id'] for row in ROWS if row['group'] == group] for group in 'abc'}
+
+
+def test_a_new_job_replaces_the_pending_one():
+    widget = Widget()
+    jobs = ProcessJobs(widget, Inline(), chunk_rows=128)
+    done = []
+    jobs.sort(columns_of(ROWS, ['n']), (False,), lambda order: done.append('n'))
+    jobs.sort(columns_of(ROWS, ['group']), (False,), lambda order: done.append('group'))
+    widget.run()
+    assert done == ['group']
+    jobs.sort(columns_of(ROWS, ['n']), (False,), done.append)
+    jobs.shutdown()
+    widget.run()
+    assert done == ['group'] and not jobs.pending()
+
+
+def test_failed_jobs_go_to_on_error():
+    widget = Widget()
+    errors, done = [], []
+    jobs = ProcessJobs(widget, Inline(), chunk_rows=128, on_error=errors.append)
+    # None doesn't compare with ints
+    jobs.sort([[3, None, 1]], (False,), done.append)
+    widget.run()
+    assert done == [] and len(errors) == 1 and isinstance(errors[0], TypeError)
+    assert not jobs.pending()
+
+
+def test_model_takes_groups_from_the_pool():
+    data = RowSource([dict(row) for row in ROWS])
+    model = GridModel(data, 50)
+    widget = Widget()
+    jobs = ProcessJobs(widget, Inline(), chunk_rows=128)
+    version = model.version
+    jobs.group([data.column('group')], lambda members: model.apply_groups(['group'], members, version, True))
+    widget.run()
+    expected = GridModel(RowSource([dict(row) for row in ROWS]), 50)
+    expected.group_by(['group'], True)
+    assert [model.texts(pos) for pos in range(model.row_count())] == \
+           [expected.texts(pos) for pos in range(expected.row_count())]
+    # the groups keep following the data
+    data.pop(0)
+    assert model.group_summary((ROWS[0]['group'],))[0] == sum(row['group'] == ROWS[0]['group'] for row in ROWS) - 1
+    # groups of data that changed since are turned down
+    assert not model.apply_groups(['n'], {}, version)
+    assert model.grouped_by == ['group']
+
+
+def test_process_pool():
+    widget = Widget()
+    with ProcessPoolExecutor(2) as executor:
+        jobs = ProcessJobs(widget, executor, chunk_rows=300, interval_ms=1)
+        done = {}
+        columns = columns_of(ROWS, ['group', 'n'])
+        jobs.sort(columns, (False, True), lambda order: done.setdefault('sort', order))
+        jobs.filter(Equals('group', 'a'), ROWS, lambda mask: done.setdefault('filter', mask))
+        widget.run()
+    assert done['sort'] == argsort(columns, (False, True))
+    assert done['filter'] == bytearray(row['group'] == 'a' for row in ROWS)
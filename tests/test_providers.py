@@ -0,0 +1,83 @@
+import random
+import sqlite3
+import pytest
+from filters import Contains, Equals, Filter, Not, Or, Range, Regex
+from model import GridModel
+from providers import CSVProvider, SQLiteProvider
+from rowsource import RowSource
+
+HEADERS = ['id', 'name', 'n', 'score']
+FILTERS = [None, Equals('n', 3), Equals('name', None), Range('score', 0.25, 0.75), Range('n', None, 4),
+           Contains('name', 'AB'), Contains('name', 'ab', case=True), Regex('name', '^$'), Regex('name', '^b.?c'),
+           Range('n', 2) & Contains('name', 'c'), Or(Equals('n', 1), Not(Range('score', 0.5))),
+           ~Regex('name', 'a')]
+SORTS = [None, [('n', 'asc')], [('score', 'desc')], [('name', 'asc'), ('n', 'desc')]]
+
+
+def make_rows():
+    rand = random.Random(9)
+    return [{'id': id_,
+             'name': rand.choice([None, ''.join(rand.choice('abcABC') for _ in range(rand.randrange(1, 4)))]),
+             'n': rand.choice([None, rand.randrange(6)]),
+             'score': rand.choice([None, rand.randrange(100) / 100])} for id_ in range(200)]
+
+
+def shown(model):
+    return [model.find(pos) for pos in range(model.row_count())]
+
+
+@pytest.fixture
+def rows():
+    return make_rows()
+
+
+@pytest.fixture
+def sqlite(rows):
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE t (id INTEGER, name TEXT, n INTEGER, score REAL)')
+    connection.executemany('INSERT INTO t VALUES (?, ?, ?, ?)', [tuple(row.values()) for row in rows])
+    provider = SQLiteProvider(connection, 't')
+    yield provider
+    provider.close()
+
+
+@pytest.fixture
+def csv_file(rows, tmp_path):
+    lines = [','.join(HEADERS)]
+    for row in rows:
+        # empty fields read back as None; blank lines between records are no records
+        lines.append(','.join('' if row[header] is None else str(row[header]) for header in HEADERS))
+        if row['id'] % 7 == 0:
+            lines.append('   ' if row['id'] % 2 else '')
+    path = tmp_path / 'rows.csv'
+    path.write_text('\n'.join(lines) + '\n')
+    provider = CSVProvider(str(path), types={'id': int, 'n': int, 'score': float})
+    yield provider
+    provider.close()
+
+
+@pytest.mark.parametrize('sort', SORTS)
+@pytest.mark.parametrize('predicate', FILTERS)
+@pytest.mark.parametrize('kind', ['sqlite', 'csv'])
+def test_provider_matches_memory(request, rows, kind, predicate, sort):
+    provider = request.getfixturevalue('sqlite' if kind == 'sqlite' else 'csv_file')
+    memory = GridModel(RowSource(rows), page_size=30)
+    paged = GridModel(provider, page_size=30)
+    for model in (memory, paged):
+        model.sort(sort)
+        model.set_filter(predicate)
+    assert paged.row_count() == memory.row_count()
+    assert shown(paged) == shown(memory)
+
+
+def test_unknown_filter_is_refused_up_front(sqlite):
+    class Odd(Filter):
+        key = ('odd',)
+
+        def test(self, row):
+            return row['n'] is not None and row['n'] % 2 == 1
+
+    model = GridModel(sqlite)
+    with pytest.raises(ValueError):
+        model.set_filter(Odd())
+    assert model.row_count() == 200
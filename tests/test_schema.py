@@ -0,0 +1,29 @@
+from decimal import Decimal
+import pytest
+from datasource import DataSourceVar
+from model import GridModel
+from schema import Column, compile_column, infer_column
+
+
+def test_infer_column():
+    assert infer_column([1, None, 2.5]) is float
+    assert infer_column([1, Decimal('2.5')]) is Decimal
+    assert infer_column([True, None]) is bool
+    assert infer_column([1, 'a']) is None
+    assert infer_column([True, 1]) is None
+    assert infer_column([None]) is None
+
+
+def test_mixed_numbers_take_float_edits(tcl):
+    data = DataSourceVar(tcl, value=[{'v': 1}, {'v': 2.5}])
+    model = GridModel(data)
+    model.edit(0, 0, '1.75')
+    assert data[0]['v'] == 1.75
+
+
+def test_grouped_numbers_round_trip():
+    format_value, parse_text = compile_column(Column(float, formatter='{:,.2f}'.format))
+    assert parse_text(format_value(1234567.5)) == 1234567.5
+    assert compile_column(int)[1]('-12,345') == -12345
+    with pytest.raises(ValueError):
+        parse_text('1,23.5')
@@ -0,0 +1,47 @@
+from datasource import DataSourceVar
+from model import GridModel
+
+
+def make(tcl, rows):
+    data = DataSourceVar(tcl, value=rows)
+    return data, GridModel(data)
+
+
+def test_set_does_not_reuse_versions(tcl):
+    data, model = make(tcl, [{'v': 1}, {'v': 2}])
+    data.set_cell(0, 'v', 10)
+    assert model.texts(0) == ['10']
+    data.set(data.get())
+    data.set_cell(0, 'v', 20)
+    assert model.texts(0) == ['20']
+
+
+def test_pop_and_append_same_row(tcl):
+    data, model = make(tcl, [{'v': 1}, {'v': 2}])
+    row = data[0]
+    data.set_cell(0, 'v', 10)
+    assert model.texts(0) == ['10']
+    data.pop(0)
+    data.append(row)
+    data.set_cell(1, 'v', 30)
+    assert model.texts(1) == ['30']
+
+
+def test_setitem_puts_back_an_edited_row(tcl):
+    data, model = make(tcl, [{'v': 1}])
+    row = data[0]
+    assert model.texts(0) == ['1']
+    row['v'] = 5
+    data[0] = row
+    assert model.texts(0) == ['5']
+
+
+def test_versions_never_repeat(tcl):
+    data, _ = make(tcl, [{'v': 1}])
+    seen = set()
+    for value in range(5):
+        data.set_cell(0, 'v', value)
+        seen.add(data.row_version(data[0]))
+        data.set(data.get())
+    data.set_cell(0, 'v', 9)
+    assert data.row_version(data[0]) not in seen